@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Export CareNow check-ins or clinic aggregates as CSV or Parquet.
+
+Reads the same storage as the server (local ``data/`` or the S3 bucket from
+the environment) and streams it, so memory stays flat however many check-ins
+there are. Clinic aggregates are recomputed from the selected check-ins.
+
+Examples:
+    python3 export.py checkins -o checkins.csv
+    python3 export.py checkins --since 2025-01-01 --until 2025-02-01 --bbox=-114.3,50.8,-113.8,51.2
+    python3 export.py clinics --format parquet -o clinics.parquet   # needs pyarrow
+"""
+
+import argparse
+import contextlib
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+# The server's startup messages go to stderr so stdout carries only the export
+with contextlib.redirect_stdout(sys.stderr):
+    import server
+from fastapi import HTTPException
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Export CareNow data as CSV or Parquet")
+    parser.add_argument("dataset", choices=("checkins", "clinics"), help="What to export")
+    parser.add_argument("--format", choices=("csv", "parquet"), default="csv",
+                        help="Output format (parquet needs pyarrow)")
+    parser.add_argument("--since", help="Only check-ins submitted at or after this time (ISO 8601)")
+    parser.add_argument("--until", help="Only check-ins submitted before this time (ISO 8601)")
+    parser.add_argument("--bbox", help="Only data inside west,south,east,north (write --bbox=... for a negative west)")
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    if args.format == "parquet" and server.pyarrow is None:
+        print("Parquet export needs pyarrow installed (pip install pyarrow)", file=sys.stderr)
+        return 1
+    try:
+        since = server._parse_export_time(args.since, "--since")
+        until = server._parse_export_time(args.until, "--until")
+        bbox = server._parse_bbox(args.bbox)
+    except HTTPException as exc:
+        print(exc.detail, file=sys.stderr)
+        return 2
+
+    if args.dataset == "checkins":
+        records, columns = server._export_checkins(since, until, bbox), server.CHECKIN_EXPORT_COLUMNS
+    else:
+        records, columns = server._export_clinics(since, until, bbox), server.CLINIC_EXPORT_COLUMNS
+    chunks = server._parquet_chunks(records, columns) if args.format == "parquet" else server._csv_chunks(records, columns)
+
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    except ValueError as exc:
+        print(f"Export stopped: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        if args.output:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""Load-test a local CareNow instance with a mixed, production-like workload.
+
+By default this writes a synthetic data set to a temporary directory, starts
+``run_server.py`` on it, drives the endpoints below from ``--concurrency``
+keep-alive connections for ``--duration`` seconds and prints throughput and
+p50/p95/p99 latency per endpoint. The exit code is 1 when a threshold
+(``--min-rps``, ``--max-p99-ms``, ``--max-error-rate``) is not met.
+
+Examples:
+    python3 loadtest.py
+    python3 loadtest.py --concurrency 8,32,128 --duration 20 --max-p99-ms 500
+    python3 loadtest.py --mix geojson=60,checkin=40 --max-p99-ms checkin=800
+    python3 loadtest.py --base-url http://localhost:8000   # existing server
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+ROOT = Path(__file__).parent
+
+DEFAULT_MIX = "home=5,map=5,geojson=30,nearby=20,clinics=10,checkin=30"
+ENDPOINTS = ("home", "map", "geojson", "nearby", "clinics", "checkin")
+
+# Synthetic clinics are spread over one metro area
+CENTER_LAT, CENTER_LON, SPREAD_DEG = 51.05, -114.07, 0.4
+CONDITIONS = ("Smooth", "Moderate", "Overloaded")
+
+
+# ---------------------------------------------------------
+# Synthetic data
+# ---------------------------------------------------------
+def make_clinics(count: int, rng: random.Random) -> List[Dict]:
+    return [
+        {
+            "name": f"Loadtest Clinic {i:05d}",
+            "latitude": round(CENTER_LAT + rng.uniform(-SPREAD_DEG, SPREAD_DEG), 6),
+            "longitude": round(CENTER_LON + rng.uniform(-SPREAD_DEG, SPREAD_DEG), 6),
+        }
+        for i in range(count)
+    ]
+
+
+def make_checkins(clinics: List[Dict], count: int, rng: random.Random) -> List[Dict]:
+    """Check-ins over the last 30 days, in created order like the real index."""
+    now = datetime.now(timezone.utc)
+    start = now - timedelta(days=30)
+    span = (now - start).total_seconds()
+    offsets = sorted(rng.uniform(0, span) for _ in range(count))
+    checkins = []
+    for offset in offsets:
+        clinic = rng.choice(clinics)
+        check_in = start + timedelta(seconds=offset)
+        wait = max(5.0, rng.lognormvariate(3.4, 0.5))
+        check_out = check_in + timedelta(minutes=wait)
+        checkins.append({
+            "checkin_id": f"loadtest-{len(checkins)}",
+            "clinic_id": None,  # filled in by the server's grouping
+            "clinic_name": clinic["name"],
+            "location": {"latitude": clinic["latitude"], "longitude": clinic["longitude"]},
+            "check_in_time": check_in.isoformat(),
+            "check_out_time": check_out.isoformat(),
+            "wait_time": round(wait, 1),
+            "condition": rng.choice(CONDITIONS),
+            "created_at": check_out.isoformat(),
+        })
+    return checkins
+
+
+def prepare_data(data_dir: Path, clinics: List[Dict], checkin_count: int, rng: random.Random) -> None:
+    """Write check-ins, clinic aggregations and a trained model the way the server stores them."""
+    os.environ["CARENOW_DATA_DIR"] = str(data_dir)
+    os.environ.pop("CARENOW_BUCKET", None)
+    os.environ.pop("S3_BUCKET_NAME", None)
+    sys.path.insert(0, str(ROOT))
+    import server  # noqa: E402 - must see CARENOW_DATA_DIR
+
+    checkins = make_checkins(clinics, checkin_count, rng)
+    for checkin in checkins:
+        checkin["clinic_id"] = server._group_key_for_checkin(checkin)
+    server._save_checkins(checkins)
+    aggregator = server.ClinicAggregator()
+    for checkin in checkins:
+        aggregator.add(checkin)
+    server._save_clinics(aggregator.clinics())
+    server._save_model(server._train_model(checkins))
+
+
+# ---------------------------------------------------------
+# Minimal keep-alive HTTP/1.1 client
+# ---------------------------------------------------------
+class Connection:
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, body: bytes = b"", headers: Optional[Dict] = None) -> int:
+        """Send one request and read the whole response; returns the status code."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}", "Accept-Encoding: gzip"]
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        if body or method == "POST":
+            lines.append(f"Content-Length: {len(body)}")
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed by server")
+        status = int(status_line.split()[1])
+        length, chunked, close = None, False, False
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name, value = name.strip().lower(), value.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "transfer-encoding" and "chunked" in value:
+                chunked = True
+            elif name == "connection" and value == "close":
+                close = True
+
+        if chunked:
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif length:
+            await self.reader.readexactly(length)
+        if close:
+            self.close()
+        return status
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+# ---------------------------------------------------------
+# Workload
+# ---------------------------------------------------------
+class Workload:
+    """Builds one request for a named endpoint."""
+
+    def __init__(self, clinics: List[Dict], rng: random.Random):
+        self.clinics = clinics
+        self.rng = rng
+        self.sequence = 0
+
+    def _point(self) -> Tuple[float, float]:
+        rng = self.rng
+        return (
+            CENTER_LAT + rng.uniform(-SPREAD_DEG, SPREAD_DEG),
+            CENTER_LON + rng.uniform(-SPREAD_DEG, SPREAD_DEG),
+        )
+
+    def build(self, endpoint: str) -> Tuple[str, str, bytes, Dict]:
+        rng = self.rng
+        if endpoint == "home":
+            return "GET", "/", b"", {}
+        if endpoint == "map":
+            return "GET", "/map", b"", {}
+        if endpoint == "clinics":
+            return "GET", "/clinics", b"", {}
+        if endpoint == "geojson":
+            lat, lon = self._point()
+            zoom = rng.choice((9, 10, 11, 12, 13, 14))
+            half = 180.0 / 2 ** zoom * 2
+            query = {
+                "bbox": f"{lon - half:.5f},{lat - half / 2:.5f},{lon + half:.5f},{lat + half / 2:.5f}",
+                "zoom": zoom,
+            }
+            return "GET", "/clinics/geojson?" + urlencode(query), b"", {}
+        if endpoint == "nearby":
+            lat, lon = self._point()
+            query = {"latitude": f"{lat:.5f}", "longitude": f"{lon:.5f}", "radius_km": 10, "limit": 10}
+            return "GET", "/clinics/nearby?" + urlencode(query), b"", {}
+        if endpoint == "checkin":
+            clinic = rng.choice(self.clinics)
+            self.sequence += 1
+            # Distinct times per request so the duplicate index never short-circuits a write
+            check_in = datetime.now(timezone.utc) - timedelta(minutes=rng.uniform(30, 240), microseconds=self.sequence)
+            check_out = check_in + timedelta(minutes=max(5.0, rng.lognormvariate(3.4, 0.5)))
+            form = {
+                "clinic_name": clinic["name"],
+                "latitude": clinic["latitude"],
+                "longitude": clinic["longitude"],
+                "check_in_time": check_in.isoformat(),
+                "check_out_time": check_out.isoformat(),
+                "condition": rng.choice(CONDITIONS),
+            }
+            return "POST", "/checkins", urlencode(form).encode(), {"Content-Type": "application/x-www-form-urlencoded"}
+        raise ValueError(f"Unknown endpoint: {endpoint}")
+
+
+class Results:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {name: [] for name in ENDPOINTS}
+        self.statuses: Dict[str, Dict[int, int]] = {name: {} for name in ENDPOINTS}
+        self.errors: Dict[str, int] = {name: 0 for name in ENDPOINTS}
+
+    def record(self, endpoint: str, latency: float, status: Optional[int]) -> None:
+        if status is None:
+            self.errors[endpoint] += 1
+            return
+        self.latencies[endpoint].append(latency)
+        self.statuses[endpoint][status] = self.statuses[endpoint].get(status, 0) + 1
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+async def run_stage(
+    host: str,
+    port: int,
+    mix: Dict[str, float],
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    clinics: List[Dict],
+    seed: int,
+) -> Tuple[Results, float]:
+    results = Results()
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    started = time.perf_counter()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    async def client(index: int) -> None:
+        rng = random.Random(seed * 1000 + index)
+        workload = Workload(clinics, rng)
+        connection = Connection(host, port)
+        try:
+            while True:
+                now = time.perf_counter()
+                if now >= stop_at:
+                    return
+                endpoint = rng.choices(names, weights)[0]
+                method, path, body, headers = workload.build(endpoint)
+                sent = time.perf_counter()
+                try:
+                    status = await connection.request(method, path, body, headers)
+                except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+                    connection.close()
+                    status = None
+                if sent >= measure_from:
+                    results.record(endpoint, time.perf_counter() - sent, status)
+        finally:
+            connection.close()
+
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    return results, max(1e-9, time.perf_counter() - measure_from)
+
+
+# ---------------------------------------------------------
+# Reporting and thresholds
+# ---------------------------------------------------------
+def summarize(results: Results, elapsed: float) -> Dict[str, Dict]:
+    summary = {}
+    for endpoint in ENDPOINTS:
+        latencies = sorted(results.latencies[endpoint])
+        statuses = results.statuses[endpoint]
+        total = len(latencies) + results.errors[endpoint]
+        if not total:
+            continue
+        failed = results.errors[endpoint] + sum(n for code, n in statuses.items() if code >= 500 and code != 503)
+        summary[endpoint] = {
+            "requests": total,
+            "rps": round(total / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+            "max_ms": round((latencies[-1] if latencies else 0.0) * 1000, 1),
+            "error_rate": round(failed / total, 4),
+            "statuses": {str(code): n for code, n in sorted(statuses.items())},
+        }
+    all_requests = sum(item["requests"] for item in summary.values())
+    summary["total"] = {"requests": all_requests, "rps": round(all_requests / elapsed, 1)}
+    return summary
+
+
+def print_summary(concurrency: int, summary: Dict[str, Dict]) -> None:
+    print(f"\nConcurrency {concurrency}: {summary['total']['rps']} req/s ({summary['total']['requests']} requests)")
+    print(f"  {'endpoint':<10}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'errors':>8}  statuses")
+    for endpoint in ENDPOINTS:
+        item = summary.get(endpoint)
+        if item is None:
+            continue
+        statuses = " ".join(f"{code}x{n}" for code, n in item["statuses"].items())
+        print(
+            f"  {endpoint:<10}{item['rps']:>9}{item['p50_ms']:>9}{item['p95_ms']:>9}"
+            f"{item['p99_ms']:>9}{item['max_ms']:>9}{item['error_rate']:>8.2%}  {statuses}"
+        )
+
+
+def check_thresholds(summary: Dict[str, Dict], args: argparse.Namespace) -> List[str]:
+    failures = []
+    if args.min_rps and summary["total"]["rps"] < args.min_rps:
+        failures.append(f"throughput {summary['total']['rps']} req/s < {args.min_rps}")
+    for endpoint, item in summary.items():
+        if endpoint == "total":
+            continue
+        limit = args.max_p99_ms.get(endpoint, args.max_p99_ms.get("*"))
+        if limit is not None and item["p99_ms"] > limit:
+            failures.append(f"{endpoint} p99 {item['p99_ms']} ms > {limit} ms")
+        if item["error_rate"] > args.max_error_rate:
+            failures.append(f"{endpoint} error rate {item['error_rate']:.2%} > {args.max_error_rate:.2%}")
+    return failures
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r} (choose from {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    if not any(weight > 0 for weight in mix.values()):
+        raise argparse.ArgumentTypeError("mix needs at least one positive weight")
+    return mix
+
+
+def parse_p99(text: str) -> Dict[str, float]:
+    """``500`` applies to every endpoint; ``geojson=200,checkin=800`` per endpoint."""
+    limits = {}
+    for part in text.split(","):
+        name, sep, value = part.partition("=")
+        if not sep:
+            limits["*"] = float(name)
+        elif name.strip() in ENDPOINTS:
+            limits[name.strip()] = float(value)
+        else:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r}")
+    return limits
+
+
+# ---------------------------------------------------------
+# Server process
+# ---------------------------------------------------------
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_ready(host: str, port: int, timeout: float) -> bool:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        connection = Connection(host, port)
+        try:
+            if await connection.request("GET", "/health") == 200:
+                return True
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            pass
+        finally:
+            connection.close()
+        await asyncio.sleep(0.2)
+    return False
+
+
+def start_server(data_dir: Path, port: int, workers: int, keep_rate_limits: bool) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "PORT": str(port),
+        "CARENOW_DATA_DIR": str(data_dir),
+        "CARENOW_RUNTIME_DIR": str(data_dir),
+    })
+    env.pop("CARENOW_BUCKET", None)
+    env.pop("S3_BUCKET_NAME", None)
+    if not keep_rate_limits:
+        # Every simulated client shares one IP; per-IP limits would reject nearly all writes
+        env["CARENOW_WRITE_RATE_PER_CLIENT"] = "0"
+        env["CARENOW_WRITE_RATE_PER_CLINIC"] = "0"
+    return subprocess.Popen(
+        [sys.executable, str(ROOT / "run_server.py"), "--workers", str(workers)],
+        cwd=str(ROOT),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+async def main_async(args: argparse.Namespace) -> int:
+    rng = random.Random(args.seed)
+    clinics = make_clinics(args.clinics, rng)
+    server_process = None
+    data_dir = None
+
+    if args.base_url:
+        parts = urlsplit(args.base_url)
+        host, port = parts.hostname or "localhost", parts.port or 80
+    else:
+        data_dir = Path(tempfile.mkdtemp(prefix="carenow-loadtest-"))
+        print(f"Writing {args.clinics} clinics / {args.checkins} check-ins to {data_dir}")
+        prepare_data(data_dir, clinics, args.checkins, rng)
+        host, port = "127.0.0.1", args.port or free_port()
+        print(f"Starting run_server.py on port {port} with {args.workers} worker(s)")
+        server_process = start_server(data_dir, port, args.workers, args.keep_rate_limits)
+
+    try:
+        if not await wait_until_ready(host, port, args.startup_timeout):
+            print(f"✗ Server at {host}:{port} did not become ready")
+            return 1
+
+        report = {"mix": args.mix, "stages": []}
+        failures = []
+        for concurrency in args.concurrency:
+            results, elapsed = await run_stage(
+                host, port, args.mix, concurrency, args.duration, args.warmup, clinics, args.seed
+            )
+            summary = summarize(results, elapsed)
+            print_summary(concurrency, summary)
+            stage_failures = check_thresholds(summary, args)
+            failures.extend(f"concurrency {concurrency}: {failure}" for failure in stage_failures)
+            report["stages"].append({"concurrency": concurrency, "summary": summary, "failures": stage_failures})
+
+        if args.json:
+            Path(args.json).write_text(json.dumps(report, indent=2))
+            print(f"\nWrote {args.json}")
+
+        print()
+        if failures:
+            for failure in failures:
+                print(f"✗ {failure}")
+            return 1
+        print("✓ All thresholds met")
+        return 0
+    finally:
+        if server_process is not None:
+            server_process.terminate()
+            try:
+                server_process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server_process.kill()
+        if data_dir is not None:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Mixed-workload load test for CareNow")
+    parser.add_argument("--base-url", help="Test an already running server instead of starting one")
+    parser.add_argument("--port", type=int, default=0, help="Port for the spawned server (default: any free port)")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for the spawned server")
+    parser.add_argument("--clinics", type=int, default=500, help="Synthetic clinics to preload")
+    parser.add_argument("--checkins", type=int, default=20000, help="Synthetic check-ins to preload")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Endpoint weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--concurrency", type=lambda text: [int(n) for n in text.split(",")], default=[32],
+                        help="Concurrent connections; a comma list runs one stage per value (default: 32)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds per stage")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds at the start of each stage")
+    parser.add_argument("--min-rps", type=float, default=0.0, help="Fail below this total throughput")
+    parser.add_argument("--max-p99-ms", type=parse_p99, default={},
+                        help="Fail above this p99, e.g. 500 or geojson=200,checkin=800")
+    parser.add_argument("--max-error-rate", type=float, default=0.01,
+                        help="Fail above this fraction of failed requests per endpoint (429/503 do not count)")
+    parser.add_argument("--keep-rate-limits", action="store_true",
+                        help="Leave the server's per-client/per-clinic write limits enabled")
+    parser.add_argument("--startup-timeout", type=float, default=120.0, help="Seconds to wait for the server")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for data and request mix")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+    return asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,20 @@
 import os
+import sys
+import csv
 import json
+import time
 import uuid
+import queue
+import random
+import argparse
+import shutil
+import hashlib
+import sqlite3
+import threading
 import boto3
+from io import BytesIO
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
 from dotenv import load_dotenv
 from datetime import datetime
 
@@ -12,14 +25,44 @@ region = "us-east-1"
 bucket_name = "accessibility-audit-uploads"  # your bucket
 
 load_dotenv()
-openai_key = os.getenv("OPENAI_API_KEY")
-if not openai_key:
-    raise Exception("Missing OPENAI_API_KEY")
 
-client = OpenAI(api_key=openai_key)
-
-s3 = boto3.client("s3", region_name=region)
-rekognition = boto3.client("rekognition", region_name=region)
+# Pillow is optional: without it images are analysed at their original size
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+# Longest side (pixels) of the copy sent for label detection, and its JPEG quality
+ANALYSIS_MAX_DIM = int(os.getenv("AUDIT_ANALYSIS_MAX_DIM", "1600"))
+ANALYSIS_JPEG_QUALITY = int(os.getenv("AUDIT_ANALYSIS_JPEG_QUALITY", "85"))
+
+# Originals are uploaded in parts of this size, a few at a time, so memory stays
+# at roughly chunk size x concurrency however large the file
+UPLOAD_CHUNK_BYTES = int(os.getenv("AUDIT_UPLOAD_CHUNK_MB", "8")) * 1024 * 1024
+UPLOAD_TRANSFER = TransferConfig(
+    multipart_threshold=UPLOAD_CHUNK_BYTES,
+    multipart_chunksize=UPLOAD_CHUNK_BYTES,
+    max_concurrency=4,
+)
+
+# Clients are created on first use so the stub backends work offline
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _client(name):
+    with _clients_lock:
+        if name not in _clients:
+            if name == "openai":
+                from openai import OpenAI
+
+                openai_key = os.getenv("OPENAI_API_KEY")
+                if not openai_key:
+                    raise Exception("Missing OPENAI_API_KEY")
+                _clients[name] = OpenAI(api_key=openai_key)
+            else:
+                _clients[name] = boto3.client(name, region_name=region)
+        return _clients[name]
 
 
 # ---------------------------
@@ -32,11 +75,49 @@ def load_image(path):
         return f.read()
 
 
+def hash_file(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file, read in chunks."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Image '{path}' not found")
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def prepare_for_analysis(path, max_dim=ANALYSIS_MAX_DIM):
+    """Bytes to send for label detection: a downsized JPEG re-encode of the image.
+
+    JPEGs are decoded at reduced scale (``draft``), so a phone photo never
+    has to be fully decoded. Without Pillow, or for images it cannot read or
+    that are already small, the original bytes are returned.
+    """
+    if Image is None:
+        return load_image(path)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Image '{path}' not found")
+    try:
+        with Image.open(path) as img:
+            if max(img.size) <= max_dim and img.format == "JPEG":
+                return load_image(path)
+            img.draft("RGB", (max_dim, max_dim))
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((max_dim, max_dim))
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            out = BytesIO()
+            img.save(out, format="JPEG", quality=ANALYSIS_JPEG_QUALITY, optimize=True)
+            return out.getvalue()
+    except OSError:
+        return load_image(path)
+
+
 # ---------------------------
 # 2. RUN REKOGNITION ON IMAGE BYTES
 # ---------------------------
 def analyze_with_rekognition(image_bytes):
-    response = rekognition.detect_labels(
+    response = _client("rekognition").detect_labels(
         Image={"Bytes": image_bytes},
         MaxLabels=10,
         MinConfidence=75
@@ -65,7 +146,7 @@ Return ONLY JSON:
 }}
 """
 
-    result = client.responses.create(
+    result = _client("openai").responses.create(
         model="gpt-4.1-mini",
         input=prompt
     )
@@ -76,11 +157,12 @@ Return ONLY JSON:
 # ---------------------------
 # 4. UPLOAD TO S3 WITH METADATA
 # ---------------------------
-def upload_to_s3(image_bytes, labels, gpt_data, location, feature_name, description, image_path):
-    filename = os.path.basename(image_path)
-    key = f"uploads/{filename}"
+def _upload_key(image_path):
+    return f"uploads/{os.path.basename(image_path)}"
+
 
-    # Clean & size-limit metadata fields
+def _upload_metadata(labels, gpt_data, location, feature_name, description, content_sha256=None):
+    """Clean & size-limit metadata fields"""
     metadata = {
         "location": location[:200],
         "feature_name": feature_name[:200],
@@ -91,26 +173,532 @@ def upload_to_s3(image_bytes, labels, gpt_data, location, feature_name, descript
         "reason": gpt_data.get("reason", "")[:400],  # truncate to avoid overflow
         "timestamp": datetime.utcnow().isoformat()
     }
+    if content_sha256:
+        metadata["sha256"] = content_sha256  # lets later runs skip re-uploading the same bytes
+    return metadata
+
+
+def upload_to_s3(image_bytes, labels, gpt_data, location, feature_name, description, image_path, verbose=True,
+                 content_sha256=None):
+    """Upload the original image; pass image_bytes=None to stream it from image_path."""
+    key = _upload_key(image_path)
+    metadata = _upload_metadata(labels, gpt_data, location, feature_name, description, content_sha256)
+
+    # Multipart upload_fileobj reads the file chunk by chunk instead of all at once
+    with (open(image_path, "rb") if image_bytes is None else BytesIO(image_bytes)) as body:
+        _client("s3").upload_fileobj(
+            body,
+            bucket_name,
+            key,
+            ExtraArgs={"Metadata": metadata},
+            Config=UPLOAD_TRANSFER,
+        )
+
+    if verbose:
+        print("\nUploaded to S3 with metadata:")
+        print("s3://", bucket_name, "/", key, sep="")
+        print(json.dumps(metadata, indent=2))
+
+    return key
 
-    s3.put_object(
-        Bucket=bucket_name,
-        Key=key,
-        Body=image_bytes,
-        Metadata=metadata
-    )
 
-    print("\nUploaded to S3 with metadata:")
-    print("s3://", bucket_name, "/", key, sep="")
-    print(json.dumps(metadata, indent=2))
+def s3_stored_sha256(key):
+    """Content hash recorded on an uploaded S3 object, or None if absent."""
+    try:
+        head = _client("s3").head_object(Bucket=bucket_name, Key=key)
+    except ClientError:
+        return None
+    return head.get("Metadata", {}).get("sha256")
 
+
+# ---------------------------
+# 5. LOCAL STUB BACKENDS (offline testing)
+# ---------------------------
+STUB_LABELS = [
+    "Ramp", "Handrail", "Door", "Stairs", "Elevator", "Sign", "Parking",
+    "Wheelchair", "Sidewalk", "Building", "Person", "Path",
+]
+STUB_LATENCY = float(os.getenv("AUDIT_STUB_LATENCY", "0"))  # seconds per stub call, to mimic network time
+LOCAL_UPLOAD_DIR = os.getenv("AUDIT_LOCAL_UPLOAD_DIR", "uploads_local")
+
+
+def stub_labels(image_bytes):
+    """Deterministic pseudo-labels derived from the image bytes."""
+    time.sleep(STUB_LATENCY)
+    digest = hashlib.sha256(image_bytes).digest()
+    return sorted({STUB_LABELS[b % len(STUB_LABELS)] for b in digest[:4]})
+
+
+def stub_gpt(feature_name, user_desc, labels):
+    """Verify the feature if any of its words appears among the labels."""
+    time.sleep(STUB_LATENCY)
+    words = {w.lower() for w in feature_name.split()}
+    matched = [label for label in labels if label.lower() in words]
+    return {
+        "verified": bool(matched),
+        "confidence": 90 if matched else 20,
+        "reason": f"stub: matched {matched}" if matched else "stub: no matching label",
+    }
+
+
+def upload_to_local(image_bytes, labels, gpt_data, location, feature_name, description, image_path, verbose=True,
+                    content_sha256=None):
+    """Write the image and its metadata under LOCAL_UPLOAD_DIR instead of S3."""
+    time.sleep(STUB_LATENCY)
+    key = _upload_key(image_path)
+    target = os.path.join(LOCAL_UPLOAD_DIR, key)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, "wb") as f:
+        if image_bytes is None:
+            with open(image_path, "rb") as src:
+                shutil.copyfileobj(src, f, UPLOAD_CHUNK_BYTES)
+        else:
+            f.write(image_bytes)
+    with open(target + ".metadata.json", "w") as f:
+        json.dump(_upload_metadata(labels, gpt_data, location, feature_name, description, content_sha256), f, indent=2)
+    if verbose:
+        print(f"Saved locally: {target}")
     return key
 
 
+def local_stored_sha256(key):
+    try:
+        with open(os.path.join(LOCAL_UPLOAD_DIR, key) + ".metadata.json") as f:
+            return json.load(f).get("sha256")
+    except (OSError, ValueError):
+        return None
+
+
+# Stage -> backend name -> callable; batch mode picks one per stage
+BACKENDS = {
+    "prepare": {"resize": prepare_for_analysis, "original": load_image},
+    "labels": {"rekognition": analyze_with_rekognition, "stub": stub_labels},
+    "gpt": {"openai": analyze_with_gpt, "stub": stub_gpt},
+    "upload": {"s3": upload_to_s3, "local": upload_to_local},
+}
+
+# Upload backend -> lookup of the content hash stored with an existing object
+STORED_SHA256 = {upload_to_s3: s3_stored_sha256, upload_to_local: local_stored_sha256}
+
+
+# ---------------------------
+# 6. CONTENT-ADDRESSED RESULT CACHE
+# ---------------------------
+CACHE_PATH = os.getenv("AUDIT_CACHE_PATH", ".audit_cache.sqlite3")
+CACHE_MAX_BYTES = int(os.getenv("AUDIT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+class ResultCache:
+    """Persistent LRU of stage results keyed by the SHA-256 of the image.
+
+    Stored in SQLite so repeated runs (and all batch threads) share it.
+    When the stored values exceed ``max_bytes`` the least recently used
+    entries are evicted. ``stats`` counts hits and misses per stage.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.stats = {}
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        self._db.commit()
+        self._size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    @staticmethod
+    def key(stage, backend, image_sha256, *extra):
+        """Cache key for one stage's result; ``extra`` inputs (feature, description, labels) are hashed in."""
+        if extra:
+            image_sha256 += ":" + hashlib.sha256("\0".join(extra).encode("utf-8")).hexdigest()
+        return f"{stage}:{backend.__name__}:{image_sha256}"
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            return json.loads(row[0])
+
+    def put(self, key, value):
+        data = json.dumps(value)
+        with self._lock:
+            row = self._db.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, data, len(data), time.time()),
+            )
+            self._size += len(data) - (row[0] if row else 0)
+            while self._size > self.max_bytes:
+                oldest = self._db.execute(
+                    "SELECT key, size FROM results ORDER BY last_used LIMIT 100"
+                ).fetchall()
+                if not oldest:
+                    break
+                for old_key, size in oldest:
+                    if self._size <= self.max_bytes:
+                        break
+                    self._db.execute("DELETE FROM results WHERE key = ?", (old_key,))
+                    self._size -= size
+                    self.evictions += 1
+            self._db.commit()
+
+    def record(self, stage, hit):
+        with self._lock:
+            counts = self.stats.setdefault(stage, {"hits": 0, "misses": 0})
+            counts["hits" if hit else "misses"] += 1
+
+    def summary(self):
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            return {"stages": dict(self.stats), "entries": entries, "bytes": self._size, "evictions": self.evictions}
+
+
+def cached_call(cache, stage, key, fn, *args, **kwargs):
+    """fn(*args, **kwargs) unless ``cache`` already holds ``key``; returns (value, hit)."""
+    if cache is not None:
+        value = cache.get(key)
+        if value is not None:
+            cache.record(stage, True)
+            return value, True
+    value = fn(*args, **kwargs)
+    if cache is not None:
+        cache.put(key, value)
+        cache.record(stage, False)
+    return value, False
+
+
+def upload_once(cache, upload, image_sha256, image_path, upload_args, send=None, **kwargs):
+    """Upload unless an object with the same content hash already exists.
+
+    Checks where this content was uploaded before (from the cache) and the
+    key it would be uploaded to now. ``send`` wraps the actual upload call
+    (e.g. with retries). Returns (key, skipped).
+    """
+    stored_sha256 = STORED_SHA256.get(upload)
+    if stored_sha256 is not None:
+        candidates = []
+        if cache is not None:
+            candidates.append(cache.get(ResultCache.key("upload", upload, image_sha256)))
+        candidates.append(_upload_key(image_path))
+        for candidate in candidates:
+            if candidate and stored_sha256(candidate) == image_sha256:
+                if cache is not None:
+                    cache.record("upload", True)
+                return candidate, True
+    key = (send or upload)(*upload_args, content_sha256=image_sha256, **kwargs)
+    if cache is not None:
+        cache.put(ResultCache.key("upload", upload, image_sha256), key)
+        cache.record("upload", False)
+    return key, False
+
+
+# ---------------------------
+# 7. BATCH MODE
+# ---------------------------
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp")
+STAGES = ("prepare", "labels", "gpt", "upload")
+
+
+def _labels_text(labels):
+    """Labels as they go into the gpt cache key (order kept: it is the prompt's order)."""
+    return json.dumps(labels)
+
+
+def _analysis_variant(prepare):
+    """Which image copy labels are computed on (part of the labels cache key)."""
+    if prepare is prepare_for_analysis and Image is not None:
+        return f"jpeg@{ANALYSIS_MAX_DIM}"
+    return "original"
+
+
+
+def load_jobs(source, location="", feature_name="", description=""):
+    """Jobs from a directory of images or a manifest (.csv, .json, .jsonl).
+
+    Manifest rows have ``image`` (relative to the manifest) and optional
+    ``location``, ``feature`` and ``description``; in a directory, an
+    ``<image>.json`` file next to an image overrides the defaults.
+    """
+    defaults = {"location": location, "feature": feature_name, "description": description}
+    rows = []
+    if os.path.isdir(source):
+        base = source
+        for name in sorted(os.listdir(source)):
+            if not name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            row = {"image": name}
+            sidecar = os.path.join(source, name + ".json")
+            if os.path.exists(sidecar):
+                with open(sidecar) as f:
+                    row.update(json.load(f))
+            rows.append(row)
+    else:
+        base = os.path.dirname(os.path.abspath(source))
+        with open(source, newline="") as f:
+            if source.endswith(".csv"):
+                rows = list(csv.DictReader(f))
+            elif source.endswith(".jsonl"):
+                rows = [json.loads(line) for line in f if line.strip()]
+            else:
+                rows = json.load(f)
+
+    jobs = []
+    for index, row in enumerate(rows):
+        if not row.get("image"):
+            raise ValueError(f"Manifest row {index} has no 'image'")
+        job = {key: row.get(key) or value for key, value in defaults.items()}
+        job["image"] = os.path.join(base, row["image"])
+        job["index"] = index
+        jobs.append(job)
+    return jobs
+
+
+def with_retries(fn, *args, attempts=3, backoff=1.0, **kwargs):
+    """Call fn, retrying failures with exponential backoff and jitter.
+
+    Returns (result, attempts_used). A missing file is not retried.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            return fn(*args, **kwargs), attempt
+        except FileNotFoundError:
+            raise
+        except Exception:
+            if attempt == attempts:
+                raise
+            time.sleep(backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.0))
+
+
+def _process_stage(stage, job, backends, attempts, backoff, cache=None):
+    """Run one stage for one job, recording its result and timing on the job."""
+    backend = backends[stage]
+    started = time.perf_counter()
+    tries = 0
+
+    def call(*args, **kwargs):
+        nonlocal tries
+        result, tries = with_retries(backend, *args, attempts=attempts, backoff=backoff, **kwargs)
+        return result
+
+    hit = False
+    if stage == "prepare":
+        # Only the small analysis copy travels down the pipeline; the original stays on disk.
+        # Decoding and resizing is the slow part, so it is skipped when the labels are cached.
+        job["sha256"] = hash_file(job["image"])
+        job["analysis"] = _analysis_variant(backend)
+        key = ResultCache.key("labels", backends["labels"], job["sha256"], job["analysis"])
+        labels = cache.get(key) if cache is not None else None
+        if labels is None:
+            job["_bytes"] = backend(job["image"])
+        else:
+            job["_labels"] = labels
+    elif stage == "labels":
+        if "_labels" in job:
+            job["labels"], hit = job.pop("_labels"), True
+            cache.record(stage, True)
+        else:
+            key = ResultCache.key("labels", backend, job["sha256"], job["analysis"])
+            job["labels"], hit = cached_call(cache, stage, key, call, job.get("_bytes"))
+            job.pop("_bytes", None)
+    elif stage == "gpt":
+        # The labels are part of the prompt, so a different labels backend is a different result
+        key = ResultCache.key(
+            "gpt", backend, job["sha256"], job["feature"], job["description"], _labels_text(job["labels"])
+        )
+        job["gpt"], hit = cached_call(cache, stage, key, call, job["feature"], job["description"], job["labels"])
+    else:
+        # image_bytes=None: the original is streamed from disk
+        upload_args = (
+            None, job["labels"], job["gpt"], job["location"], job["feature"],
+            job["description"], job["image"],
+        )
+        job["key"], hit = upload_once(
+            cache, backend, job["sha256"], job["image"], upload_args, send=call, verbose=False
+        )
+    job["timings"][stage] = round(time.perf_counter() - started, 4)
+    job["attempts"][stage] = tries
+    job["cached"][stage] = hit
+
+
+def run_batch(jobs, backends, concurrency=4, attempts=3, backoff=1.0, on_result=None, cache=None):
+    """Run jobs through prepare -> labels -> gpt -> upload as a pipeline.
+
+    Each stage has its own pool of ``concurrency`` threads, connected by
+    bounded queues, so different images are in different stages at the same
+    time. Only the downsized analysis copy is held between stages (the
+    original is hashed and uploaded straight from disk), so memory stays flat
+    however large the batch. A job that
+    fails a stage (after retries) skips the remaining stages.
+    """
+    done = object()
+    queues = [queue.Queue(maxsize=concurrency * 2) for _ in STAGES] + [queue.Queue()]
+    results = []
+
+    def worker(position, stage, remaining):
+        inbox, outbox = queues[position], queues[position + 1]
+        while True:
+            job = inbox.get()
+            if job is done:
+                # The last worker of a stage to finish tells the next stage
+                with remaining["lock"]:
+                    remaining["count"] -= 1
+                    last = remaining["count"] == 0
+                if last:
+                    for _ in range(concurrency if position + 1 < len(STAGES) else 1):
+                        outbox.put(done)
+                return
+            if job.get("status") != "failed":
+                try:
+                    _process_stage(stage, job, backends, attempts, backoff, cache)
+                except Exception as exc:
+                    job["status"] = "failed"
+                    job["error"] = f"{stage}: {exc}"
+                    job.pop("_bytes", None)
+                    job.pop("_labels", None)
+            outbox.put(job)
+
+    threads = []
+    for position, stage in enumerate(STAGES):
+        remaining = {"count": concurrency, "lock": threading.Lock()}
+        for _ in range(concurrency):
+            thread = threading.Thread(target=worker, args=(position, stage, remaining), daemon=True)
+            thread.start()
+            threads.append(thread)
+
+    def feed():
+        for job in jobs:
+            job.update(status="ok", timings={}, attempts={}, cached={})
+            queues[0].put(job)
+        for _ in range(concurrency):
+            queues[0].put(done)
+
+    threading.Thread(target=feed, daemon=True).start()
+
+    while True:
+        job = queues[-1].get()
+        if job is done:
+            break
+        results.append(job)
+        if on_result is not None:
+            on_result(job)
+
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def summarize_batch(results, wall_seconds):
+    """Per-stage timing statistics plus overall throughput."""
+    summary = {
+        "images": len(results),
+        "succeeded": sum(1 for job in results if job["status"] == "ok"),
+        "failed": sum(1 for job in results if job["status"] != "ok"),
+        "wall_seconds": round(wall_seconds, 3),
+        "images_per_second": round(len(results) / wall_seconds, 2) if wall_seconds else None,
+        "stages": {},
+    }
+    for stage in STAGES:
+        times = [job["timings"][stage] for job in results if stage in job["timings"]]
+        summary["stages"][stage] = {
+            "count": len(times),
+            "total_seconds": round(sum(times), 3),
+            "mean_seconds": round(sum(times) / len(times), 4) if times else None,
+            "p50_seconds": _percentile(times, 0.50),
+            "p95_seconds": _percentile(times, 0.95),
+            "max_seconds": max(times) if times else None,
+            "retries": sum(max(0, job["attempts"].get(stage, 1) - 1) for job in results),
+            "cache_hits": sum(1 for job in results if job["cached"].get(stage)),
+        }
+    return summary
+
+
+def batch_main(argv):
+    parser = argparse.ArgumentParser(description="Batch accessibility audit of many images")
+    parser.add_argument("source", help="Directory of images, or a .csv/.json/.jsonl manifest")
+    parser.add_argument("--location", default="", help="Default location for images without one")
+    parser.add_argument("--feature", default="", help="Default accessibility feature name")
+    parser.add_argument("--description", default="", help="Default description")
+    parser.add_argument("--output", default="batch_results.jsonl", help="Results file (one JSON object per image)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Threads per stage")
+    parser.add_argument("--attempts", type=int, default=3, help="Tries per stage before giving up on an image")
+    parser.add_argument("--backoff", type=float, default=1.0, help="Base retry delay in seconds (doubles per retry)")
+    parser.add_argument("--prepare-backend", choices=sorted(BACKENDS["prepare"]), default="resize",
+                        help="Downsize images for analysis (resize, needs Pillow) or send the original")
+    parser.add_argument("--labels-backend", choices=sorted(BACKENDS["labels"]), default="rekognition")
+    parser.add_argument("--gpt-backend", choices=sorted(BACKENDS["gpt"]), default="openai")
+    parser.add_argument("--upload-backend", choices=sorted(BACKENDS["upload"]), default="s3")
+    parser.add_argument("--offline", action="store_true", help="Use the stub/local backends for every stage")
+    parser.add_argument("--cache", default=CACHE_PATH, help="Result cache database (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the backends")
+    args = parser.parse_args(argv)
+
+    if args.offline:
+        args.labels_backend, args.gpt_backend, args.upload_backend = "stub", "stub", "local"
+    backends = {
+        "prepare": BACKENDS["prepare"][args.prepare_backend],
+        "labels": BACKENDS["labels"][args.labels_backend],
+        "gpt": BACKENDS["gpt"][args.gpt_backend],
+        "upload": BACKENDS["upload"][args.upload_backend],
+    }
+
+    jobs = load_jobs(args.source, args.location, args.feature, args.description)
+    print(f"Processing {len(jobs)} images "
+          f"({args.prepare_backend} -> {args.labels_backend} -> {args.gpt_backend} -> {args.upload_backend}, "
+          f"{args.concurrency} threads per stage)")
+
+    cache = None if args.no_cache else ResultCache(args.cache)
+
+    started = time.perf_counter()
+    with open(args.output, "w") as out:
+        def write_result(job):
+            record = {k: v for k, v in job.items() if not k.startswith("_")}
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            mark = "✓" if job["status"] == "ok" else "✗"
+            print(f"{mark} {os.path.basename(job['image'])}" + (f" - {job['error']}" if job.get("error") else ""))
+
+        results = run_batch(
+            jobs, backends, concurrency=max(1, args.concurrency), attempts=max(1, args.attempts),
+            backoff=args.backoff, on_result=write_result, cache=cache,
+        )
+
+    summary = summarize_batch(results, time.perf_counter() - started)
+    if cache is not None:
+        summary["cache"] = cache.summary()
+    summary_path = os.path.splitext(args.output)[0] + ".summary.json"
+    with open(summary_path, "w") as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"\nResults: {args.output}")
+    print(f"Timing summary: {summary_path}")
+    print(json.dumps(summary, indent=2))
+    return 0 if summary["failed"] == 0 else 1
+
+
 # ---------------------------
 # MAIN WORKFLOW
 # ---------------------------
 if __name__ == "__main__":
 
+    if len(sys.argv) > 1:
+        sys.exit(batch_main(sys.argv[1:]))
+
     print("Enter image file path:")
     image_path = input("> ")
 
@@ -128,25 +716,35 @@ if __name__ == "__main__":
     description = input("> ")
 
     print("\nLoading image...")
-    image_bytes = load_image(image_path)
+    image_sha256 = hash_file(image_path)
+    cache = ResultCache()
 
     print("🔍 Running Rekognition...")
-    labels = analyze_with_rekognition(image_bytes)
-    print("Detected:", labels)
+    # Decoding and resizing is the slow part, so it only happens on a cache miss
+    labels, hit = cached_call(
+        cache, "labels",
+        ResultCache.key("labels", analyze_with_rekognition, image_sha256, _analysis_variant(prepare_for_analysis)),
+        lambda: analyze_with_rekognition(prepare_for_analysis(image_path)),
+    )
+    print("Detected:", labels, "(cached)" if hit else "")
 
     print("\n🤖 Running GPT reasoning...")
-    gpt_result = analyze_with_gpt(feature_name, description, labels)
-    print("GPT Result:", gpt_result)
+    gpt_result, hit = cached_call(
+        cache, "gpt",
+        ResultCache.key("gpt", analyze_with_gpt, image_sha256, feature_name, description, _labels_text(labels)),
+        analyze_with_gpt, feature_name, description, labels,
+    )
+    print("GPT Result:", gpt_result, "(cached)" if hit else "")
 
     print("\n☁️ Uploading to S3 with metadata...")
-    s3_key = upload_to_s3(
-        image_bytes,
-        labels,
-        gpt_result,
-        location,
-        feature_name,
-        description,
-        image_path
+    s3_key, skipped = upload_once(
+        cache,
+        upload_to_s3,
+        image_sha256,
+        image_path,
+        (None, labels, gpt_result, location, feature_name, description, image_path),
     )
+    if skipped:
+        print(f"Same image already in S3 at s3://{bucket_name}/{s3_key}; skipped upload")
 
     print("\n🎉 DONE!")
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """Simple script to start CareNow server with better error handling"""
 
+import argparse
 import os
 import sys
 from pathlib import Path
@@ -14,9 +15,11 @@ def is_port_in_use(port):
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         return s.connect_ex(('localhost', port)) == 0
 
-if is_port_in_use(8000):
-    print("⚠ Port 8000 is already in use. Trying to kill existing process...")
-    os.system("lsof -ti:8000 | xargs kill -9 2>/dev/null")
+PORT = int(os.getenv("PORT", "8000"))
+
+if is_port_in_use(PORT):
+    print(f"⚠ Port {PORT} is already in use. Trying to kill existing process...")
+    os.system(f"lsof -ti:{PORT} | xargs kill -9 2>/dev/null")
     import time
     time.sleep(1)
 
@@ -31,19 +34,32 @@ except Exception as e:
 # Start server
 print("Starting CareNow server...")
 print("=" * 50)
-print("Server will be available at: http://localhost:8000")
+print(f"Server will be available at: http://localhost:{PORT}")
 print("Press Ctrl+C to stop the server")
 print("=" * 50)
 
 if __name__ == "__main__":
     import uvicorn
-    
+
+    parser = argparse.ArgumentParser(description="Start the CareNow server")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("WEB_CONCURRENCY", "1")),
+        help="Number of worker processes (default: $WEB_CONCURRENCY or 1)",
+    )
+    args = parser.parse_args()
+    if args.workers > 1:
+        # Workers keep their own snapshot and resync via the shared data-version file
+        print(f"Running {args.workers} worker processes")
+
     try:
         uvicorn.run(
             "server:app",
             host="0.0.0.0",
-            port=int(os.getenv("PORT", "8000")),
+            port=PORT,
             reload=False,  # Disable reload for more stable startup
+            workers=args.workers,
             log_level="info",
         )
     except KeyboardInterrupt:
@@ -1,21 +1,55 @@
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+import bisect
+import codecs
+import csv
+import gzip
+import hashlib
+import heapq
+import io
 import json
 import math
+import mimetypes
+import mmap
 import os
 import pickle
 import re
+import struct
+import sys
+import tempfile
+import threading
 import uuid
-from collections import defaultdict
-from datetime import datetime, timezone
+from array import array
+from collections import Counter, OrderedDict, defaultdict, deque
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
-import boto3
-from botocore.exceptions import ClientError
 from dotenv import load_dotenv
-from fastapi import FastAPI, Form, HTTPException, Query
-from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, Form, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-worker mode only
+    fcntl = None
+
+try:
+    import brotli  # optional: adds a br variant next to gzip
+except ImportError:
+    brotli = None
+
+try:
+    import pyarrow  # optional: enables Parquet exports
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
 
 load_dotenv()
 
@@ -24,21 +58,151 @@ S3_BUCKET = os.getenv("CARENOW_BUCKET") or os.getenv("S3_BUCKET_NAME")
 CHECKINS_INDEX_KEY = os.getenv("CHECKINS_INDEX_KEY", "checkins/index.json")
 CLINICS_INDEX_KEY = os.getenv("CLINICS_INDEX_KEY", "clinics/index.json")
 MODEL_KEY = os.getenv("MODEL_KEY", "models/wait_time_predictor.pkl")
+# The predictor is stored as a small header at MODEL_KEY plus this many
+# partitions of per-clinic stats, so a check-in rewrites only its own partition
+MODEL_PARTITIONS = max(1, int(os.getenv("CARENOW_MODEL_PARTITIONS", "32")))
+CHECKPOINT_KEY = os.getenv("CHECKPOINT_KEY", "checkpoints/state.pkl")
+SHARDS_PREFIX = os.getenv("SHARDS_PREFIX", "shards")
 
 # Use local storage if S3_BUCKET is not set (for development)
 USE_LOCAL_STORAGE = not S3_BUCKET
 if USE_LOCAL_STORAGE:
-    DATA_DIR = Path(__file__).parent / "data"
-    DATA_DIR.mkdir(exist_ok=True)
+    DATA_DIR = Path(os.getenv("CARENOW_DATA_DIR") or Path(__file__).parent / "data")
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
     print(f"Using local file storage in {DATA_DIR}")
     s3_client = None  # Not needed for local storage
+
+    class ClientError(Exception):
+        """Stand-in so S3-only except clauses stay valid without botocore."""
+
+        def __init__(self, error_response: Optional[Dict[str, Any]] = None, operation_name: str = ""):
+            super().__init__(error_response, operation_name)
+            self.response = error_response or {}
 else:
+    # boto3/botocore add noticeably to import time, so only load them for S3 mode
+    import boto3
+    from botocore.exceptions import ClientError
+
     s3_client = boto3.client("s3", region_name=AWS_REGION)
     print(f"Using S3 storage: {S3_BUCKET}")
 
+# Per-host scratch space shared by all workers (data-version counters etc.)
+RUNTIME_DIR = Path(
+    os.getenv("CARENOW_RUNTIME_DIR")
+    or (DATA_DIR if USE_LOCAL_STORAGE else Path(tempfile.gettempdir()) / "carenow")
+)
+
+# Read-through cache in front of S3 reads (S3 mode only): seconds a cached copy
+# is served without asking S3 (then it is revalidated with a conditional GET),
+# per-key overrides ("key=seconds,..."), memory budget, and an on-disk copy
+# shared by the workers on a host ("" keeps it in memory only)
+S3_CACHE_ENABLED = os.getenv("CARENOW_S3_CACHE", "1") != "0"
+S3_CACHE_TTL_SECONDS = float(os.getenv("CARENOW_S3_CACHE_TTL", "30"))
+S3_CACHE_TTLS = {
+    key.strip(): float(seconds)
+    for key, _, seconds in (
+        item.partition("=") for item in os.getenv("CARENOW_S3_CACHE_TTLS", "").split(",") if item.strip()
+    )
+}
+S3_CACHE_MEMORY_MB = float(os.getenv("CARENOW_S3_CACHE_MEMORY_MB", "256"))
+S3_CACHE_DIR = os.getenv("CARENOW_S3_CACHE_DIR", str(RUNTIME_DIR / "s3_cache"))
+
+# Which WaitTimePredictor mode serves predictions: "classic" or "joint"
+# (7x24 time-decayed grid). Switching modes retrains from the check-in history.
+PREDICTOR_MODE = os.getenv("CARENOW_PREDICTOR_MODE", "classic")
+PREDICTOR_HALF_LIFE_HOURS = float(os.getenv("CARENOW_PREDICTOR_HALF_LIFE_HOURS", str(24 * 14)))
+
+# Per-clinic wait-time quantile sketches (p50/p90): accuracy parameter and
+# whether to also keep one sketch per clinic-hour
+SKETCH_K = int(os.getenv("CARENOW_SKETCH_K", "64"))
+SKETCH_PER_HOUR = os.getenv("CARENOW_SKETCH_PER_HOUR", "0") == "1"
+
+# Reports leave the 7-day window (recent_reports, current_condition...) on a timer;
+# this is the longest the expiry task sleeps when nothing is due
+EXPIRY_MAX_SLEEP_SECONDS = float(os.getenv("CARENOW_EXPIRY_MAX_SLEEP", "300"))
+
+# Write a checkpoint of the derived state (clinic aggregates, predictor) every
+# this many check-ins so a restart only replays the check-ins after it (0 disables)
+CHECKPOINT_EVERY = int(os.getenv("CARENOW_CHECKPOINT_EVERY", "1000"))
+
+# Static assets are held in memory with precompressed variants. Unversioned
+# asset URLs get STATIC_MAX_AGE; URLs carrying the content hash (?v=) are immutable.
+STATIC_CACHE_ENABLED = os.getenv("CARENOW_STATIC_CACHE", "1") != "0"
+STATIC_MAX_AGE = int(os.getenv("CARENOW_STATIC_MAX_AGE", "3600"))
+STATIC_IMMUTABLE_MAX_AGE = 31536000
+
+# Base grid for clinic grouping (~11km cells) and the map's cluster hierarchy
+LOCATION_BUCKET_DEG = 0.1
+CLUSTER_LEVELS = int(os.getenv("CARENOW_CLUSTER_LEVELS", "8"))
+CLUSTER_MAX_ZOOM = int(os.getenv("CARENOW_CLUSTER_MAX_ZOOM", "11"))
+
+# Geographic sharding: store clinics and check-ins per square of this many
+# degrees (rounded to a multiple of the location bucket; 0 keeps a single
+# index), keeping at most this much shard data in memory
+SHARD_DEG = float(os.getenv("CARENOW_SHARD_DEG", "0"))
+SHARD_MEMORY_MB = float(os.getenv("CARENOW_SHARD_MEMORY_MB", "512"))
+
+# /clinics/best ranks by minutes until seen: travel at this speed, the predicted
+# wait, and up to this many minutes extra for a clinic with no reliability
+BEST_TRAVEL_SPEED_KMH = float(os.getenv("CARENOW_TRAVEL_SPEED_KMH", "30"))
+BEST_RELIABILITY_PENALTY_MINUTES = float(os.getenv("CARENOW_RELIABILITY_PENALTY", "0"))
+
+# Exports (/export/*, export.py) are written in chunks of this many rows
+EXPORT_CHUNK_ROWS = int(os.getenv("CARENOW_EXPORT_CHUNK_ROWS", "5000"))
+
+# Live map updates: how often each worker checks for other workers' writes, and
+# how often idle event streams get a keep-alive comment
+STREAM_POLL_SECONDS = float(os.getenv("CARENOW_STREAM_POLL", "1.0"))
+STREAM_KEEPALIVE_SECONDS = float(os.getenv("CARENOW_STREAM_KEEPALIVE", "20"))
+
+# How long POST /checkins remembers idempotency keys and check-in fingerprints
+# so client retries return the original record instead of a duplicate
+DEDUP_WINDOW_SECONDS = float(os.getenv("CARENOW_DEDUP_WINDOW_SECONDS", str(24 * 3600)))
+
+# Admission control for POST /checkins: token buckets per client IP and per
+# clinic (requests per minute, burst size; a rate of 0 disables), and the number
+# of writes allowed to queue for the write lock before new ones are shed
+WRITE_RATE_PER_CLIENT = float(os.getenv("CARENOW_WRITE_RATE_PER_CLIENT", "30"))
+WRITE_BURST_PER_CLIENT = float(os.getenv("CARENOW_WRITE_BURST_PER_CLIENT", "10"))
+WRITE_RATE_PER_CLINIC = float(os.getenv("CARENOW_WRITE_RATE_PER_CLINIC", "60"))
+WRITE_BURST_PER_CLINIC = float(os.getenv("CARENOW_WRITE_BURST_PER_CLINIC", "20"))
+MAX_PENDING_WRITES = int(os.getenv("CARENOW_MAX_PENDING_WRITES", "8"))
+# Use the first X-Forwarded-For address as the client IP (only behind a trusted proxy)
+TRUST_FORWARDED_FOR = os.getenv("CARENOW_TRUST_FORWARDED_FOR", "0") == "1"
+
+# Cold-start timings reported by /health
+STARTUP_METRICS: Dict[str, Optional[float]] = {
+    "import_seconds": None,
+    "warmup_seconds": None,
+    "first_response_seconds": None,
+}
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    """Build the clinic snapshot and predictor before the port accepts traffic."""
+    started = time.perf_counter()
+    _get_static_assets()
+    _get_snapshot()
+    STARTUP_METRICS["warmup_seconds"] = round(time.perf_counter() - started, 4)
+    print(
+        f"Warm-up complete in {STARTUP_METRICS['warmup_seconds']}s "
+        f"(import {STARTUP_METRICS['import_seconds']}s)"
+    )
+    _broadcaster.bind(asyncio.get_running_loop())
+    watcher = asyncio.create_task(_watch_clinic_updates())
+    expirer = asyncio.create_task(_expire_recent_reports_loop())
+    try:
+        yield
+    finally:
+        watcher.cancel()
+        expirer.cancel()
+
+
 app = FastAPI(
     title="CareNow",
     description="AI-driven, crowdsourced clinic wait-time predictor",
+    lifespan=_lifespan,
 )
 
 app.add_middleware(
@@ -51,11 +215,92 @@ app.add_middleware(
 
 STATIC_DIR = Path(__file__).parent / "static"
 STATIC_DIR.mkdir(exist_ok=True)
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
 
-from collections import defaultdict
-from datetime import datetime, timezone
+class QuantileSketch:
+    """KLL-style mergeable quantile sketch over a plain-dict state.
+
+    Level h holds samples of weight 2**h. When the sketch is full, the lowest
+    full level is sorted and every other item is promoted, so memory stays
+    around ``3 * k`` items however many values are added. The state is a
+    JSON/pickle friendly dict (``{"k", "n", "levels"}``) stored directly
+    inside predictor stats; this class only wraps it.
+    """
+
+    def __init__(self, state: Optional[dict] = None, k: int = 64):
+        if state is None:
+            state = {"k": int(k), "n": 0, "levels": [[]]}
+        self.state = state
+
+    @property
+    def count(self) -> int:
+        return self.state["n"]
+
+    def _capacity(self, level: int) -> int:
+        height = len(self.state["levels"])
+        return max(2, int(math.ceil(self.state["k"] * (2.0 / 3.0) ** (height - level - 1))))
+
+    def add(self, value: float) -> None:
+        level0 = self.state["levels"][0]
+        level0.append(round(float(value), 1))
+        self.state["n"] += 1
+        if len(level0) >= self._capacity(0):
+            self._compress()
+
+    def _coin(self, level: int) -> int:
+        """Deterministic pseudo-random bit (Knuth multiplicative hash of n and level)."""
+        return ((self.state["n"] * 2654435761 + level * 40503) >> 13) & 1
+
+    def _compress(self) -> None:
+        """Compact one full level at a time until the sketch fits its budget."""
+        levels = self.state["levels"]
+        while sum(len(items) for items in levels) >= sum(self._capacity(h) for h in range(len(levels))):
+            for level, items in enumerate(levels):
+                if len(items) < self._capacity(level):
+                    continue
+                if level + 1 == len(levels):
+                    levels.append([])
+                items = sorted(items)
+                # An odd item stays behind so the promoted half carries exactly half the weight
+                keep = [items.pop()] if len(items) % 2 else []
+                levels[level] = keep
+                levels[level + 1].extend(items[self._coin(level)::2])
+                break
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """Fold another sketch into this one (e.g. from a rebuild or another worker)."""
+        levels = self.state["levels"]
+        for level, items in enumerate(other.state["levels"]):
+            if level == len(levels):
+                levels.append([])
+            levels[level].extend(items)
+        self.state["n"] += other.state["n"]
+        self._compress()
+        return self
+
+    def quantiles(self, qs) -> List[Optional[float]]:
+        """Approximate values at each quantile in ``qs`` (None when empty)."""
+        weighted = sorted(
+            (value, 1 << level)
+            for level, items in enumerate(self.state["levels"])
+            for value in items
+        )
+        if not weighted:
+            return [None for _ in qs]
+        total = sum(weight for _, weight in weighted)
+        results = []
+        for q in qs:
+            target = q * total
+            running = 0
+            answer = weighted[-1][0]
+            for value, weight in weighted:
+                running += weight
+                if running >= target:
+                    answer = value
+                    break
+            results.append(answer)
+        return results
+
 
 class WaitTimePredictor:
     """
@@ -65,18 +310,46 @@ class WaitTimePredictor:
     - Same-weekday patterns
     - Recent-trend projection
     - Bias factor to ensure prediction ≠ latest report
+
+    With ``mode="joint"`` it additionally keeps a 7x24 weekday-by-hour grid of
+    exponentially time-decayed sums per clinic and predicts from the target
+    slot itself, shrunk towards the same-hour and overall decayed means.
+
+    In both modes every clinic also carries a :class:`QuantileSketch` of its
+    reported waits (optionally one per hour of day too) for p50/p90 bands.
     """
 
+    MODES = ("classic", "joint")
+    JOINT_SLOTS = 7 * 24
+    PRIOR_WEIGHT = 2.0  # pseudo-observations pulling sparse slots towards their parent mean
+    MIN_HOUR_SKETCH_SAMPLES = 5  # below this an hour's quantiles fall back to the clinic sketch
+
     def __init__(
         self,
         default_wait: float = 30.0,
         max_history: int = 20,       # how many recent waits to keep for trend
+        mode: str = "classic",
+        half_life_hours: float = 24.0 * 14,
+        sketch_k: int = 64,
+        sketch_per_hour: bool = False,
     ):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown predictor mode: {mode}")
         self.default_wait = float(default_wait)
         self.max_history = max(5, int(max_history))
+        self.mode = mode
+        self.half_life_hours = max(1.0, float(half_life_hours))
+        self.sketch_k = max(8, int(sketch_k))
+        self.sketch_per_hour = bool(sketch_per_hour)
+        # Hour and weekday slots are UTC (models stored before this used the client's offset)
+        self.utc_hours = True
 
         # Stats per clinic_id
-        self.stats = {}  # { clinic_id: { "overall":..., "hourly":..., "weekday":..., "recent":... } }
+        self.stats = {}  # { clinic_id: { "overall":..., "hourly":..., "weekday":..., "recent":..., "sketch":..., ["joint"] } }
+
+        # Stored partition versions and members this instance reflects (set by _load_model/_save_model)
+        self.part_versions: Optional[List[int]] = None
+        self.part_members: Dict[int, set] = {}
 
 
     # -----------------------------
@@ -97,19 +370,65 @@ class WaitTimePredictor:
                 "overall": {"total": 0.0, "count": 0},
                 "hourly": {},        # "14": {"total":..., "count":..., "value":...}
                 "weekday": {},       # "2": {"total":..., "count":..., "value":...}
-                "recent": []         # list of floats
+                "recent": [],        # list of floats
+                "sketch": QuantileSketch(k=self.sketch_k).state,
             }
+            if self.sketch_per_hour:
+                self.stats[clinic_id]["hour_sketches"] = {}  # "14": sketch state
+            if self.mode == "joint":
+                self.stats[clinic_id]["joint"] = self._empty_joint()
         return self.stats[clinic_id]
 
+    def _empty_joint(self):
+        """Decayed sums/weights per weekday*24+hour slot, plus a clinic-wide total."""
+        return {
+            "sum": [0.0] * self.JOINT_SLOTS,
+            "weight": [0.0] * self.JOINT_SLOTS,
+            "ts": [0.0] * self.JOINT_SLOTS,
+            "total": {"sum": 0.0, "weight": 0.0, "ts": 0.0},
+        }
+
+    def _decay(self, from_ts: float, to_ts: float) -> float:
+        """Multiplier applied to sums/weights aged from ``from_ts`` to ``to_ts`` (epoch seconds)."""
+        return 0.5 ** ((to_ts - from_ts) / 3600.0 / self.half_life_hours)
+
+    def _decayed_add(self, sums, weights, stamps, i, value, ts):
+        """Fold one observation into a decayed accumulator in O(1)."""
+        if weights[i] == 0.0 or ts >= stamps[i]:
+            factor = self._decay(stamps[i], ts) if weights[i] else 0.0
+            sums[i] = sums[i] * factor + value
+            weights[i] = weights[i] * factor + 1.0
+            stamps[i] = ts
+        else:
+            # Late, out-of-order report: age the observation instead of the accumulator
+            factor = self._decay(ts, stamps[i])
+            sums[i] += value * factor
+            weights[i] += factor
+
 
     # -----------------------------
     # UPDATE MODEL WITH NEW DATA
     # -----------------------------
-    def update(self, clinic_id, hour, weekday, condition, actual_wait, predicted=None):
-        """Update all stats with new wait time."""
+    def update(self, clinic_id, hour, weekday, condition, actual_wait, predicted=None, timestamp=None):
+        """Update all stats with new wait time.
+
+        ``timestamp`` (epoch seconds of the visit) drives decay in joint mode;
+        it defaults to now.
+        """
         clinic = self._get_clinic(clinic_id)
         wait = self._safe_float(actual_wait, self.default_wait)
 
+        # ---- Joint weekday x hour slot (decayed) ----
+        if self.mode == "joint":
+            ts = time.time() if timestamp is None else float(timestamp)
+            grid = clinic.setdefault("joint", self._empty_joint())
+            slot = (int(weekday) % 7) * 24 + int(hour) % 24
+            self._decayed_add(grid["sum"], grid["weight"], grid["ts"], slot, wait, ts)
+            total = grid["total"]
+            sums, weights, stamps = [total["sum"]], [total["weight"]], [total["ts"]]
+            self._decayed_add(sums, weights, stamps, 0, wait, ts)
+            total["sum"], total["weight"], total["ts"] = sums[0], weights[0], stamps[0]
+
         # ---- Overall stats ----
         clinic["overall"]["total"] += wait
         clinic["overall"]["count"] += 1
@@ -133,11 +452,58 @@ class WaitTimePredictor:
         if len(clinic["recent"]) > self.max_history:
             clinic["recent"] = clinic["recent"][-self.max_history:]
 
+        # ---- Quantile sketches (p50/p90) ----
+        QuantileSketch(clinic.setdefault("sketch", QuantileSketch(k=self.sketch_k).state)).add(wait)
+        if self.sketch_per_hour:
+            hour_sketches = clinic.setdefault("hour_sketches", {})
+            QuantileSketch(hour_sketches.setdefault(hkey, QuantileSketch(k=self.sketch_k).state)).add(wait)
+
+
+    # -----------------------------
+    # WAIT-TIME QUANTILES
+    # -----------------------------
+    def quantiles(self, clinic_id, hour=None, qs=(0.5, 0.9)):
+        """Approximate wait-time quantiles for a clinic (None per q if unseen).
+
+        With per-hour sketches enabled and ``hour`` given, that hour's sketch
+        is used once it has enough samples; otherwise the clinic-wide one.
+        """
+        clinic = self.stats.get(clinic_id)
+        if not clinic or "sketch" not in clinic:
+            return [None for _ in qs]
+        state = clinic["sketch"]
+        if hour is not None:
+            hour_state = clinic.get("hour_sketches", {}).get(str(int(hour) % 24))
+            if hour_state and hour_state["n"] >= self.MIN_HOUR_SKETCH_SAMPLES:
+                state = hour_state
+        return QuantileSketch(state).quantiles(qs)
+
+    def merge_sketches(self, clinic_ids, hour=None, qs=(0.5, 0.9)):
+        """Quantiles over several clinics at once by merging copies of their sketches."""
+        merged = QuantileSketch(k=self.sketch_k)
+        for clinic_id in clinic_ids:
+            clinic = self.stats.get(clinic_id) or {}
+            state = clinic.get("sketch")
+            if hour is not None:
+                state = clinic.get("hour_sketches", {}).get(str(int(hour) % 24), state)
+            if state:
+                merged.merge(QuantileSketch({"k": state["k"], "n": state["n"], "levels": [list(l) for l in state["levels"]]}))
+        return merged.quantiles(qs)
+
+    def missing_sketches(self) -> bool:
+        """True if some clinic with history predates sketches (e.g. an older saved model)."""
+        return any(
+            cstats["overall"]["count"] and (
+                "sketch" not in cstats or (self.sketch_per_hour and "hour_sketches" not in cstats)
+            )
+            for cstats in self.stats.values()
+        )
+
 
     # -----------------------------
     # PREDICT NEXT HOUR
     # -----------------------------
-    def predict(self, clinic_id, hour, weekday, condition, fallback=None):
+    def predict(self, clinic_id, hour, weekday, condition, fallback=None, timestamp=None):
         """
         Predict next-hour wait time using:
         - overall average
@@ -145,20 +511,35 @@ class WaitTimePredictor:
         - same-weekday average
         - recent trend projection
         - forward bias so prediction ≠ latest report
+
+        In joint mode the (weekday, hour) slot following ``hour`` is looked up
+        directly instead; see :meth:`_predict_joint`.
         """
 
         fallback = self.default_wait if fallback is None else fallback
         clinic = self._get_clinic(clinic_id)
 
+        if self.mode == "joint":
+            ts = time.time() if timestamp is None else float(timestamp)
+            target_hour = (int(hour) + 1) % 24
+            target_wday = (int(weekday) + (1 if int(hour) % 24 == 23 else 0)) % 7
+            return self._predict_joint(clinic, target_wday, target_hour, fallback, ts)
+
+        terms = self._classic_terms(clinic)
+        if terms is None:
+            return float(fallback)
+        return self._classic_blend(terms, terms[0])
+
+    def _classic_terms(self, clinic):
+        """``(hourly_avg, weekday_avg, overall_avg, trend_proj, bias)`` of the classic blend, or None if unseen."""
         # ========== Pull Stats Safely ==========
         overall = clinic["overall"]
         if overall["count"] == 0:
-            return float(fallback)
+            return None
 
         overall_avg = overall["total"] / overall["count"]
 
         # ---- Hourly average ----
-        next_hour = str((int(hour) + 1) % 24)
         hourly_vals = []
         for entry in clinic["hourly"].values():
             val = self._safe_float(entry.get("value"))
@@ -171,7 +552,6 @@ class WaitTimePredictor:
         )
 
         # ---- Weekday average ----
-        next_wday = str((int(weekday) + 1) % 7)
         weekday_vals = []
         for entry in clinic["weekday"].values():
             val = self._safe_float(entry.get("value"))
@@ -207,14 +587,6 @@ class WaitTimePredictor:
         if trend_proj is None:
             trend_proj = recent[-1] if recent else overall_avg
 
-        # ======== Combine Predictions ========
-        prediction = (
-            0.40 * hourly_avg +
-            0.30 * weekday_avg +
-            0.20 * overall_avg +
-            0.10 * trend_proj
-        )
-
         # ======== Forward Bias (prevents = latest) ========
         history_len = len(recent)
         trend_conf = min(1.0, history_len / 12)
@@ -222,10 +594,106 @@ class WaitTimePredictor:
         base_bias = 0.10          # always +10%
         dynamic = 0.15 * trend_conf
 
-        prediction *= (1 + base_bias + dynamic)
+        return hourly_avg, weekday_avg, overall_avg, trend_proj, 1 + base_bias + dynamic
+
+    @staticmethod
+    def _classic_blend(terms, hour_avg):
+        """Combine the classic terms, with ``hour_avg`` as the hour-of-day term."""
+        _, weekday_avg, overall_avg, trend_proj, bias = terms
+        prediction = (
+            0.40 * hour_avg +
+            0.30 * weekday_avg +
+            0.20 * overall_avg +
+            0.10 * trend_proj
+        )
+        prediction *= bias
 
         # Ensure ≥ 0
         return max(0.0, float(prediction))
+
+    def _slot_at(self, grid, i, ts):
+        """(sum, weight) of one grid slot decayed to ``ts``."""
+        weight = grid["weight"][i]
+        if weight <= 0:
+            return 0.0, 0.0
+        factor = self._decay(grid["ts"][i], ts) if ts > grid["ts"][i] else 1.0
+        return grid["sum"][i] * factor, weight * factor
+
+    def _predict_joint(self, clinic, weekday, hour, fallback, ts):
+        """Decayed mean of one (weekday, hour) slot with hierarchical shrinkage.
+
+        slot mean -> shrunk towards the same-hour mean over all weekdays ->
+        shrunk towards the clinic's overall decayed mean. Constant work per call.
+        """
+        grid = clinic.get("joint")
+        if not grid or grid["total"]["weight"] <= 0:
+            return float(fallback)
+
+        total = grid["total"]
+        overall_mean = total["sum"] / total["weight"]
+        k = self.PRIOR_WEIGHT
+
+        hour_sum = hour_weight = 0.0
+        for day in range(7):
+            day_sum, day_weight = self._slot_at(grid, day * 24 + hour, ts)
+            hour_sum += day_sum
+            hour_weight += day_weight
+        hour_mean = (hour_sum + k * overall_mean) / (hour_weight + k)
+
+        slot_sum, slot_weight = self._slot_at(grid, weekday * 24 + hour, ts)
+        prediction = (slot_sum + k * hour_mean) / (slot_weight + k)
+        return max(0.0, float(prediction))
+
+    # -----------------------------
+    # FORECAST NEXT N HOURS
+    # -----------------------------
+    def forecast(self, clinic_id, hour, weekday, condition, hours=24, fallback=None, timestamp=None):
+        """Predicted waits for each of the next ``hours`` hours after ``hour``.
+
+        In joint mode step ``i`` matches ``predict`` called at ``hour + i``
+        (and one hour later ``timestamp``), but the grid is decayed once and
+        each step only rescales it by the extra hours of decay. The classic
+        blend's hour term is the mean over all hours, which would make the
+        curve flat; here each step uses its own hour's mean instead, shrunk
+        towards that overall hour mean by ``PRIOR_WEIGHT`` reports.
+        """
+        hours = max(0, int(hours))
+        fallback = self.default_wait if fallback is None else fallback
+        if self.mode != "joint":
+            clinic = self._get_clinic(clinic_id)
+            terms = self._classic_terms(clinic)
+            if terms is None:
+                return [float(fallback)] * hours
+            k = self.PRIOR_WEIGHT
+            hour_avgs = []
+            for h in range(24):
+                bucket = clinic["hourly"].get(str(h))
+                count = bucket["count"] if bucket else 0
+                total = bucket["total"] if bucket else 0.0
+                hour_avgs.append((total + k * terms[0]) / (count + k))
+            return [self._classic_blend(terms, hour_avgs[(int(hour) + step + 1) % 24]) for step in range(hours)]
+
+        ts = time.time() if timestamp is None else float(timestamp)
+        grid = self._get_clinic(clinic_id).get("joint")
+        if not grid or grid["total"]["weight"] <= 0:
+            return [max(0.0, float(fallback))] * hours
+
+        k = self.PRIOR_WEIGHT
+        overall_mean = grid["total"]["sum"] / grid["total"]["weight"]
+        slots = [self._slot_at(grid, i, ts) for i in range(self.JOINT_SLOTS)]
+        hour_sums = [sum(slots[day * 24 + h][0] for day in range(7)) for h in range(24)]
+        hour_weights = [sum(slots[day * 24 + h][1] for day in range(7)) for h in range(24)]
+
+        curve = []
+        start = (int(weekday) % 7) * 24 + int(hour) % 24
+        for step in range(hours):
+            target = (start + step + 1) % self.JOINT_SLOTS
+            h = target % 24
+            aged = 0.5 ** (step / self.half_life_hours)
+            hour_mean = (hour_sums[h] * aged + k * overall_mean) / (hour_weights[h] * aged + k)
+            slot_sum, slot_weight = slots[target]
+            curve.append(max(0.0, float((slot_sum * aged + k * hour_mean) / (slot_weight * aged + k))))
+        return curve
     
         # ---------------------------------------------------------
     # SAVE → dict
@@ -235,6 +703,11 @@ class WaitTimePredictor:
         return {
             "default_wait": self.default_wait,
             "max_history": self.max_history,
+            "mode": self.mode,
+            "half_life_hours": self.half_life_hours,
+            "sketch_k": self.sketch_k,
+            "sketch_per_hour": self.sketch_per_hour,
+            "utc_hours": self.utc_hours,
             "stats": self.stats,
         }
 
@@ -247,7 +720,12 @@ class WaitTimePredictor:
         obj = cls(
             default_wait=data.get("default_wait", 30.0),
             max_history=data.get("max_history", 20),
+            mode=data.get("mode", "classic"),
+            half_life_hours=data.get("half_life_hours", 24.0 * 14),
+            sketch_k=data.get("sketch_k", 64),
+            sketch_per_hour=data.get("sketch_per_hour", False),
         )
+        obj.utc_hours = bool(data.get("utc_hours", False))
 
         stats = data.get("stats", {})
 
@@ -284,60 +762,796 @@ class WaitTimePredictor:
                 float(x) for x in cstats.get("recent", []) if str(x).replace('.', '', 1).isdigit()
             ]
 
+            # joint weekday x hour grid (joint mode only)
+            joint = cstats.get("joint")
+            if obj.mode == "joint" and joint and len(joint.get("sum", [])) == cls.JOINT_SLOTS:
+                obj.stats[cid]["joint"] = {
+                    "sum": [float(v) for v in joint["sum"]],
+                    "weight": [float(v) for v in joint["weight"]],
+                    "ts": [float(v) for v in joint["ts"]],
+                    "total": {k: float(joint["total"].get(k, 0.0)) for k in ("sum", "weight", "ts")},
+                }
+            elif obj.mode == "joint":
+                obj.stats[cid]["joint"] = obj._empty_joint()
+
+            # quantile sketches (absent in models saved before they existed)
+            sketch = cls._load_sketch(cstats.get("sketch"))
+            if sketch is not None:
+                obj.stats[cid]["sketch"] = sketch
+            if obj.sketch_per_hour and isinstance(cstats.get("hour_sketches"), dict):
+                obj.stats[cid]["hour_sketches"] = {
+                    str(h): state
+                    for h, state in (
+                        (h, cls._load_sketch(v)) for h, v in cstats["hour_sketches"].items()
+                    )
+                    if state is not None
+                }
+
         return obj
 
-def _read_static_page(filename: str) -> str:
-    path = STATIC_DIR / filename
-    if not path.exists():
+    @staticmethod
+    def _load_sketch(data):
+        """Sanitize a stored sketch state, or None if missing/malformed."""
+        try:
+            return {
+                "k": int(data["k"]),
+                "n": int(data["n"]),
+                "levels": [[float(v) for v in level] for level in data["levels"]] or [[]],
+            }
+        except (KeyError, TypeError, ValueError):
+            return None
+
+class StaticAsset:
+    """A static file held in memory with its precompressed variants and ETags.
+
+    Each encoding gets its own strong ETag (``-gz``/``-br`` suffixes): the
+    bodies differ byte for byte, so a cache must not treat them as one.
+    """
+
+    COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+    ETAG_SUFFIXES = {"identity": "", "gzip": "-gz", "br": "-br"}
+
+    def __init__(self, name: str, body: bytes):
+        self.name = name
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type in ("application/javascript", "image/svg+xml"):
+            content_type += "; charset=utf-8"
+        self.content_type = content_type
+        self.digest = hashlib.sha256(body).hexdigest()
+        self.etag = '"' + self.digest[:16] + '"'
+        self.variants: Dict[str, bytes] = {"identity": body}
+        if content_type.startswith(self.COMPRESSIBLE_TYPES) and len(body) >= 512:
+            gz = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(gz) < len(body):
+                self.variants["gzip"] = gz
+            if brotli is not None:
+                br = brotli.compress(body, quality=11)
+                if len(br) < len(body):
+                    self.variants["br"] = br
+
+    @property
+    def version(self) -> str:
+        return self.etag.strip('"')[:8]
+
+    def etag_for(self, encoding: str) -> str:
+        return self.etag[:-1] + self.ETAG_SUFFIXES[encoding] + '"'
+
+    def response(self, request: Request, cache_control: str) -> Response:
+        """Serve the best encoding the client accepts, or 304 if its copy is current."""
+        accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+        encoding = next((e for e in ("br", "gzip") if e in self.variants and e in accepted), "identity")
+        etag = self.etag_for(encoding)
+        headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if_none_match = request.headers.get("if-none-match", "")
+        if etag in if_none_match or if_none_match.strip() == "*":
+            return Response(status_code=304, headers=headers)
+
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(self.variants[encoding], media_type=self.content_type, headers=headers)
+
+
+def _accepted_encodings(header: str) -> set:
+    """Encodings from an Accept-Encoding header, ignoring those with q=0."""
+    accepted = set()
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if token:
+            accepted.add(token.strip().lower())
+    return accepted
+
+
+_STATIC_REF = re.compile(r'((?:href|src)=")/static/([^"?#]+)(")')
+_static_assets: Optional[Dict[str, StaticAsset]] = None
+
+
+def _load_static_assets(previous: Optional[Dict[str, StaticAsset]] = None) -> Dict[str, StaticAsset]:
+    """Read every file under static/ once, pinning HTML asset links to content hashes.
+
+    Assets whose bytes match one in ``previous`` are reused rather than compressed again.
+    """
+    previous = previous or {}
+    assets: Dict[str, StaticAsset] = {}
+
+    def load(name: str, body: bytes) -> StaticAsset:
+        asset = previous.get(name)
+        if asset is not None and asset.digest == hashlib.sha256(body).hexdigest():
+            return asset
+        return StaticAsset(name, body)
+
+    html_files = []
+    for path in sorted(STATIC_DIR.rglob("*")):
+        if not path.is_file() or path.name.startswith("."):
+            continue
+        name = path.relative_to(STATIC_DIR).as_posix()
+        if path.suffix == ".html":
+            html_files.append((name, path))
+        else:
+            assets[name] = load(name, path.read_bytes())
+
+    def pin_version(match: "re.Match") -> str:
+        asset = assets.get(match.group(2))
+        if asset is None:
+            return match.group(0)
+        return f"{match.group(1)}/static/{match.group(2)}?v={asset.version}{match.group(3)}"
+
+    for name, path in html_files:
+        html = _STATIC_REF.sub(pin_version, path.read_text(encoding="utf-8"))
+        assets[name] = load(name, html.encode("utf-8"))
+    return assets
+
+
+def _get_static_assets() -> Dict[str, StaticAsset]:
+    """In-memory static assets (re-read on every call when the cache is disabled).
+
+    Re-reading only picks up edits; unchanged files keep their compressed variants.
+    """
+    global _static_assets
+    if _static_assets is None or not STATIC_CACHE_ENABLED:
+        _static_assets = _load_static_assets(_static_assets)
+    return _static_assets
+
+
+def _static_page_response(request: Request, filename: str) -> Response:
+    asset = _get_static_assets().get(filename)
+    if asset is None:
         raise HTTPException(status_code=500, detail=f"Missing static asset: {filename}")
-    return path.read_text(encoding="utf-8")
+    # Pages always revalidate so new asset versions are picked up immediately
+    return asset.response(request, "no-cache")
 
 
-def _load_checkins() -> List[Dict[str, Any]]:
-    """Load all check-ins from S3 or local storage"""
-    if USE_LOCAL_STORAGE:
-        file_path = DATA_DIR / CHECKINS_INDEX_KEY.replace("/", "_")
-        if file_path.exists():
+class DataVersion:
+    """Generation counters shared by every worker process through an mmap'd file.
+
+    Each slot is bumped after a write to the matching stored object, so a worker
+    can compare a few bytes per request and reload only the parts that changed.
+    """
+
+    SLOTS = ("checkins", "model", "clinics")
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._format = f"<{len(self.SLOTS)}Q"
+        size = struct.calcsize(self._format)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._mmap = mmap.mmap(self._fd, size)
+        self._thread_lock = threading.RLock()
+        self._depth = 0  # nesting of locked() in the thread holding _thread_lock
+
+    def read(self) -> Tuple[int, ...]:
+        """Current counters, one per slot."""
+        return struct.unpack_from(self._format, self._mmap, 0)
+
+    @contextmanager
+    def locked(self):
+        """Exclusive cross-process lock, held around read-modify-write of the data.
+
+        Reentrant: flock on one fd does not nest (the inner unlock would drop
+        the outer hold) and does not exclude threads of this process, so a
+        thread lock and a depth count sit in front of it.
+        """
+        with self._thread_lock:
+            if self._depth == 0 and fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            self._depth += 1
             try:
-                return json.loads(file_path.read_text())
-            except (json.JSONDecodeError, IOError):
-                return []
-        return []
-    else:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0 and fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def bump(self, *slots: str) -> Tuple[int, ...]:
+        """Increment the given slots and return the new counters."""
+        with self.locked():
+            values = list(self.read())
+            for slot in slots:
+                values[self.SLOTS.index(slot)] += 1
+            struct.pack_into(self._format, self._mmap, 0, *values)
+            return tuple(values)
+
+
+_data_version = DataVersion(RUNTIME_DIR / ".data_version")
+
+
+def _atomic_write(file_path: Path, data: bytes) -> None:
+    """Write via a temp file and rename so other workers never read a partial file."""
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = file_path.with_name(f".{file_path.name}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, file_path)
+
+
+class S3ReadCache:
+    """Read-through cache of S3 object bodies, in memory and on local disk.
+
+    Every entry keeps the object's ETag. Within its TTL an entry is served
+    without contacting S3; after that (or when the caller asks to
+    ``revalidate``) a conditional GET with ``IfNoneMatch`` costs a 304 instead
+    of the body when the object is unchanged. Bodies written through
+    :meth:`put` are cached too, so a worker never downloads its own writes.
+    The disk copy (one file per key: a JSON header line, then the body) is
+    shared by all workers on the host; its mtime is when it was last checked.
+    """
+
+    NOT_MODIFIED = ("304", "NotModified")
+
+    def __init__(
+        self,
+        client,
+        bucket: str,
+        ttl: float = 30.0,
+        ttls: Optional[Dict[str, float]] = None,
+        max_memory_bytes: int = 256 * 1024 * 1024,
+        directory: Optional[Path] = None,
+    ):
+        self.client = client
+        self.bucket = bucket
+        self.ttl = ttl
+        self.ttls = ttls or {}
+        self.max_memory_bytes = max_memory_bytes
+        self.directory = directory
+        self._entries: "OrderedDict[str, Tuple[str, bytes, float]]" = OrderedDict()  # key -> (etag, body, checked_at)
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.metrics = {
+            "hits": 0,
+            "revalidated": 0,
+            "downloads": 0,
+            "bytes_downloaded": 0,
+            "bytes_saved": 0,
+        }
+        if directory is not None:
+            directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, etag: str, body: bytes, checked_at: float) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old[1])
+            if len(body) <= self.max_memory_bytes:
+                self._entries[key] = (etag, body, checked_at)
+                self._memory_bytes += len(body)
+            while self._memory_bytes > self.max_memory_bytes:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def _entry(self, key: str) -> Optional[Tuple[str, bytes, float]]:
+        """Cached ``(etag, body, checked_at)``, preferring a newer disk copy."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if self.directory is None:
+            return entry
+        path = self._path(key)
         try:
-            obj = s3_client.get_object(Bucket=S3_BUCKET, Key=CHECKINS_INDEX_KEY)
-            body = obj["Body"].read()
-            return json.loads(body) if body else []
-        except s3_client.exceptions.NoSuchKey:
-            return []
+            checked_at = path.stat().st_mtime
+            if entry is not None and checked_at <= entry[2]:
+                return entry
+            data = path.read_bytes()
+        except OSError:
+            return entry
+        header, _, body = data.partition(b"\n")
+        try:
+            meta = json.loads(header)
+        except json.JSONDecodeError:
+            return entry
+        if meta.get("key") != key or meta.get("size") != len(body):
+            return entry
+        self._remember(key, meta["etag"], body, checked_at)
+        return meta["etag"], body, checked_at
+
+    def _store(self, key: str, etag: Optional[str], body: bytes) -> None:
+        if not etag:
+            return
+        now = time.time()
+        self._remember(key, etag, body, now)
+        if self.directory is not None:
+            header = json.dumps({"key": key, "etag": etag, "size": len(body)}).encode("utf-8")
+            try:
+                _atomic_write(self._path(key), header + b"\n" + body)
+            except OSError as exc:
+                print(f"Warning: Failed to write S3 cache entry for {key}: {exc}")
+
+    def _touch(self, key: str, entry: Tuple[str, bytes, float]) -> None:
+        now = time.time()
+        self._remember(key, entry[0], entry[1], now)
+        if self.directory is not None:
+            try:
+                os.utime(self._path(key), (now, now))
+            except OSError:
+                pass
+
+    def _served(self, body: bytes, start: int) -> bytes:
+        with self._lock:
+            self.metrics["bytes_saved"] += max(0, len(body) - start)
+        return body[start:]
+
+    def get(self, key: str, start: int = 0, revalidate: bool = False) -> bytes:
+        """Object body from byte ``start`` on; S3 errors (NoSuchKey...) propagate."""
+        entry = self._entry(key)
+        if entry is not None and not revalidate:
+            if time.time() - entry[2] < self.ttls.get(key, self.ttl):
+                with self._lock:
+                    self.metrics["hits"] += 1
+                return self._served(entry[1], start)
+
+        kwargs: Dict[str, Any] = {}
+        if entry is not None:
+            kwargs["IfNoneMatch"] = entry[0]
+        if start:
+            kwargs["Range"] = f"bytes={start}-"
+        try:
+            obj = self.client.get_object(Bucket=self.bucket, Key=key, **kwargs)
         except ClientError as exc:
-            if exc.response["Error"].get("Code") == "NoSuchKey":
-                return []
-            raise HTTPException(status_code=500, detail="Unable to load check-ins.") from exc
+            if entry is None or exc.response.get("Error", {}).get("Code") not in self.NOT_MODIFIED:
+                raise
+            self._touch(key, entry)
+            with self._lock:
+                self.metrics["revalidated"] += 1
+            return self._served(entry[1], start)
+
+        body = obj["Body"].read()
+        with self._lock:
+            self.metrics["downloads"] += 1
+            self.metrics["bytes_downloaded"] += len(body)
+        if not start:
+            # Ranged responses are partial; only whole bodies are cached
+            self._store(key, obj.get("ETag"), body)
+        return body
+
+    def put(self, key: str, body: bytes, content_type: str) -> None:
+        response = self.client.put_object(Bucket=self.bucket, Key=key, Body=body, ContentType=content_type)
+        self._store(key, response.get("ETag"), body)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.metrics, "entries": len(self._entries), "memory_bytes": self._memory_bytes}
+
+
+_s3_cache: Optional[S3ReadCache] = None
+if not USE_LOCAL_STORAGE and S3_CACHE_ENABLED:
+    _s3_cache = S3ReadCache(
+        s3_client,
+        S3_BUCKET,
+        ttl=S3_CACHE_TTL_SECONDS,
+        ttls=S3_CACHE_TTLS,
+        max_memory_bytes=int(S3_CACHE_MEMORY_MB * 1024 * 1024),
+        directory=Path(S3_CACHE_DIR) if S3_CACHE_DIR else None,
+    )
+
+
+def _s3_get(key: str, start: int = 0, revalidate: bool = False) -> bytes:
+    """Body of an S3 object (from byte ``start``), through the read cache when enabled."""
+    if _s3_cache is not None:
+        return _s3_cache.get(key, start, revalidate)
+    kwargs = {"Range": f"bytes={start}-"} if start else {}
+    return s3_client.get_object(Bucket=S3_BUCKET, Key=key, **kwargs)["Body"].read()
+
+
+def _s3_put(key: str, body: bytes, content_type: str) -> None:
+    if _s3_cache is not None:
+        _s3_cache.put(key, body, content_type)
+    else:
+        s3_client.put_object(Bucket=S3_BUCKET, Key=key, Body=body, ContentType=content_type)
 
 
 def _save_checkins(checkins: List[Dict[str, Any]]) -> None:
     """Save all check-ins to S3 or local storage"""
     if USE_LOCAL_STORAGE:
         file_path = DATA_DIR / CHECKINS_INDEX_KEY.replace("/", "_")
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        file_path.write_text(json.dumps(checkins, indent=2))
+        _atomic_write(file_path, json.dumps(checkins, indent=2).encode("utf-8"))
     else:
         try:
-            s3_client.put_object(
-                Bucket=S3_BUCKET,
-                Key=CHECKINS_INDEX_KEY,
-                Body=json.dumps(checkins, indent=2).encode("utf-8"),
-                ContentType="application/json",
-        )
+            _s3_put(CHECKINS_INDEX_KEY, json.dumps(checkins, indent=2).encode("utf-8"), "application/json")
+        except ClientError as exc:
+            raise HTTPException(status_code=500, detail=f"S3 write failed: {exc.response['Error'].get('Message')}") from exc
+
+
+# A position in the stored check-in array is (count, end offset, digest): the
+# number of check-ins, the byte offset just past the last of them, and a hash
+# of the bytes before that offset. Check-ins are only ever appended, so the
+# bytes up to a position never change and anything after it is new.
+_POSITION_DIGEST_BYTES = 256
+
+CheckinPosition = Tuple[int, int, str]
+
+
+def _read_checkins_bytes(
+    start: int = 0, revalidate: bool = False, key: str = CHECKINS_INDEX_KEY
+) -> Optional[bytes]:
+    """Raw stored check-in array from byte ``start`` on (None if missing or shorter).
+
+    ``revalidate`` makes S3 mode confirm a cached copy is current first.
+    """
+    if USE_LOCAL_STORAGE:
+        file_path = DATA_DIR / key.replace("/", "_")
+        try:
+            with open(file_path, "rb") as f:
+                if start and start > os.fstat(f.fileno()).st_size:
+                    return None
+                f.seek(start)
+                return f.read()
+        except FileNotFoundError:
+            return None
+    else:
+        try:
+            return _s3_get(key, start, revalidate)
+        except ClientError as exc:
+            if exc.response["Error"].get("Code") in ("NoSuchKey", "InvalidRange"):
+                return None
+            raise HTTPException(status_code=500, detail="Unable to load check-ins.") from exc
+
+
+def _write_checkins_bytes(data: bytes, key: str = CHECKINS_INDEX_KEY) -> None:
+    if USE_LOCAL_STORAGE:
+        _atomic_write(DATA_DIR / key.replace("/", "_"), data)
+    else:
+        try:
+            _s3_put(key, data, "application/json")
         except ClientError as exc:
             raise HTTPException(status_code=500, detail=f"S3 write failed: {exc.response['Error'].get('Message')}") from exc
 
 
-def _load_clinics() -> Dict[str, Dict[str, Any]]:
+def _array_end(data: bytes) -> int:
+    """Byte offset just past the last element of a serialized JSON array."""
+    # Scan back over the closing bracket without copying what may be a large buffer
+    end = len(data)
+    while end and data[end - 1] in b" \t\r\n":
+        end -= 1
+    end -= 1
+    while end > 0 and data[end - 1] in b" \t\r\n":
+        end -= 1
+    return end
+
+
+def _checkin_position(data: bytes, count: int, start: int = 0) -> CheckinPosition:
+    """Position at the end of ``data``, which holds the array from byte ``start`` on."""
+    end = start + _array_end(data)
+    window = data[max(0, end - _POSITION_DIGEST_BYTES) - start:end - start]
+    return count, end, hashlib.sha256(window).hexdigest()
+
+
+def _load_checkin_log(
+    revalidate: bool = False, key: str = CHECKINS_INDEX_KEY
+) -> Tuple[List[Dict[str, Any]], Optional[CheckinPosition]]:
+    """Load all check-ins in a log together with the position at their end."""
+    data = _read_checkins_bytes(revalidate=revalidate, key=key)
+    if not data:
+        return [], None
+    try:
+        checkins = json.loads(data)
+    except json.JSONDecodeError:
+        return [], None
+    return checkins, _checkin_position(data, len(checkins))
+
+
+def _load_checkins_since(
+    position: CheckinPosition,
+    revalidate: bool = False,
+    key: str = CHECKINS_INDEX_KEY,
+) -> Optional[Tuple[List[Dict[str, Any]], CheckinPosition]]:
+    """Read only the check-ins appended after ``position``.
+
+    Returns ``(new check-ins, new position)``, or None when the stored array
+    no longer starts with the bytes the position was taken from.
+    """
+    count, end, digest = position
+    start = max(0, end - _POSITION_DIGEST_BYTES)
+    data = _read_checkins_bytes(start, revalidate, key)
+    if data is None or len(data) < end - start:
+        return None
+    if hashlib.sha256(data[:end - start]).hexdigest() != digest:
+        return None
+    tail = data[end - start:].lstrip()
+    if tail.startswith(b","):
+        tail = tail[1:]
+    try:
+        checkins = json.loads(b"[" + tail)
+    except json.JSONDecodeError:
+        return None
+    return checkins, _checkin_position(data, count + len(checkins), start)
+
+
+def _append_checkin(
+    checkin: Dict[str, Any], position: Optional[CheckinPosition], key: str = CHECKINS_INDEX_KEY
+) -> CheckinPosition:
+    """Append one check-in to the stored array and return the new position.
+
+    The new element is spliced in after the last one, so the history is copied
+    as bytes rather than re-serialized; the result is identical to
+    ``json.dumps(checkins, indent=2)`` of the whole list.
+    """
+    data = _read_checkins_bytes(revalidate=True, key=key) or b"[]"
+    count = position[0] if position else 0
+    if position is None or _checkin_position(data, count) != position:
+        # Written without us (or no file yet): count what is actually there
+        try:
+            count = len(json.loads(data))
+        except json.JSONDecodeError:
+            data, count = b"[]", 0
+    end = _array_end(data)
+    element = json.dumps([checkin], indent=2)[2:-2].encode("utf-8")
+    data = data[:end] + (b",\n" if count else b"\n") + element + b"\n]"
+    _write_checkins_bytes(data, key)
+    return _checkin_position(data, count + 1)
+
+
+_LOG_READ_BYTES = 1 << 20
+
+
+def _iter_log_bytes(key: str = CHECKINS_INDEX_KEY) -> Iterator[bytes]:
+    """A stored check-in log in 1 MB pieces, never all of it at once."""
+    if USE_LOCAL_STORAGE:
+        file_path = DATA_DIR / key.replace("/", "_")
+        try:
+            # Writes replace the file, so this handle keeps reading one version
+            with open(file_path, "rb") as f:
+                while True:
+                    chunk = f.read(_LOG_READ_BYTES)
+                    if not chunk:
+                        return
+                    yield chunk
+        except FileNotFoundError:
+            return
+    else:
+        try:
+            body = s3_client.get_object(Bucket=S3_BUCKET, Key=key)["Body"]
+        except s3_client.exceptions.NoSuchKey:
+            return
+        yield from body.iter_chunks(_LOG_READ_BYTES)
+
+
+def _truncated_at_end(exc: json.JSONDecodeError, buffer: str) -> bool:
+    """Whether a decode error only means the element runs past the end of ``buffer``."""
+    # An unterminated string is reported where it starts; anything else at (or,
+    # for a cut-off \uXXXX escape, just before) the end of the buffer
+    return exc.msg.startswith("Unterminated string") or exc.pos >= len(buffer) - 6
+
+
+def _iter_checkin_log(key: str = CHECKINS_INDEX_KEY) -> Iterator[Dict[str, Any]]:
+    """Check-ins of a stored log one at a time, decoded as the bytes arrive.
+
+    Raises ValueError at a malformed element rather than buffering the rest
+    of the log behind it.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    for chunk in _iter_log_bytes(key):
+        buffer += text.decode(chunk)
+        pos = 0
+        while True:
+            # Between elements there is only the opening bracket, commas and whitespace
+            while pos < len(buffer) and buffer[pos] in "[, \t\r\n":
+                pos += 1
+            if pos == len(buffer) or buffer[pos] == "]":
+                break
+            try:
+                checkin, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as exc:
+                if not _truncated_at_end(exc, buffer):
+                    raise ValueError(f"{key} has a malformed check-in: {exc}") from None
+                break  # element continues in the next chunk
+            yield checkin
+        buffer = buffer[pos:]
+    if buffer.strip() not in ("", "]"):
+        print(f"Warning: {key} ends with an incomplete check-in; stopped there")
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+_CHECKIN_FIELDS = (
+    "checkin_id", "clinic_id", "clinic_name", "location", "check_in_time",
+    "check_out_time", "wait_time", "condition", "created_at",
+)
+_LOCATION_FIELDS = ("latitude", "longitude")
+
+
+# How a packed timestamp is written back: datetime.isoformat() for UTC (what
+# the server writes) or JavaScript's toISOString() (what the report form posts)
+_TS_ISOFORMAT = 0
+_TS_JS_MILLIS = 1
+
+
+def _pack_timestamp(value: str) -> Optional[Tuple[int, int]]:
+    """``(epoch microseconds, format code)`` for a UTC timestamp that formats back to ``value``."""
+    # Only the exact shapes isoformat()/toISOString() produce for UTC; checked
+    # by position because formatting back to compare costs more than parsing
+    if len(value) == 24:
+        if value[19] != "." or value[23] != "Z":
+            return None
+        code, value = _TS_JS_MILLIS, value[:23] + "+00:00"
+    elif len(value) == 32:
+        if value[19] != "." or value[20:26] == "000000" or value[26:] != "+00:00":
+            return None
+        code = _TS_ISOFORMAT
+    elif len(value) != 25 or value[19:] != "+00:00":
+        return None
+    else:
+        code = _TS_ISOFORMAT
+    if value[4] != "-" or value[7] != "-" or value[10] != "T" or value[13] != ":" or value[16] != ":":
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return (parsed - _EPOCH) // _MICROSECOND, code
+
+
+def _unpack_timestamp(micros: int, code: int) -> str:
+    moment = _EPOCH + micros * _MICROSECOND
+    if code == _TS_JS_MILLIS:
+        return moment.isoformat(timespec="milliseconds")[:-6] + "Z"
+    return moment.isoformat()
+
+
+def _pack_uuid(value: str) -> Optional[bytes]:
+    """The 16 bytes of a canonical (lower-case, hyphenated) UUID string."""
+    if len(value) != 36 or value[8] != "-" or value[13] != "-" or value[18] != "-" or value[23] != "-":
+        return None
+    try:
+        packed = bytes.fromhex(value[:8] + value[9:13] + value[14:18] + value[19:23] + value[24:])
+    except ValueError:
+        return None
+    return packed if value == value.lower() else None
+
+
+class CompactCheckins:
+    """Check-in history stored column-wise instead of as one dict per record.
+
+    Check-ins shaped like the ones ``POST /checkins`` writes are kept as typed
+    arrays: UUIDs as 16 raw bytes, coordinates and waits as doubles, timestamps
+    as epoch microseconds, and clinic ids, names and conditions as indexes into
+    a shared string table: about 80 bytes per check-in against about 1 KB as
+    parsed JSON. One byte per row records whether each timestamp was written
+    by ``isoformat()`` or by the browser's ``toISOString()`` (``...000Z``).
+    Anything that would not serialize back byte for byte (extra or missing
+    keys, integer coordinates, non-UTC timestamps...) is kept as the original
+    dict. Indexing and iteration hand out plain dicts in the
+    stored JSON shape, so callers see the same records as before.
+    """
+
+    def __init__(self, checkins: Iterable[Dict[str, Any]] = ()):
+        self._ids = bytearray()
+        self._clinic_ids = array("I")
+        self._names = array("I")
+        self._conditions = array("I")
+        self._latitudes = array("d")
+        self._longitudes = array("d")
+        self._waits = array("d")
+        self._check_ins = array("q")
+        self._check_outs = array("q")
+        self._created = array("q")
+        self._formats = bytearray()  # bit i: timestamp i (check-in, check-out, created) is toISOString()
+        self._strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+        self._raw: Dict[int, Dict[str, Any]] = {}  # row -> check-in kept as is
+        self.extend(checkins)
+
+    def _string_id(self, value: str) -> int:
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self._strings)
+            self._strings.append(value)
+        return string_id
+
+    def _pack(self, checkin: Dict[str, Any]) -> Optional[Tuple[Any, ...]]:
+        if tuple(checkin) != _CHECKIN_FIELDS:
+            return None
+        location = checkin["location"]
+        if type(location) is not dict or tuple(location) != _LOCATION_FIELDS:
+            return None
+        latitude, longitude, wait = location["latitude"], location["longitude"], checkin["wait_time"]
+        if type(latitude) is not float or type(longitude) is not float or type(wait) is not float:
+            return None
+        text = (checkin["checkin_id"], checkin["clinic_id"], checkin["clinic_name"], checkin["condition"],
+                checkin["check_in_time"], checkin["check_out_time"], checkin["created_at"])
+        if any(type(value) is not str for value in text):
+            return None
+        packed_id = _pack_uuid(text[0])
+        times = [_pack_timestamp(value) for value in text[4:]]
+        if packed_id is None or None in times:
+            return None
+        formats = times[0][1] | times[1][1] << 1 | times[2][1] << 2
+        return (packed_id, self._string_id(text[1]), self._string_id(text[2]), self._string_id(text[3]),
+                latitude, longitude, wait, times[0][0], times[1][0], times[2][0], formats)
+
+    def append(self, checkin: Dict[str, Any]) -> None:
+        row = self._pack(checkin)
+        if row is None:
+            self._raw[len(self)] = checkin
+            row = (bytes(16), 0, 0, 0, 0.0, 0.0, 0.0, 0, 0, 0, 0)
+        self._ids += row[0]
+        self._clinic_ids.append(row[1])
+        self._names.append(row[2])
+        self._conditions.append(row[3])
+        self._latitudes.append(row[4])
+        self._longitudes.append(row[5])
+        self._waits.append(row[6])
+        self._check_ins.append(row[7])
+        self._check_outs.append(row[8])
+        self._created.append(row[9])
+        self._formats.append(row[10])
+
+    def extend(self, checkins: Iterable[Dict[str, Any]]) -> None:
+        for checkin in checkins:
+            self.append(checkin)
+
+    def __len__(self) -> int:
+        return len(self._latitudes)
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("check-in index out of range")
+        raw = self._raw.get(index)
+        if raw is not None:
+            return raw
+        hex_id = self._ids[index * 16:index * 16 + 16].hex()
+        formats = self._formats[index]
+        return {
+            "checkin_id": f"{hex_id[:8]}-{hex_id[8:12]}-{hex_id[12:16]}-{hex_id[16:20]}-{hex_id[20:]}",
+            "clinic_id": self._strings[self._clinic_ids[index]],
+            "clinic_name": self._strings[self._names[index]],
+            "location": {"latitude": self._latitudes[index], "longitude": self._longitudes[index]},
+            "check_in_time": _unpack_timestamp(self._check_ins[index], formats & 1),
+            "check_out_time": _unpack_timestamp(self._check_outs[index], formats >> 1 & 1),
+            "wait_time": self._waits[index],
+            "condition": self._strings[self._conditions[index]],
+            "created_at": _unpack_timestamp(self._created[index], formats >> 2 & 1),
+        }
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def nbytes(self) -> int:
+        """Bytes held by the packed columns and string table (rows kept as dicts not counted)."""
+        columns = (self._clinic_ids, self._names, self._conditions, self._latitudes, self._longitudes,
+                   self._waits, self._check_ins, self._check_outs, self._created)
+        return (
+            len(self._ids)
+            + len(self._formats)
+            + sum(column.itemsize * len(column) for column in columns)
+            + sum(sys.getsizeof(value) for value in self._strings)
+        )
+
+
+def _load_clinics(key: str = CLINICS_INDEX_KEY) -> Dict[str, Dict[str, Any]]:
     """Load clinic aggregations from S3 or local storage"""
     if USE_LOCAL_STORAGE:
-        file_path = DATA_DIR / CLINICS_INDEX_KEY.replace("/", "_")
+        file_path = DATA_DIR / key.replace("/", "_")
         if file_path.exists():
             try:
                 return json.loads(file_path.read_text())
@@ -346,8 +1560,7 @@ def _load_clinics() -> Dict[str, Dict[str, Any]]:
         return {}
     else:
         try:
-            obj = s3_client.get_object(Bucket=S3_BUCKET, Key=CLINICS_INDEX_KEY)
-            body = obj["Body"].read()
+            body = _s3_get(key)
             return json.loads(body) if body else {}
         except s3_client.exceptions.NoSuchKey:
             return {}
@@ -357,108 +1570,293 @@ def _load_clinics() -> Dict[str, Dict[str, Any]]:
             raise HTTPException(status_code=500, detail="Unable to load clinics.") from exc
 
 
-def _save_clinics(clinics: Dict[str, Dict[str, Any]]) -> None:
+def _save_clinics(clinics: Dict[str, Dict[str, Any]], key: str = CLINICS_INDEX_KEY) -> None:
     """Save clinic aggregations to S3 or local storage"""
     if USE_LOCAL_STORAGE:
-        file_path = DATA_DIR / CLINICS_INDEX_KEY.replace("/", "_")
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        file_path.write_text(json.dumps(clinics, indent=2))
+        file_path = DATA_DIR / key.replace("/", "_")
+        _atomic_write(file_path, json.dumps(clinics, indent=2).encode("utf-8"))
     else:
         try:
-            s3_client.put_object(
-                Bucket=S3_BUCKET,
-                Key=CLINICS_INDEX_KEY,
-                Body=json.dumps(clinics, indent=2).encode("utf-8"),
-                ContentType="application/json",
-        )
+            _s3_put(key, json.dumps(clinics, indent=2).encode("utf-8"), "application/json")
         except ClientError as exc:
             raise HTTPException(status_code=500, detail=f"S3 write failed: {exc.response['Error'].get('Message')}") from exc
 
 
-def _load_model() -> WaitTimePredictor:
-    """Load trained model from S3 or local storage"""
-    if USE_LOCAL_STORAGE:
-        file_path = DATA_DIR / MODEL_KEY.replace("/", "_")
-        if file_path.exists():
-            try:
-                with open(file_path, "rb") as f:
-                    data = pickle.load(f)
-                return WaitTimePredictor.from_dict(data)
-            except (pickle.PickleError, IOError, KeyError):
-                return WaitTimePredictor()
-        return WaitTimePredictor()
-    else:
-        try:
-            obj = s3_client.get_object(Bucket=S3_BUCKET, Key=MODEL_KEY)
-            body = obj["Body"].read()
-            data = pickle.loads(body)
-            return WaitTimePredictor.from_dict(data)
-        except (s3_client.exceptions.NoSuchKey, ClientError, pickle.PickleError):
-            # Return new model if loading fails
-            return WaitTimePredictor()
+def _model_partition(clinic_id: str) -> int:
+    """Stored model partition holding a clinic's stats (stable across processes)."""
+    digest = hashlib.blake2b(clinic_id.encode("utf-8"), digest_size=4).digest()
+    return int.from_bytes(digest, "big") % MODEL_PARTITIONS
 
 
-def _save_model(model: WaitTimePredictor) -> None:
-    """Save trained model to S3 or local storage"""
-    if USE_LOCAL_STORAGE:
-        file_path = DATA_DIR / MODEL_KEY.replace("/", "_")
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        try:
-            with open(file_path, "wb") as f:
-                pickle.dump(model.to_dict(), f)
-        except (IOError, pickle.PickleError) as exc:
-            print(f"Warning: Failed to save model: {exc}")
-    else:
-        try:
-            model_data = pickle.dumps(model.to_dict())
-            s3_client.put_object(
-                Bucket=S3_BUCKET,
-                Key=MODEL_KEY,
-                Body=model_data,
-                ContentType="application/octet-stream",
-            )
-        except ClientError as exc:
-            # Log but don't fail if model save fails
-            print(f"Warning: Failed to save model: {exc}")
+def _model_part_key(part: int) -> str:
+    return f"{MODEL_KEY.rsplit('.', 1)[0]}/part-{part:03d}.pkl"
 
 
-def _compute_wait_time(check_in: str, check_out: str) -> Optional[float]:
-    """Compute wait time in minutes from check-in and check-out times"""
+def _read_model_object(key: str, revalidate: bool = False) -> Optional[Dict[str, Any]]:
+    """An unpickled model header or partition, or None if it is missing or unreadable."""
+    if USE_LOCAL_STORAGE:
+        try:
+            with open(DATA_DIR / key.replace("/", "_"), "rb") as f:
+                return pickle.load(f)
+        except (pickle.PickleError, IOError, EOFError):
+            return None
     try:
-        check_in_time = datetime.fromisoformat(check_in.replace("Z", "+00:00"))
-        check_out_time = datetime.fromisoformat(check_out.replace("Z", "+00:00"))
-        delta = check_out_time - check_in_time
-        return max(0, delta.total_seconds() / 60.0)  # Convert to minutes
-    except (ValueError, AttributeError):
+        return pickle.loads(_s3_get(key, revalidate=revalidate))
+    except (s3_client.exceptions.NoSuchKey, ClientError, pickle.PickleError, EOFError):
         return None
 
 
-def _calculate_reliability_score(num_reports: int, recent_reports: int) -> float:
-    """Reliability that trends high but avoids pegging at 100 too easily."""
-    if num_reports <= 0:
-        return 55.0
-
-    base_score = 55 + min(25, math.log1p(num_reports) * 12)
-    recency_boost = min(20, recent_reports * 4)
-    activity_bonus = 5 if recent_reports > 0 else 0
-
-    return float(min(97, base_score + recency_boost + activity_bonus))
+def _write_model_object(key: str, data: Dict[str, Any]) -> None:
+    body = pickle.dumps(data)
+    if USE_LOCAL_STORAGE:
+        _atomic_write(DATA_DIR / key.replace("/", "_"), body)
+    else:
+        _s3_put(key, body, "application/octet-stream")
 
 
-def _normalize_clinic_name(name: str) -> str:
-    """Normalize clinic name to a consistent identifier."""
-    return re.sub(r"[^a-z0-9]+", "_", name.lower().strip()).strip("_")
+def _model_settings(model: WaitTimePredictor) -> Dict[str, Any]:
+    return {name: value for name, value in model.to_dict().items() if name != "stats"}
 
 
-def _location_bucket(lat: Optional[float], lon: Optional[float], bucket_deg: float = 0.1) -> Optional[Tuple[int, int]]:
-    """Bucket a latitude/longitude into ~10km grid cells (0.1 deg ~ 11km).
+def _load_model(revalidate: bool = False, model: Optional[WaitTimePredictor] = None) -> WaitTimePredictor:
+    """Load trained model from S3 or local storage.
 
-    Returns a tuple (lat_bucket, lon_bucket) or None if lat/lon are missing.
+    Given the caller's current ``model``, only the partitions written since it
+    was loaded are read, and folded into it in place.
     """
+    header = _read_model_object(MODEL_KEY, revalidate)
+    if header is None:
+        return _new_model()
     try:
-        if lat is None or lon is None:
-            return None
-        lat_f = float(lat)
+        if "partitions" not in header:
+            # Saved as one file, before the stats were partitioned
+            return WaitTimePredictor.from_dict(header)
+        settings = {name: value for name, value in header.items() if name not in ("partitions", "part_versions")}
+        versions = list(header["part_versions"])
+        if model is not None and model.part_versions is not None and len(model.part_versions) == len(versions) \
+                and _model_settings(model) == settings:
+            stale = [part for part, version in enumerate(versions) if version != model.part_versions[part]]
+        else:
+            model = WaitTimePredictor.from_dict(settings)
+            stale = [part for part, version in enumerate(versions) if version]
+        for part in stale:
+            data = _read_model_object(_model_part_key(part), revalidate)
+            if data is None:
+                continue
+            stats = WaitTimePredictor.from_dict({**settings, "stats": data["stats"]}).stats
+            model.stats.update(stats)
+            model.part_members[part] = set(stats)
+        model.part_versions = versions
+        return model
+    except (KeyError, TypeError, ValueError):
+        return _new_model()
+
+
+def _save_model(model: WaitTimePredictor, clinic_ids: Optional[Iterable[str]] = None) -> None:
+    """Save trained model to S3 or local storage.
+
+    With ``clinic_ids`` only the partitions holding those clinics are
+    rewritten (plus the small header); otherwise every partition is.
+    """
+    try:
+        if clinic_ids is not None and model.part_versions is not None and len(model.part_versions) == MODEL_PARTITIONS:
+            versions = list(model.part_versions)
+            parts = set()
+            for clinic_id in clinic_ids:
+                part = _model_partition(clinic_id)
+                model.part_members.setdefault(part, set()).add(clinic_id)
+                parts.add(part)
+            for part in parts:
+                versions[part] += 1
+        else:
+            stored = _read_model_object(MODEL_KEY, revalidate=True) or {}
+            version = max(stored.get("part_versions") or [0]) + 1
+            versions = [version] * MODEL_PARTITIONS
+            parts = range(MODEL_PARTITIONS)
+            model.part_members = {}
+            for clinic_id in model.stats:
+                model.part_members.setdefault(_model_partition(clinic_id), set()).add(clinic_id)
+        for part in parts:
+            members = model.part_members.get(part, ())
+            _write_model_object(_model_part_key(part), {"stats": {cid: model.stats[cid] for cid in members}})
+        # The header goes last: readers only follow versions whose partitions are written
+        _write_model_object(
+            MODEL_KEY, {**_model_settings(model), "partitions": MODEL_PARTITIONS, "part_versions": versions}
+        )
+        model.part_versions = versions
+    except (IOError, pickle.PickleError, ClientError) as exc:
+        # Log but don't fail if model save fails
+        print(f"Warning: Failed to save model: {exc}")
+
+
+CHECKPOINT_FORMAT = 2
+
+
+def _load_checkpoint() -> Optional[Dict[str, Any]]:
+    """Load the latest derived-state checkpoint, or None if there is no usable one."""
+    try:
+        if USE_LOCAL_STORAGE:
+            file_path = DATA_DIR / CHECKPOINT_KEY.replace("/", "_")
+            if not file_path.exists():
+                return None
+            state = pickle.loads(file_path.read_bytes())
+        else:
+            state = pickle.loads(_s3_get(CHECKPOINT_KEY))
+    except (ClientError, pickle.PickleError, EOFError, IOError, AttributeError, ImportError) as exc:
+        if not (isinstance(exc, ClientError) and exc.response.get("Error", {}).get("Code") == "NoSuchKey"):
+            print(f"Warning: Ignoring unreadable checkpoint: {exc}")
+        return None
+    if not isinstance(state, dict) or state.get("format") != CHECKPOINT_FORMAT:
+        return None
+    return state
+
+
+def _save_checkpoint(snapshot: "ClinicSnapshot") -> None:
+    """Checkpoint the snapshot's derived state, tagged with its check-in position."""
+    if snapshot.position is None:
+        return
+    state = {
+        "format": CHECKPOINT_FORMAT,
+        "position": snapshot.position,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "groups": snapshot.aggregator.groups,
+        "model": snapshot.model.to_dict(),
+        "recent_checkins": snapshot.dedup.recent_checkins(),
+    }
+    try:
+        data = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        if USE_LOCAL_STORAGE:
+            _atomic_write(DATA_DIR / CHECKPOINT_KEY.replace("/", "_"), data)
+        else:
+            _s3_put(CHECKPOINT_KEY, data, "application/octet-stream")
+    except (ClientError, IOError, pickle.PickleError) as exc:
+        # Log but don't fail: the next start just replays a longer tail
+        print(f"Warning: Failed to save checkpoint: {exc}")
+        return
+    snapshot.checkpoint_count = snapshot.position[0]
+
+
+def _new_model(mode: Optional[str] = None) -> WaitTimePredictor:
+    """Empty predictor in the configured mode."""
+    return WaitTimePredictor(
+        mode=mode or PREDICTOR_MODE,
+        half_life_hours=PREDICTOR_HALF_LIFE_HOURS,
+        sketch_k=SKETCH_K,
+        sketch_per_hour=SKETCH_PER_HOUR,
+    )
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parse an ISO-8601 timestamp (accepting a trailing Z), or None."""
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (ValueError, AttributeError):
+        return None
+
+
+def _as_utc(value: datetime) -> datetime:
+    """The same instant in UTC; naive timestamps are taken to be UTC already."""
+    return value.astimezone(timezone.utc) if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def _train_model(checkins: List[Dict[str, Any]], mode: Optional[str] = None) -> WaitTimePredictor:
+    """Replay the check-in history, in stored order, into a fresh predictor."""
+    return _replay_checkins(_new_model(mode), checkins)
+
+
+def _replay_checkins(model: WaitTimePredictor, checkins: List[Dict[str, Any]]) -> WaitTimePredictor:
+    """Train ``model`` on check-ins in stored order."""
+    for checkin in checkins:
+        check_in_dt = _parse_timestamp(checkin.get("check_in_time"))
+        wait_time = checkin.get("wait_time")
+        if check_in_dt is None or wait_time is None or not checkin.get("clinic_name"):
+            continue
+        check_in_dt = _as_utc(check_in_dt)
+        model.update(
+            _normalize_clinic_name(checkin["clinic_name"]),
+            check_in_dt.hour,
+            check_in_dt.weekday(),
+            checkin.get("condition"),
+            wait_time,
+            timestamp=check_in_dt.timestamp(),
+        )
+    return model
+
+
+def _evaluate_model_modes(checkins: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """One-step-ahead (predict, then learn) mean absolute error of each predictor mode."""
+    results = {}
+    for mode in WaitTimePredictor.MODES:
+        model = _new_model(mode)
+        abs_errors = []
+        for checkin in checkins:
+            check_in_dt = _parse_timestamp(checkin.get("check_in_time"))
+            wait_time = checkin.get("wait_time")
+            if check_in_dt is None or wait_time is None or not checkin.get("clinic_name"):
+                continue
+            # One clock for both the prediction and the update, whatever offset the client sent
+            check_in_dt = _as_utc(check_in_dt)
+            model_clinic_id = _normalize_clinic_name(checkin["clinic_name"])
+            ts = check_in_dt.timestamp()
+            if model.stats.get(model_clinic_id, {}).get("overall", {}).get("count"):
+                # predict() targets the hour after the one given
+                prev = check_in_dt - timedelta(hours=1)
+                predicted = model.predict(
+                    model_clinic_id, prev.hour, prev.weekday(), checkin.get("condition"), timestamp=ts
+                )
+                abs_errors.append(abs(predicted - float(wait_time)))
+            model.update(
+                model_clinic_id,
+                check_in_dt.hour,
+                check_in_dt.weekday(),
+                checkin.get("condition"),
+                wait_time,
+                timestamp=ts,
+            )
+        results[mode] = {
+            "evaluated": len(abs_errors),
+            "mae_minutes": round(sum(abs_errors) / len(abs_errors), 2) if abs_errors else None,
+        }
+    return {"active_mode": PREDICTOR_MODE, "modes": results}
+
+
+def _compute_wait_time(check_in: str, check_out: str) -> Optional[float]:
+    """Compute wait time in minutes from check-in and check-out times"""
+    try:
+        check_in_time = datetime.fromisoformat(check_in.replace("Z", "+00:00"))
+        check_out_time = datetime.fromisoformat(check_out.replace("Z", "+00:00"))
+        delta = check_out_time - check_in_time
+        return max(0, delta.total_seconds() / 60.0)  # Convert to minutes
+    except (ValueError, AttributeError):
+        return None
+
+
+def _calculate_reliability_score(num_reports: int, recent_reports: int) -> float:
+    """Reliability that trends high but avoids pegging at 100 too easily."""
+    if num_reports <= 0:
+        return 55.0
+
+    base_score = 55 + min(25, math.log1p(num_reports) * 12)
+    recency_boost = min(20, recent_reports * 4)
+    activity_bonus = 5 if recent_reports > 0 else 0
+
+    return float(min(97, base_score + recency_boost + activity_bonus))
+
+
+def _normalize_clinic_name(name: str) -> str:
+    """Normalize clinic name to a consistent identifier."""
+    return re.sub(r"[^a-z0-9]+", "_", name.lower().strip()).strip("_")
+
+
+def _location_bucket(lat: Optional[float], lon: Optional[float], bucket_deg: float = LOCATION_BUCKET_DEG) -> Optional[Tuple[int, int]]:
+    """Bucket a latitude/longitude into ~10km grid cells (0.1 deg ~ 11km).
+
+    Returns a tuple (lat_bucket, lon_bucket) or None if lat/lon are missing.
+    """
+    try:
+        if lat is None or lon is None:
+            return None
+        lat_f = float(lat)
         lon_f = float(lon)
         # Floor division into grid cells
         return (math.floor(lat_f / bucket_deg), math.floor(lon_f / bucket_deg))
@@ -485,187 +1883,775 @@ def _group_key_for_checkin(checkin: Dict[str, Any]) -> Optional[str]:
     return f"{norm}__{bucket[0]}_{bucket[1]}"
 
 
-def _aggregate_clinic_data(clinic_id: str, checkins: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """Aggregate check-ins for a clinic to compute statistics (legacy - filters by clinic_id)"""
-    clinic_checkins = [c for c in checkins if c.get("clinic_id") == clinic_id]
-    
-    if not clinic_checkins:
-        return {}
-    
-    return _aggregate_clinic_data_from_list(clinic_id, clinic_checkins)
+class ClinicAggregator:
+    """Running per-clinic totals behind the clinic aggregations.
 
+    Folding check-ins in one at a time yields exactly what aggregating each
+    group's whole check-in list would (``test_equivalence.py`` keeps that
+    reference), so writes and restarts never revisit older check-ins. Only the last week of
+    ``(created_at, condition)`` pairs is kept for the time-dependent fields,
+    and a heap ordered by when each of those reports leaves the window tells
+    :meth:`expire` which clinics those fields have changed for. Each group
+    also keeps an hour-by-weekday cube of wait times (see :func:`_heatmap`).
+    The groups are plain dicts and lists so they can be checkpointed; the heap
+    is rebuilt from them.
+    """
+
+    RECENT_DAYS = 7
+    # A report counts as recent while fewer than RECENT_DAYS + 1 whole days old
+    WINDOW_SECONDS = (RECENT_DAYS + 1) * 86400
+
+    def __init__(self, groups: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.groups: Dict[str, Dict[str, Any]] = groups if groups is not None else {}
+        self._expiry: List[Tuple[float, str]] = []  # (leaves the window at, clinic key)
+        now_ts = time.time()
+        for key, group in self.groups.items():
+            for ts, _ in group["recent"]:
+                if ts + self.WINDOW_SECONDS > now_ts:
+                    self._expiry.append((ts + self.WINDOW_SECONDS, key))
+        heapq.heapify(self._expiry)
+
+    def add(self, checkin: Dict[str, Any]) -> Optional[str]:
+        """Fold in the next stored check-in; returns its clinic key (None if ungrouped)."""
+        key = _group_key_for_checkin(checkin)
+        if key is None:
+            return None
+        group = self.groups.get(key)
+        if group is None:
+            # The first check-in names the clinic and is the location fallback
+            group = self.groups[key] = {
+                "clinic_name": checkin.get("clinic_name", "Unknown Clinic"),
+                "first_location": checkin.get("location", {}),
+                "total": 0,
+                "wait_sum": 0,
+                "wait_count": 0,
+                "last_wait": None,
+                "latest_created_at": None,
+                "latest_location": {},
+                "latest_wait": None,
+                "recent": [],
+                "cube": {},  # weekday * 24 + hour -> [count, sum, sum of squares] of waits
+            }
+        group["total"] += 1
 
-def _aggregate_clinic_data_from_list(clinic_id: str, clinic_checkins: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """Aggregate a list of check-ins for a clinic to compute statistics"""
-    if not clinic_checkins:
-        return {}
-    
-    # Calculate average wait time
-    wait_times = []
-    conditions = []
-    recent_checkins = []
-    locations = []
-    now = datetime.now(timezone.utc)
-    
-    for checkin in clinic_checkins:
         wait_time = checkin.get("wait_time")
         if wait_time is not None:
-            wait_times.append(wait_time)
-        
-        condition = checkin.get("condition")
-        if condition:
-            conditions.append(condition)
-        
-        # Collect locations (for averaging)
-        location = checkin.get("location")
-        if location and location.get("latitude") and location.get("longitude"):
-            locations.append(location)
-        
-        # Get recent check-ins (last 7 days)
-        created_at = checkin.get("created_at")
+            group["wait_sum"] += wait_time
+            group["wait_count"] += 1
+            group["last_wait"] = wait_time
+            # Bucketed in UTC, like the hours predictions are asked for; the
+            # clinic's own timezone is not known
+            check_in_dt = _parse_timestamp(checkin.get("check_in_time"))
+            if check_in_dt is not None:
+                check_in_dt = _as_utc(check_in_dt)
+                slot = check_in_dt.weekday() * 24 + check_in_dt.hour
+                cell = group["cube"].get(slot)
+                if cell is None:
+                    cell = group["cube"][slot] = [0, 0.0, 0.0]
+                cell[0] += 1
+                cell[1] += wait_time
+                cell[2] += wait_time * wait_time
+
+        # Most recent by created_at string; on ties the earliest stored wins
+        created_at = checkin.get("created_at", "")
+        if group["latest_created_at"] is None or created_at > group["latest_created_at"]:
+            group["latest_created_at"] = created_at
+            group["latest_location"] = checkin.get("location") or {}
+            group["latest_wait"] = wait_time
+
         if created_at:
-            try:
-                checkin_time = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
-                days_ago = (now - checkin_time).days
-                if days_ago <= 7:
-                    recent_checkins.append(checkin)
-            except (ValueError, AttributeError):
-                pass
-    
-    avg_wait_time = sum(wait_times) / len(wait_times) if wait_times else None
-    
-    # Determine current condition (most common recent condition)
-    condition_counts = defaultdict(int)
-    for checkin in recent_checkins:
-        condition = checkin.get("condition")
-        if condition:
-            condition_counts[condition] += 1
-    
-    current_condition = max(condition_counts.items(), key=lambda x: x[1])[0] if condition_counts else "Moderate"
-    
-    # Reliability score
-    reliability_score = _calculate_reliability_score(len(clinic_checkins), len(recent_checkins))
-    
-    # Use most recent location for display on map (same clinic name, different locations)
-    # Sort check-ins by created_at to get most recent
-    sorted_checkins = sorted(clinic_checkins, key=lambda x: x.get("created_at", ""), reverse=True)
-    location = {}
-    latest_wait_time = None
-    if sorted_checkins:
-        most_recent = sorted_checkins[0]
-        if most_recent.get("location"):
-            location = most_recent.get("location", {})
-        latest_wait_time = most_recent.get("wait_time")
-    elif locations:
-        # Fallback to most recent location from locations list
-        location = locations[-1]
-
-    # Get clinic info from first check-in (for name consistency)
-    first_checkin = clinic_checkins[0]
-    if not location:
-        location = first_checkin.get("location", {})
-    if latest_wait_time is None and wait_times:
-        latest_wait_time = wait_times[-1]
-    
-    return {
-        "clinic_id": clinic_id,
-        "clinic_name": first_checkin.get("clinic_name", "Unknown Clinic"),
-        "location": location,
-        "average_wait_time": round(avg_wait_time, 1) if avg_wait_time else None,
-        "latest_wait_time": round(latest_wait_time, 1) if latest_wait_time else None,
-        "current_condition": current_condition,
-        "reliability_score": round(reliability_score, 1),
-        "total_reports": len(clinic_checkins),
-        "recent_reports": len(recent_checkins),
-        "last_updated": now.isoformat(),
-    }
+            created = _parse_timestamp(created_at)
+            if created is not None:
+                ts = created.timestamp()
+                group["recent"].append((ts, checkin.get("condition")))
+                if ts + self.WINDOW_SECONDS > time.time():
+                    heapq.heappush(self._expiry, (ts + self.WINDOW_SECONDS, key))
+        return key
+
+    def expire(self, now_ts: float) -> List[str]:
+        """Clinics with reports that have left the window by ``now_ts``."""
+        keys: Dict[str, None] = {}
+        while self._expiry and self._expiry[0][0] <= now_ts:
+            keys[heapq.heappop(self._expiry)[1]] = None
+        return list(keys)
+
+    def next_expiry(self) -> Optional[float]:
+        """When the next report leaves the window (epoch seconds), if any will."""
+        return self._expiry[0][0] if self._expiry else None
+
+    def clinic(self, key: str, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Aggregated clinic record for ``key`` as of ``now``."""
+        now = now or datetime.now(timezone.utc)
+        group = self.groups[key]
+        now_ts = now.timestamp()
+        # Reports older than a week never become recent again, so drop them for good
+        recent = [entry for entry in group["recent"] if (now_ts - entry[0]) // 86400 <= self.RECENT_DAYS]
+        group["recent"] = recent
+
+        condition_counts: Dict[str, int] = {}
+        for _, condition in recent:
+            if condition:
+                condition_counts[condition] = condition_counts.get(condition, 0) + 1
+        current_condition = max(condition_counts.items(), key=lambda x: x[1])[0] if condition_counts else "Moderate"
+
+        avg_wait_time = group["wait_sum"] / group["wait_count"] if group["wait_count"] else None
+        latest_wait_time = group["latest_wait"]
+        if latest_wait_time is None:
+            latest_wait_time = group["last_wait"]
+        reliability_score = _calculate_reliability_score(group["total"], len(recent))
 
+        return {
+            "clinic_id": key,
+            "clinic_name": group["clinic_name"],
+            "location": group["latest_location"] or group["first_location"],
+            "average_wait_time": round(avg_wait_time, 1) if avg_wait_time else None,
+            "latest_wait_time": round(latest_wait_time, 1) if latest_wait_time else None,
+            "current_condition": current_condition,
+            "reliability_score": round(reliability_score, 1),
+            "total_reports": group["total"],
+            "recent_reports": len(recent),
+            "last_updated": now.isoformat(),
+        }
 
-def _update_clinic_aggregations(checkins: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
-    """Update clinic aggregations from all check-ins, grouping by name and location bucket.
+    def clinics(self, now: Optional[datetime] = None) -> Dict[str, Dict[str, Any]]:
+        now = now or datetime.now(timezone.utc)
+        return {key: self.clinic(key, now) for key in self.groups}
+
+
+def _wait_color(wait_minutes: float) -> str:
+    """Map a wait time in minutes to the legend colour used on the map."""
+    if wait_minutes < 15:
+        return "green"
+    if wait_minutes < 30:
+        return "yellow"
+    if wait_minutes < 60:
+        return "orange"
+    return "red"
+
+
+def _clinic_feature(
+    agg_id: str,
+    clinic_data: Dict[str, Any],
+    model: WaitTimePredictor,
+    now: datetime,
+) -> Optional[Dict[str, Any]]:
+    """Build the GeoJSON feature for one clinic, or None if it has no usable location."""
+    location = clinic_data.get("location") or {}
+    lat = location.get("latitude")
+    lon = location.get("longitude")
 
-    Using a coarse spatial bucket (~10km) prevents merging clinics with the same
-    name that are far apart while still consolidating very close duplicates.
-    """
-    clinic_groups: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    if lat is None or lon is None:
+        return None
 
-    for checkin in checkins:
-        key = _group_key_for_checkin(checkin)
-        if key is None:
-            continue
-        clinic_groups[key].append(checkin)
+    try:
+        lat = float(lat)
+        lon = float(lon)
+    except (TypeError, ValueError):
+        return None
 
-    clinics: Dict[str, Dict[str, Any]] = {}
-    for clinic_key, clinic_checkins in clinic_groups.items():
-        clinic_data = _aggregate_clinic_data_from_list(clinic_key, clinic_checkins)
-        if clinic_data:
-            clinics[clinic_key] = clinic_data
+    if math.isnan(lat) or math.isnan(lon):
+        return None
 
-    return clinics
+    # Predict wait time for next hour using SAME ID as create_checkin
+    hour = now.hour
+    weekday = now.weekday()
+    recent_condition = clinic_data.get("current_condition", "Moderate")
+    latest_wait = clinic_data.get("latest_wait_time")
+
+    model_clinic_id = _normalize_clinic_name(clinic_data.get("clinic_name", ""))
+    predicted_wait = model.predict(model_clinic_id, hour, weekday, recent_condition, latest_wait)
+    p50_wait, p90_wait = model.quantiles(model_clinic_id, hour)
+
+    recent_wait = clinic_data.get("latest_wait_time")
+    reference_wait = recent_wait if recent_wait is not None else predicted_wait
+    color = _wait_color(reference_wait)
+
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [lon, lat]},
+        "properties": {
+            "clinic_id": agg_id,  # keep aggregated id for map; model uses model_clinic_id
+            "clinic_name": clinic_data.get("clinic_name", "Unknown"),
+            "latest_wait_time": clinic_data.get("latest_wait_time"),
+            "predicted_wait_time": round(predicted_wait, 1),
+            "p50_wait_time": p50_wait,
+            "p90_wait_time": p90_wait,
+            "current_condition": clinic_data.get("current_condition", "Moderate"),
+            "reliability_score": clinic_data.get("reliability_score", 0),
+            "total_reports": clinic_data.get("total_reports", 0),
+            "color": color,
+        },
+    }
 
 
 def _checkins_to_geojson(clinics: Dict[str, Dict[str, Any]], model: WaitTimePredictor) -> Dict[str, Any]:
     """Convert clinic data to GeoJSON for map display"""
     features = []
     now = datetime.now(timezone.utc)
-    
+
     for agg_id, clinic_data in clinics.items():
-        location = clinic_data.get("location") or {}
-        lat = location.get("latitude")
-        lon = location.get("longitude")
-        
-        if lat is None or lon is None:
-            continue
-        
-        try:
-            lat = float(lat)
-            lon = float(lon)
-        except (TypeError, ValueError):
-            continue
-            
-        if math.isnan(lat) or math.isnan(lon):
-            continue
+        feature = _clinic_feature(agg_id, clinic_data, model, now)
+        if feature is not None:
+            features.append(feature)
 
-        # Predict wait time for next hour using SAME ID as create_checkin
-        hour = now.hour
-        weekday = now.weekday()
-        recent_condition = clinic_data.get("current_condition", "Moderate")
-        latest_wait = clinic_data.get("latest_wait_time")
+    return {"type": "FeatureCollection", "features": features}
 
-        model_clinic_id = _normalize_clinic_name(clinic_data.get("clinic_name", ""))
-        predicted_wait = model.predict(model_clinic_id, hour, weekday, recent_condition, latest_wait)
-        
-        recent_wait = clinic_data.get("latest_wait_time")
-        reference_wait = recent_wait if recent_wait is not None else predicted_wait
-        if reference_wait < 15:
-            color = "green"
-        elif reference_wait < 30:
-            color = "yellow"
-        elif reference_wait < 60:
-            color = "orange"
+
+def _lon_ranges(west: float, east: float) -> List[Tuple[float, float]]:
+    """Longitude intervals covered by a bbox, split if it crosses the antimeridian."""
+    if west <= east:
+        return [(west, east)]
+    return [(west, 180.0), (-180.0, east)]
+
+
+def _cluster_level(zoom: Optional[int]) -> int:
+    """Grid level to cluster at for a Leaflet zoom (0 = individual clinics).
+
+    Targets cells of roughly a quarter tile (~64px) on screen, so the number of
+    clusters in a viewport stays about the same at every zoom.
+    """
+    if zoom is None or zoom >= CLUSTER_MAX_ZOOM:
+        return 0
+    target_deg = 90.0 / (2 ** zoom)
+    level = math.ceil(math.log2(max(target_deg / LOCATION_BUCKET_DEG, 1.0)))
+    return max(1, min(CLUSTER_LEVELS, level))
+
+
+class ClinicMapIndex:
+    """Map features for one snapshot, with a grid index and precomputed clusters.
+
+    Level 0 is the ``_location_bucket`` grid. Level k merges 2x2 cells of level
+    k-1 (cell size ``LOCATION_BUCKET_DEG * 2**k``), so clusters are built bottom-up
+    from cell summaries rather than from individual clinics.
+    """
+
+    def __init__(self, features: List[Dict[str, Any]]):
+        self.features = features
+        self.cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        for i, feature in enumerate(features):
+            lon, lat = feature["geometry"]["coordinates"]
+            self.cells[_location_bucket(lat, lon)].append(i)
+
+        # Per-level cell summaries: [count, wait_sum, wait_min, lat_sum, lon_sum, only_feature,
+        # west, south, east, north] where the last four bound the member clinics
+        level: Dict[Tuple[int, int], list] = {}
+        for cell, indexes in self.cells.items():
+            waits = [features[i]["properties"]["predicted_wait_time"] for i in indexes]
+            lats = [features[i]["geometry"]["coordinates"][1] for i in indexes]
+            lons = [features[i]["geometry"]["coordinates"][0] for i in indexes]
+            level[cell] = [
+                len(indexes),
+                sum(waits),
+                min(waits),
+                sum(lats),
+                sum(lons),
+                indexes[0] if len(indexes) == 1 else None,
+                min(lons),
+                min(lats),
+                max(lons),
+                max(lats),
+            ]
+
+        self.clusters: List[Dict[Tuple[int, int], Dict[str, Any]]] = [{}]
+        for k in range(1, CLUSTER_LEVELS + 1):
+            merged: Dict[Tuple[int, int], list] = {}
+            for (i, j), summary in level.items():
+                parent = (i // 2, j // 2)
+                acc = merged.get(parent)
+                if acc is None:
+                    merged[parent] = list(summary)
+                    continue
+                acc[0] += summary[0]
+                acc[1] += summary[1]
+                acc[2] = min(acc[2], summary[2])
+                acc[3] += summary[3]
+                acc[4] += summary[4]
+                acc[5] = None
+                acc[6] = min(acc[6], summary[6])
+                acc[7] = min(acc[7], summary[7])
+                acc[8] = max(acc[8], summary[8])
+                acc[9] = max(acc[9], summary[9])
+            level = merged
+            self.clusters.append(
+                {cell: self._cluster_feature(k, cell, summary) for cell, summary in level.items()}
+            )
+
+    def _cluster_feature(self, level: int, cell: Tuple[int, int], summary: list) -> Dict[str, Any]:
+        count, wait_sum, wait_min, lat_sum, lon_sum, only_feature = summary[:6]
+        if only_feature is not None:
+            return self.features[only_feature]
+        avg_wait = wait_sum / count
+        return {
+            "type": "Feature",
+            "bbox": [round(v, 6) for v in summary[6:]],
+            "geometry": {"type": "Point", "coordinates": [lon_sum / count, lat_sum / count]},
+            "properties": {
+                "cluster": True,
+                "cluster_id": f"{level}:{cell[0]}_{cell[1]}",
+                "count": count,
+                "min_predicted_wait_time": round(wait_min, 1),
+                "avg_predicted_wait_time": round(avg_wait, 1),
+                "color": _wait_color(avg_wait),
+            },
+        }
+
+    @staticmethod
+    def _cells_in_bbox(cells: Dict[Tuple[int, int], Any], cell_deg: float, bbox: Tuple[float, float, float, float]):
+        """Yield (cell, value) pairs for cells intersecting the bbox.
+
+        Walks the cell range when the viewport is small and falls back to
+        scanning the occupied cells when that is cheaper.
+        """
+        west, south, east, north = bbox
+        i_lo, i_hi = math.floor(south / cell_deg) - 1, math.floor(north / cell_deg) + 1
+        for lon_lo, lon_hi in _lon_ranges(west, east):
+            j_lo, j_hi = math.floor(lon_lo / cell_deg) - 1, math.floor(lon_hi / cell_deg) + 1
+            if (i_hi - i_lo + 1) * (j_hi - j_lo + 1) <= len(cells):
+                for i in range(i_lo, i_hi + 1):
+                    for j in range(j_lo, j_hi + 1):
+                        value = cells.get((i, j))
+                        if value is not None:
+                            yield (i, j), value
+            else:
+                for (i, j), value in cells.items():
+                    if i_lo <= i <= i_hi and j_lo <= j <= j_hi:
+                        yield (i, j), value
+
+    def query(self, bbox: Optional[Tuple[float, float, float, float]], zoom: Optional[int]) -> Dict[str, Any]:
+        """Features (or clusters, at low zoom) inside the bbox."""
+        level = _cluster_level(zoom)
+        if bbox is None:
+            if level == 0:
+                return {"type": "FeatureCollection", "features": self.features}
+            bbox = (-180.0, -90.0, 180.0, 90.0)
+
+        west, south, east, north = bbox
+        lon_ranges = _lon_ranges(west, east)
+
+        def inside(feature: Dict[str, Any]) -> bool:
+            """Whether the clinic, or any clinic of a cluster (by its member bounds), is in view."""
+            bounds = feature.get("bbox")
+            if bounds is None:
+                lon, lat = feature["geometry"]["coordinates"]
+                bounds = (lon, lat, lon, lat)
+            c_west, c_south, c_east, c_north = bounds
+            return c_south <= north and south <= c_north and any(c_west <= hi and lo <= c_east for lo, hi in lon_ranges)
+
+        if level == 0:
+            features = [
+                self.features[i]
+                for _, indexes in self._cells_in_bbox(self.cells, LOCATION_BUCKET_DEG, bbox)
+                for i in indexes
+                if inside(self.features[i])
+            ]
         else:
-            color = "red"
+            cell_deg = LOCATION_BUCKET_DEG * (2 ** level)
+            features = [
+                feature
+                for _, feature in self._cells_in_bbox(self.clusters[level], cell_deg, bbox)
+                if inside(feature)
+            ]
+        return {"type": "FeatureCollection", "features": features, "cluster_level": level}
 
-        features.append(
-            {
-                "type": "Feature",
-                "geometry": {"type": "Point", "coordinates": [lon, lat]},
-                "properties": {
-                    "clinic_id": agg_id,  # keep aggregated id for map; model uses model_clinic_id
-                    "clinic_name": clinic_data.get("clinic_name", "Unknown"),
-                    "latest_wait_time": clinic_data.get("latest_wait_time"),
-                    "predicted_wait_time": round(predicted_wait, 1),
-                    "current_condition": clinic_data.get("current_condition", "Moderate"),
-                    "reliability_score": clinic_data.get("reliability_score", 0),
-                    "total_reports": clinic_data.get("total_reports", 0),
-                    "color": color,
-                },
-            }
-        )
 
-    return {"type": "FeatureCollection", "features": features}
+_map_index_cache: Optional[Tuple[Tuple[Any, ...], Any, Tuple[int, int], ClinicMapIndex]] = None
+
+
+def _get_map_index(
+    snapshot: "ClinicSnapshot", bbox: Optional[Tuple[float, float, float, float]] = None
+) -> ClinicMapIndex:
+    """Map index for the snapshot, rebuilt when clinics, the model or the hour change.
+
+    When sharded, the index covers only the shards intersecting ``bbox``;
+    each shard's features are cached on the shard.
+    """
+    global _map_index_cache
+    now = datetime.now(timezone.utc)
+    hour_key = (now.weekday(), now.hour)
+    with _snapshot_lock:
+        store = snapshot.shards
+        if store is None:
+            sources: Tuple[Any, ...] = (snapshot.clinics,)
+        else:
+            parts = []
+            for shard_id in store.shard_ids(snapshot.versions, bbox):
+                shard = store.get(shard_id, snapshot.versions)
+                cached = getattr(shard, "map_features", None)
+                if cached is None or cached[0] is not shard.clinics or cached[1] is not snapshot.model or cached[2] != hour_key:
+                    features = _checkins_to_geojson(shard.clinics, snapshot.model)["features"]
+                    shard.map_features = cached = (shard.clinics, snapshot.model, hour_key, features)
+                parts.append(cached[3])
+            sources = tuple(parts)
+
+        cached = _map_index_cache
+        if (
+            cached is not None
+            and len(cached[0]) == len(sources)
+            and all(a is b for a, b in zip(cached[0], sources))
+            and cached[1] is snapshot.model
+            and cached[2] == hour_key
+        ):
+            return cached[3]
+        if store is None:
+            features = _checkins_to_geojson(snapshot.clinics, snapshot.model)["features"]
+        else:
+            features = [feature for part in parts for feature in part]
+        index = ClinicMapIndex(features)
+        _map_index_cache = (sources, snapshot.model, hour_key, index)
+        return index
 
 
+def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 6371.0 * 2 * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _radius_bbox(lat: float, lon: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """Smallest (west, south, east, north) box holding every point within ``radius_km``."""
+    angular = radius_km / 6371.0
+    south = lat - math.degrees(angular)
+    north = lat + math.degrees(angular)
+    if south <= -90.0 or north >= 90.0 or math.sin(angular) >= math.cos(math.radians(lat)):
+        # The circle reaches a pole or wraps all the way round
+        return (-180.0, max(-90.0, south), 180.0, min(90.0, north))
+    dlon = math.degrees(math.asin(math.sin(angular) / math.cos(math.radians(lat))))
+    return ((lon - dlon + 180) % 360 - 180, south, (lon + dlon + 180) % 360 - 180, north)
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ClinicSearchIndex:
+    """Typeahead index over normalized clinic names.
+
+    A sorted token list answers prefix queries with two bisects; a trigram
+    posting map catches typos and infix matches. Both are maintained
+    incrementally as clinics appear, so lookups never touch the full list.
+    """
+
+    # Trigram candidates come from the rarest few trigrams of the query only,
+    # so common fragments like "cli"/"nic" never force a scan of every clinic
+    CANDIDATE_TRIGRAMS = 3
+    MAX_CANDIDATES = 500
+    # Prefix candidates likewise: a token range is walked in order and left
+    # after this many clinics per requested result, however common the prefix
+    PREFIX_CANDIDATES_PER_RESULT = 10
+    # Distance stops changing the score beyond this, so with a location the
+    # clinics this close are looked at before the alphabetical token range
+    NEARBY_KM = 50.0
+
+    def __init__(self):
+        self.entries: Dict[str, Tuple[str, str, Optional[float], Optional[float]]] = {}
+        self._tokens: List[Tuple[str, str]] = []  # sorted (token, clinic_id)
+        self._trigrams: Dict[str, set] = defaultdict(set)
+        self._cells: Dict[Tuple[int, int], set] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @staticmethod
+    def _name_tokens(norm: str) -> set:
+        return {norm, *(part for part in norm.split("_") if part)}
+
+    def add(
+        self,
+        clinic_id: str,
+        clinic_name: str,
+        lat: Optional[float] = None,
+        lon: Optional[float] = None,
+        _defer_sort: bool = False,
+    ) -> None:
+        """Insert a clinic, or update its location if already indexed."""
+        existing = self.entries.get(clinic_id)
+        if existing is not None:
+            if existing[1] == clinic_name:
+                self._move(clinic_id, existing, lat, lon)
+                return
+            self.remove(clinic_id)
+        norm = _normalize_clinic_name(clinic_name)
+        self.entries[clinic_id] = (norm, clinic_name, lat, lon)
+        for token in self._name_tokens(norm):
+            if _defer_sort:
+                self._tokens.append((token, clinic_id))
+            else:
+                bisect.insort(self._tokens, (token, clinic_id))
+        for gram in _trigrams(norm.replace("_", " ")):
+            self._trigrams[gram].add(clinic_id)
+        cell = _location_bucket(lat, lon)
+        if cell is not None:
+            self._cells[cell].add(clinic_id)
+
+    def _move(self, clinic_id: str, entry: tuple, lat: Optional[float], lon: Optional[float]) -> None:
+        if (entry[2], entry[3]) == (lat, lon):
+            return
+        old_cell = _location_bucket(entry[2], entry[3])
+        if old_cell is not None:
+            self._cells[old_cell].discard(clinic_id)
+        self.entries[clinic_id] = (entry[0], entry[1], lat, lon)
+        cell = _location_bucket(lat, lon)
+        if cell is not None:
+            self._cells[cell].add(clinic_id)
+
+    def remove(self, clinic_id: str) -> None:
+        entry = self.entries.pop(clinic_id, None)
+        if entry is None:
+            return
+        norm = entry[0]
+        for token in self._name_tokens(norm):
+            i = bisect.bisect_left(self._tokens, (token, clinic_id))
+            if i < len(self._tokens) and self._tokens[i] == (token, clinic_id):
+                del self._tokens[i]
+        for gram in _trigrams(norm.replace("_", " ")):
+            self._trigrams[gram].discard(clinic_id)
+        cell = _location_bucket(entry[2], entry[3])
+        if cell is not None:
+            self._cells[cell].discard(clinic_id)
+
+    def sync(self, clinics: Dict[str, Dict[str, Any]]) -> None:
+        """Bring the index in line with a clinics mapping (adds, moves, removals)."""
+        for clinic_id in [cid for cid in self.entries if cid not in clinics]:
+            self.remove(clinic_id)
+        # Large batches (e.g. the initial build) append tokens and sort once
+        bulk = len(clinics) - len(self.entries) > 64
+        for clinic_id, clinic_data in clinics.items():
+            location = clinic_data.get("location") or {}
+            self.add(
+                clinic_id,
+                clinic_data.get("clinic_name", ""),
+                location.get("latitude"),
+                location.get("longitude"),
+                _defer_sort=bulk,
+            )
+        if bulk:
+            self._tokens.sort()
+
+    @staticmethod
+    def _prefix_quality(norm: str, query: str) -> float:
+        """Quality of a prefix match on a normalized name (0.0: no name token starts with the query)."""
+        if norm == query:
+            return 1.0
+        if norm.startswith(query):
+            return 0.9
+        if "_" not in query and "_" + query in norm:
+            return 0.8
+        return 0.0
+
+    def _prefix_matches(self, query: str, cap: int) -> Dict[str, float]:
+        """clinic_id -> quality for the first ``cap`` clinics with a name or name token starting with the query."""
+        matches: Dict[str, float] = {}
+        tokens = self._tokens
+        i = bisect.bisect_left(tokens, (query, ""))
+        while i < len(tokens) and len(matches) < cap:
+            token, clinic_id = tokens[i]
+            if not token.startswith(query):
+                break
+            if clinic_id not in matches:
+                matches[clinic_id] = self._prefix_quality(self.entries[clinic_id][0], query)
+            i += 1
+        return matches
+
+    def _word_matches(self, query: str, cap: int) -> Dict[str, float]:
+        """clinic_id -> quality for names with a token starting with each query word, in any position.
+
+        Only the query word with the shortest token range is walked, up to
+        ``cap`` clinics; the other words are checked on those names.
+        """
+        words = [word for word in query.split("_") if word]
+        if len(words) < 2:
+            return {}
+        tokens = self._tokens
+        ranges = []
+        for word in words:
+            start = bisect.bisect_left(tokens, (word, ""))
+            ranges.append((bisect.bisect_left(tokens, (word + "\U0010ffff", ""), start) - start, start, word))
+        _, i, rarest = min(ranges)
+        matches: Dict[str, float] = {}
+        while i < len(tokens) and len(matches) < cap:
+            token, clinic_id = tokens[i]
+            if not token.startswith(rarest):
+                break
+            i += 1
+            name_tokens = self.entries[clinic_id][0].split("_")
+            if clinic_id in matches or not all(any(t.startswith(w) for t in name_tokens) for w in words):
+                continue
+            # Whole-word hits ("clinic 42" -> "Clinic 42") rank above "Clinic 420"
+            matches[clinic_id] = 0.78 if all(w in name_tokens for w in words) else 0.75
+        return matches
+
+    def _nearby_prefix_matches(self, query: str, lat: float, lon: float, cap: int) -> Dict[str, float]:
+        """Prefix matches within about ``NEARBY_KM``, nearest grid rings first, up to ``cap``."""
+        cell_km = 111.2 * LOCATION_BUCKET_DEG * max(math.cos(math.radians(lat)), 0.02)
+        rings = min(50, math.ceil(self.NEARBY_KM / cell_km))
+        center = _location_bucket(lat, lon)
+        matches: Dict[str, float] = {}
+        examined = 0
+        for ring in range(rings + 1):
+            for cell in self._ring(center, ring):
+                for clinic_id in self._cells.get(cell, ()):
+                    examined += 1
+                    quality = self._prefix_quality(self.entries[clinic_id][0], query)
+                    if quality:
+                        matches[clinic_id] = quality
+            if len(matches) >= cap or examined >= self.MAX_CANDIDATES * 4:
+                break
+        return matches
+
+    def _trigram_matches(self, query: str) -> Dict[str, float]:
+        """clinic_id -> quality from the share of query trigrams a name contains.
+
+        Scaled to stay below prefix hits.
+        """
+        query_grams = _trigrams(query.replace("_", " "))
+        postings = sorted(
+            (self._trigrams[g] for g in query_grams if self._trigrams.get(g)),
+            key=len,
+        )
+        candidates: set = set()
+        for posting in postings[: self.CANDIDATE_TRIGRAMS]:
+            for clinic_id in posting:
+                candidates.add(clinic_id)
+                if len(candidates) >= self.MAX_CANDIDATES:
+                    break
+            else:
+                continue
+            break
+        # Count shared trigrams with set intersections rather than re-deriving each name's trigrams
+        shared: Counter = Counter()
+        for posting in postings:
+            shared.update(candidates & posting)
+        matches = {}
+        for clinic_id, count in shared.items():
+            similarity = count / len(query_grams)
+            if similarity >= 0.4:
+                matches[clinic_id] = 0.7 * similarity
+        return matches
+
+    @staticmethod
+    def _ring(center: Tuple[int, int], ring: int) -> List[Tuple[int, int]]:
+        """Grid cells on the perimeter of the square ``ring`` cells out from ``center``."""
+        ci, cj = center
+        if ring == 0:
+            return [center]
+        cells = [(ci - ring, j) for j in range(cj - ring, cj + ring + 1)]
+        cells += [(ci + ring, j) for j in range(cj - ring, cj + ring + 1)]
+        cells += [(i, cj - ring) for i in range(ci - ring + 1, ci + ring)]
+        cells += [(i, cj + ring) for i in range(ci - ring + 1, ci + ring)]
+        return cells
+
+    def _nearest(self, lat: float, lon: float, limit: int, max_rings: int = 50) -> List[str]:
+        """Clinic ids around a point, found by walking grid rings outwards.
+
+        Only each ring's perimeter is visited, so the walk costs O(rings^2)
+        cell lookups; once that would exceed the number of clinics, sorting
+        the clinics by distance is cheaper.
+        """
+        if (2 * max_rings + 1) ** 2 > len(self.entries):
+            located = [
+                (_haversine_km(lat, lon, float(c_lat), float(c_lon)), clinic_id)
+                for clinic_id, (_, _, c_lat, c_lon) in self.entries.items()
+                if c_lat is not None and c_lon is not None
+            ]
+            return [clinic_id for _, clinic_id in heapq.nsmallest(limit, located)]
+        center = _location_bucket(lat, lon)
+        cells = self._cells
+        found: List[str] = []
+        extra_ring = None
+        for ring in range(max_rings + 1):
+            for cell in self._ring(center, ring):
+                found.extend(cells.get(cell, ()))
+            if extra_ring is None and len(found) >= limit:
+                extra_ring = ring + 1  # one more ring: a closer clinic may sit just across a cell edge
+            if extra_ring is not None and ring >= extra_ring:
+                break
+        return found
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[Tuple[float, str]]:
+        """``(distance_km, clinic_id)`` of every located clinic within ``radius_km``."""
+        west, south, east, north = _radius_bbox(lat, lon, radius_km)
+        i_lo, i_hi = math.floor(south / LOCATION_BUCKET_DEG), math.floor(north / LOCATION_BUCKET_DEG)
+        lon_cells = [
+            range(math.floor(lo / LOCATION_BUCKET_DEG), math.floor(hi / LOCATION_BUCKET_DEG) + 1)
+            for lo, hi in _lon_ranges(west, east)
+        ]
+        if (i_hi - i_lo + 1) * sum(len(cells) for cells in lon_cells) > len(self.entries):
+            # Wider than the data: walking the clinics is cheaper than the cells
+            candidates = self.entries.keys()
+        else:
+            candidates = [
+                clinic_id
+                for i in range(i_lo, i_hi + 1)
+                for cells in lon_cells
+                for j in cells
+                for clinic_id in self._cells.get((i, j), ())
+            ]
+        found = []
+        for clinic_id in candidates:
+            _, _, c_lat, c_lon = self.entries[clinic_id]
+            if c_lat is None or c_lon is None:
+                continue
+            distance_km = _haversine_km(lat, lon, float(c_lat), float(c_lon))
+            if distance_km <= radius_km:
+                found.append((distance_km, clinic_id))
+        return found
+
+    def search(
+        self,
+        query: str,
+        lat: Optional[float] = None,
+        lon: Optional[float] = None,
+        limit: int = 10,
+    ) -> List[Dict[str, Any]]:
+        """Rank clinics by match quality, nudged by distance when a location is given."""
+        norm_query = _normalize_clinic_name(query or "")
+        has_origin = lat is not None and lon is not None
+
+        if norm_query:
+            cap = limit * self.PREFIX_CANDIDATES_PER_RESULT
+            matches = self._nearby_prefix_matches(norm_query, lat, lon, cap) if has_origin else {}
+            for clinic_id, quality in self._prefix_matches(norm_query, cap).items():
+                matches.setdefault(clinic_id, quality)
+            if len(matches) < limit:
+                for clinic_id, quality in self._word_matches(norm_query, cap).items():
+                    matches.setdefault(clinic_id, quality)
+            if len(matches) < limit:
+                fuzzy = self._trigram_matches(norm_query)
+                for clinic_id, quality in heapq.nlargest(cap, fuzzy.items(), key=lambda item: item[1]):
+                    if quality > matches.get(clinic_id, 0.0):
+                        matches[clinic_id] = quality
+        elif has_origin:
+            matches = {clinic_id: 0.5 for clinic_id in self._nearest(lat, lon, limit)}
+        else:
+            matches = {clinic_id: 0.5 for _, clinic_id in self._tokens[:limit * 4]}
+
+        results = []
+        for clinic_id, quality in matches.items():
+            _, name, c_lat, c_lon = self.entries[clinic_id]
+            score = quality
+            distance_km = None
+            if has_origin and c_lat is not None and c_lon is not None:
+                distance_km = _haversine_km(lat, lon, float(c_lat), float(c_lon))
+                # Distance only reorders within roughly the same match quality
+                score -= 0.2 * min(1.0, distance_km / self.NEARBY_KM)
+            results.append((score, name, clinic_id, c_lat, c_lon, distance_km))
+
+        best = heapq.nsmallest(limit, results, key=lambda r: (-r[0], r[5] if r[5] is not None else 0.0, r[1]))
+        return [
+            {
+                "clinic_id": clinic_id,
+                "clinic_name": name,
+                "location": {"latitude": c_lat, "longitude": c_lon},
+                "distance_km": round(distance_km, 2) if distance_km is not None else None,
+                "score": round(score, 3),
+            }
+            for score, name, clinic_id, c_lat, c_lon, distance_km in best
+        ]
+
 
 DEFAULT_CLINIC_TEMPLATES = [
     {
@@ -714,16 +2700,570 @@ def _seed_default_clinics() -> Dict[str, Dict[str, Any]]:
     return seeded
 
 
-def _get_current_clinics(regenerate: bool = True) -> Dict[str, Dict[str, Any]]:
-    """Return the latest clinic aggregations with sensible fallbacks."""
-    clinics: Dict[str, Dict[str, Any]] = {}
+class CheckinDedupIndex:
+    """Recently written check-ins by idempotency key and by content fingerprint.
+
+    Both are plain dicts, so lookups are O(1); entries expire ``window``
+    seconds after they were written (oldest first, via a queue). Fingerprints
+    are rebuilt from the stored history whenever another worker's writes are
+    loaded; idempotency keys are only known to the worker that saw them.
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        self.by_key: Dict[str, Tuple[Tuple, Dict[str, Any]]] = {}
+        self.by_fingerprint: Dict[Tuple, Dict[str, Any]] = {}
+        self._expiry: deque = deque()  # (expires_at, table, lookup key), oldest first
+
+    @staticmethod
+    def fingerprint(
+        clinic_name: str,
+        check_in_dt: datetime,
+        check_out_dt: datetime,
+        latitude: float,
+        longitude: float,
+    ) -> Tuple:
+        return (
+            _normalize_clinic_name(clinic_name),
+            check_in_dt.isoformat(),
+            check_out_dt.isoformat(),
+            round(float(latitude), 5),
+            round(float(longitude), 5),
+        )
+
+    @classmethod
+    def fingerprint_of(cls, checkin: Dict[str, Any]) -> Optional[Tuple]:
+        """Fingerprint of a stored check-in, or None if it is incomplete."""
+        location = checkin.get("location") or {}
+        check_in_dt = _parse_timestamp(checkin.get("check_in_time"))
+        check_out_dt = _parse_timestamp(checkin.get("check_out_time"))
+        try:
+            return cls.fingerprint(
+                checkin["clinic_name"], check_in_dt, check_out_dt, location["latitude"], location["longitude"]
+            )
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return None
+
+    def _expire(self, now: float) -> None:
+        expiry = self._expiry
+        while expiry and expiry[0][0] <= now:
+            expires_at, table, lookup = expiry.popleft()
+            entry = table.get(lookup)
+            # Only drop it if it was not written again (and re-queued) since
+            if entry is not None and entry[0] == expires_at:
+                del table[lookup]
+
+    def _remember(self, table: Dict, lookup, value, written_at: float) -> None:
+        expires_at = written_at + self.window
+        table[lookup] = (expires_at, value)
+        self._expiry.append((expires_at, table, lookup))
+
+    def rebuild(self, checkins: List[Dict[str, Any]], now: Optional[float] = None) -> None:
+        """Re-index fingerprints of the check-ins written within the window."""
+        now = time.time() if now is None else now
+        # Idempotency keys survive a rebuild; their queue entries are already in expiry order
+        key_expiry = [item for item in self._expiry if item[1] is self.by_key]
+        self.by_fingerprint = {}
+        self._expiry = deque()
+        recent = []
+        # Check-ins are appended in write order, so walk back until the window ends
+        for checkin in reversed(checkins):
+            created = _parse_timestamp(checkin.get("created_at"))
+            if created is None or created.tzinfo is None:
+                continue
+            written_at = created.timestamp()
+            if written_at + self.window <= now:
+                break
+            recent.append((written_at, checkin))
+        for written_at, checkin in reversed(recent):
+            fingerprint = self.fingerprint_of(checkin)
+            if fingerprint is not None:
+                self._remember(self.by_fingerprint, fingerprint, checkin, written_at)
+        self._expiry = deque(heapq.merge(key_expiry, self._expiry, key=lambda item: item[0]))
+
+    def add_stored(self, checkin: Dict[str, Any], now: Optional[float] = None) -> None:
+        """Index a check-in another worker wrote, as of its ``created_at``."""
+        created = _parse_timestamp(checkin.get("created_at"))
+        if created is None or created.tzinfo is None:
+            return
+        written_at = created.timestamp()
+        if written_at + self.window <= (time.time() if now is None else now):
+            return
+        fingerprint = self.fingerprint_of(checkin)
+        if fingerprint is not None:
+            self._remember(self.by_fingerprint, fingerprint, checkin, written_at)
+
+    def recent_checkins(self) -> List[Dict[str, Any]]:
+        """Check-ins whose fingerprints are still inside the window (for checkpoints)."""
+        self._expire(time.time())
+        return [entry[1] for entry in self.by_fingerprint.values()]
+
+    def find(self, key: Optional[str], fingerprint: Tuple, now: Optional[float] = None):
+        """Return ``(original check-in or None, key_conflict)`` for a new submission."""
+        self._expire(time.time() if now is None else now)
+        if key:
+            known = self.by_key.get(key)
+            if known is not None:
+                known_fingerprint, checkin = known[1]
+                return checkin, known_fingerprint != fingerprint
+        known = self.by_fingerprint.get(fingerprint)
+        return (known[1] if known is not None else None), False
+
+    def remember(self, key: Optional[str], fingerprint: Tuple, checkin: Dict[str, Any], now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        if key:
+            self._remember(self.by_key, key, (fingerprint, checkin), now)
+        self._remember(self.by_fingerprint, fingerprint, checkin, now)
+
+    def keys_only(self, now: Optional[float] = None) -> None:
+        """Drop the fingerprints (a rebuild re-reads them from the log) and expired keys."""
+        self.by_fingerprint = {}
+        self._expiry = deque(item for item in self._expiry if item[1] is self.by_key)
+        self._expire(time.time() if now is None else now)
+
+    def prune(self, now: Optional[float] = None) -> None:
+        """Forget entries whose window has passed."""
+        self._expire(time.time() if now is None else now)
+
+    def __len__(self) -> int:
+        return len(self.by_key) + len(self.by_fingerprint)
+
+
+class ClinicSnapshot:
+    """In-memory view of clinic aggregations, the predictor and the check-in log.
+
+    Built once at startup and updated in place by writes, so read endpoints
+    do not reload and re-aggregate the full history on every request. When
+    several workers share the data, ``versions`` records the data-version
+    counters the snapshot reflects and ``position`` where in the stored
+    check-in array it stands; see :meth:`sync`. The full check-in list is only
+    read from storage when something asks for it.
+
+    With geographic sharding each shard is a snapshot over its own check-in
+    log (``log_key``), and the process-wide snapshot only carries the model
+    plus ``shards``, the :class:`ClinicShardStore`.
+    """
+
+    def __init__(
+        self,
+        clinics: Dict[str, Dict[str, Any]],
+        model: Optional[WaitTimePredictor],
+        versions: Tuple[int, ...] = (),
+        aggregator: Optional[ClinicAggregator] = None,
+        position: Optional[CheckinPosition] = None,
+        checkins: Optional[List[Dict[str, Any]]] = None,
+        recent_checkins: Optional[List[Dict[str, Any]]] = None,
+        log_key: str = CHECKINS_INDEX_KEY,
+    ):
+        self.clinics = clinics
+        self.model = model
+        self.versions = versions
+        self.aggregator = aggregator or ClinicAggregator()
+        self.position = position
+        self.log_key = log_key
+        self.shards: Optional["ClinicShardStore"] = None
+        self.checkpoint_count = 0
+        self._checkins = CompactCheckins(checkins) if checkins is not None else None
+        self.search_index = ClinicSearchIndex()
+        self.dedup = CheckinDedupIndex(DEDUP_WINDOW_SECONDS)
+        self.dedup.rebuild(recent_checkins if recent_checkins is not None else checkins or [])
+        self.search_index.sync(self.clinics)
+
+    @property
+    def checkin_count(self) -> int:
+        return self.position[0] if self.position else 0
+
+    @property
+    def checkins(self) -> CompactCheckins:
+        """Full check-in history (read from storage on first use after a checkpoint start)."""
+        if self._checkins is None:
+            checkins, _ = _load_checkin_log(key=self.log_key)
+            self._checkins = CompactCheckins(checkins[:self.checkin_count])
+        return self._checkins
+
+    def _reset(self, checkins: List[Dict[str, Any]], position: Optional[CheckinPosition]) -> None:
+        self.aggregator = ClinicAggregator()
+        for checkin in checkins:
+            self.aggregator.add(checkin)
+        self._checkins = CompactCheckins(checkins)
+        self.position = position
+        self.dedup.rebuild(checkins)
+
+    def refresh_aggregations(self) -> None:
+        """Recompute every clinic from the running totals (no storage reads)."""
+        if self.aggregator.groups:
+            clinics = self.aggregator.clinics()
+            self.clinics = clinics
+            self.search_index.sync(clinics)
+
+    def sync(self, versions: Tuple[int, ...]) -> None:
+        """Reload only the parts another worker has changed since this snapshot."""
+        if versions == self.versions:
+            return
+        model_slot = DataVersion.SLOTS.index("model")
+        if not self.versions or versions[model_slot] != self.versions[model_slot]:
+            self.model = _load_model(revalidate=True, model=self.model)
+        if self.shards is not None:
+            self.versions = versions
+        else:
+            self.sync_checkins(versions)
+
+    def sync_checkins(self, versions: Tuple[int, ...]) -> None:
+        """The check-in half of :meth:`sync` (all a shard needs)."""
+        checkins_slot = DataVersion.SLOTS.index("checkins")
+        if not self.versions or versions[checkins_slot] != self.versions[checkins_slot]:
+            self._load_new_checkins()
+        self.versions = versions
+
+    def _load_new_checkins(self) -> None:
+        """Fold in check-ins appended by other workers, reading only the tail."""
+        loaded = _load_checkins_since(self.position, revalidate=True, key=self.log_key) if self.position else None
+        if loaded is None or not self.aggregator.groups:
+            # No position yet, or the array was rewritten: start over from all of it
+            self._reset(*_load_checkin_log(revalidate=True, key=self.log_key))
+            self.refresh_aggregations()
+            return
+        tail, self.position = loaded
+        keys = []
+        for checkin in tail:
+            keys.append(self.aggregator.add(checkin))
+            self.dedup.add_stored(checkin)
+        if self._checkins is not None:
+            self._checkins.extend(tail)
+        self._update_clinics(keys)
+
+    def expire_recent(self, now_ts: float) -> int:
+        """Recompute the clinics whose reports have aged out of the 7-day window."""
+        keys = self.aggregator.expire(now_ts)
+        if keys:
+            self._update_clinics(keys)
+        return len(keys)
+
+    def _update_clinics(self, keys: List[Optional[str]]) -> None:
+        """Re-aggregate just the given clinics."""
+        # Copy-on-write so concurrent readers never see a dict mid-update
+        clinics = dict(self.clinics)
+        now = datetime.now(timezone.utc)
+        for key in dict.fromkeys(keys):
+            if key is None:
+                continue
+            clinic_data = self.aggregator.clinic(key, now)
+            clinics[key] = clinic_data
+            location = clinic_data.get("location") or {}
+            self.search_index.add(
+                key,
+                clinic_data.get("clinic_name", ""),
+                location.get("latitude"),
+                location.get("longitude"),
+            )
+        self.clinics = clinics
+
+    def add_checkin(self, checkin: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Fold in a new check-in and re-aggregate only the clinic it belongs to."""
+        had_clinics = bool(self.aggregator.groups)
+        key = self.aggregator.add(checkin)
+        if self._checkins is not None:
+            self._checkins.append(checkin)
+
+        if not had_clinics:
+            # Replace seeded/stored fallbacks with real aggregations
+            self.refresh_aggregations()
+        else:
+            self._update_clinics([key])
+        return self.clinics
+
+
+class ClinicShardStore:
+    """Clinic state split into geographic shards that are loaded on demand.
+
+    A shard covers ``factor`` x ``factor`` cells of the ``_location_bucket``
+    grid and has its own check-in log; in memory it is a
+    :class:`ClinicSnapshot` over that log, its clinics aggregated on load. Writes only touch their shard and
+    area queries only load the shards they intersect. Resident shards are
+    evicted least recently used once they exceed ``memory_budget`` bytes, each
+    counted at the size of its stored check-in log (an upper bound on what it
+    keeps in memory). An evicted shard's idempotency keys are kept aside until
+    the dedup window passes, so they survive a reload; its fingerprints are
+    re-read from the log instead. A manifest lists the shards that exist.
+    """
+
+    UNPLACED = "unplaced"  # check-ins without a location, grouped by name only
+
+    def __init__(self, shard_deg: float, memory_budget: int):
+        self.factor = max(1, round(shard_deg / LOCATION_BUCKET_DEG))
+        self.shard_deg = round(self.factor * LOCATION_BUCKET_DEG, 6)
+        self.memory_budget = memory_budget
+        self.manifest_key = f"{SHARDS_PREFIX}/index.json"
+        self.known: Dict[str, Optional[Tuple[int, int]]] = {}  # shard id -> shard cell
+        self._manifest_version: Optional[int] = None
+        self._resident: "OrderedDict[str, ClinicSnapshot]" = OrderedDict()
+        self._evicted_dedup: Dict[str, CheckinDedupIndex] = {}
+        self.metrics = {"loads": 0, "evictions": 0}
+
+    @staticmethod
+    def log_key(shard_id: str) -> str:
+        return f"{SHARDS_PREFIX}/{shard_id}/checkins.json"
+
+    def _shard_of_bucket(self, bucket: Optional[Tuple[int, int]]) -> str:
+        if bucket is None:
+            return self.UNPLACED
+        return f"{bucket[0] // self.factor}_{bucket[1] // self.factor}"
+
+    @staticmethod
+    def _cell(shard_id: str) -> Optional[Tuple[int, int]]:
+        try:
+            i, j = shard_id.split("_")
+            return int(i), int(j)
+        except ValueError:
+            return None
+
+    def shard_for_checkin(self, checkin: Dict[str, Any]) -> str:
+        location = checkin.get("location") or {}
+        return self._shard_of_bucket(_location_bucket(location.get("latitude"), location.get("longitude")))
+
+    def shard_for_clinic(self, clinic_id: str) -> str:
+        """Shard holding an aggregated clinic id (``name__latbucket_lonbucket``)."""
+        _, sep, suffix = clinic_id.rpartition("__")
+        cell = self._cell(suffix) if sep else None
+        return self._shard_of_bucket(cell)
+
+    def refresh_manifest(self, versions: Tuple[int, ...]) -> None:
+        """Re-read the shard list when another write may have added a shard."""
+        version = versions[DataVersion.SLOTS.index("checkins")] if versions else None
+        if version is not None and version == self._manifest_version:
+            return
+        manifest = _load_clinics(self.manifest_key)
+        self.known = {shard_id: self._cell(shard_id) for shard_id in manifest.get("shards", [])}
+        self._manifest_version = version
+
+    def shard_ids(self, versions: Tuple[int, ...], bbox: Optional[Tuple[float, float, float, float]] = None) -> List[str]:
+        """Existing shards, or only those intersecting ``bbox`` (west, south, east, north)."""
+        self.refresh_manifest(versions)
+        if bbox is None:
+            return list(self.known)
+        west, south, east, north = bbox
+        i_lo = math.floor(south / LOCATION_BUCKET_DEG) // self.factor
+        i_hi = math.floor(north / LOCATION_BUCKET_DEG) // self.factor
+        lon_ranges = [
+            (math.floor(lo / LOCATION_BUCKET_DEG) // self.factor, math.floor(hi / LOCATION_BUCKET_DEG) // self.factor)
+            for lo, hi in _lon_ranges(west, east)
+        ]
+        return [
+            shard_id
+            for shard_id, cell in self.known.items()
+            if cell is not None
+            and i_lo <= cell[0] <= i_hi
+            and any(j_lo <= cell[1] <= j_hi for j_lo, j_hi in lon_ranges)
+        ]
+
+    def get(self, shard_id: str, versions: Tuple[int, ...]) -> ClinicSnapshot:
+        """Resident shard, loaded on first use and brought up to date with other workers' writes."""
+        shard = self._resident.get(shard_id)
+        if shard is None:
+            key = self.log_key(shard_id)
+            checkins, position = _load_checkin_log(revalidate=True, key=key)
+            aggregator = ClinicAggregator()
+            for checkin in checkins:
+                aggregator.add(checkin)
+            clinics = aggregator.clinics() if aggregator.groups else {}
+            dedup = self._evicted_dedup.pop(shard_id, None)
+            shard = ClinicSnapshot(
+                clinics, None, versions, aggregator, position, None, [] if dedup is not None else checkins, log_key=key
+            )
+            if dedup is not None:
+                # Keys are not in the log; fingerprints are re-read from its tail
+                dedup.rebuild(checkins)
+                shard.dedup = dedup
+            self._resident[shard_id] = shard
+            self.metrics["loads"] += 1
+            _wake_expiry()
+        else:
+            self._resident.move_to_end(shard_id)
+            shard.sync_checkins(versions)
+        self._evict()
+        return shard
+
+    def resident(self) -> List[Tuple[str, ClinicSnapshot]]:
+        return list(self._resident.items())
+
+    def _resident_bytes(self) -> int:
+        return sum(shard.position[1] for shard in self._resident.values() if shard.position)
+
+    def _evict(self) -> None:
+        # The most recently used shard always stays, even if it alone is over budget
+        while len(self._resident) > 1 and self._resident_bytes() > self.memory_budget:
+            shard_id, shard = self._resident.popitem(last=False)
+            shard.dedup.keys_only()
+            if len(shard.dedup):
+                self._evicted_dedup[shard_id] = shard.dedup
+            self.metrics["evictions"] += 1
+        self._prune_evicted_dedup()
+
+    def _prune_evicted_dedup(self, now: Optional[float] = None) -> None:
+        """Drop evicted shards' idempotency keys once the dedup window has passed."""
+        now = time.time() if now is None else now
+        for shard_id, dedup in list(self._evicted_dedup.items()):
+            dedup.prune(now)
+            if not len(dedup):
+                del self._evicted_dedup[shard_id]
+
+    def record_write(self, shard_id: str, shard: ClinicSnapshot) -> None:
+        """After a write to ``shard``: register it if it is new and keep within budget.
+
+        Clinics are not stored per shard; loading a shard aggregates its log.
+        """
+        if shard_id not in self.known:
+            # Merge with what other workers may have added since we last looked
+            manifest = _load_clinics(self.manifest_key)
+            shards = set(manifest.get("shards", [])) | set(self.known) | {shard_id}
+            _save_clinics({"shard_deg": self.shard_deg, "shards": sorted(shards)}, self.manifest_key)
+            self.known = {sid: self._cell(sid) for sid in shards}
+        self._evict()
+
+    def clinics(self, versions: Tuple[int, ...], shard_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Merged clinics of the given shards."""
+        merged: Dict[str, Dict[str, Any]] = {}
+        for shard_id in shard_ids:
+            merged.update(self.get(shard_id, versions).clinics)
+        return merged
+
+    def all_checkins(self, versions: Tuple[int, ...]) -> List[Dict[str, Any]]:
+        """Every shard's check-ins in one list, ordered by ``created_at``."""
+        checkins: List[Dict[str, Any]] = []
+        for shard_id in self.shard_ids(versions):
+            checkins.extend(_load_checkin_log(key=self.log_key(shard_id))[0])
+        checkins.sort(key=lambda c: c.get("created_at") or "")
+        return checkins
+
+    def migrate(self) -> None:
+        """Split the unsharded check-in log (or shards of another size) into shards.
+
+        Runs once, when the manifest is missing or records a different shard
+        size; the old files are left in place.
+        """
+        manifest = _load_clinics(self.manifest_key)
+        if manifest.get("shard_deg") == self.shard_deg:
+            return
+        if manifest:
+            old = manifest.get("shards", [])
+            checkins = [c for shard_id in old for c in _load_checkin_log(key=self.log_key(shard_id))[0]]
+            checkins.sort(key=lambda c: c.get("created_at") or "")
+        else:
+            checkins = _load_checkin_log()[0]
+
+        groups: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for checkin in checkins:
+            groups[self.shard_for_checkin(checkin)].append(checkin)
+        for shard_id, shard_checkins in groups.items():
+            _write_checkins_bytes(json.dumps(shard_checkins, indent=2).encode("utf-8"), self.log_key(shard_id))
+        _save_clinics({"shard_deg": self.shard_deg, "shards": sorted(groups)}, self.manifest_key)
+        print(f"Split {len(checkins)} check-ins into {len(groups)} shards of {self.shard_deg} degrees")
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            **self.metrics,
+            "shard_deg": self.shard_deg,
+            "shards": len(self.known),
+            "resident_shards": len(self._resident),
+            "resident_clinics": sum(len(shard.clinics) for shard in self._resident.values()),
+            "resident_bytes": self._resident_bytes(),
+            "memory_budget_bytes": self.memory_budget,
+            "evicted_idempotency_keys": sum(len(dedup) for dedup in self._evicted_dedup.values()),
+        }
 
-    if regenerate:
-        checkins = _load_checkins()
-        if checkins:
-            clinics = _update_clinic_aggregations(checkins)
-            if clinics:
-                _save_clinics(clinics)
+
+_snapshot: Optional[ClinicSnapshot] = None
+_snapshot_lock = threading.RLock()
+
+
+def _model_needs_retrain(model: WaitTimePredictor) -> bool:
+    """Whether a stored model predates UTC slots or no longer matches the configured mode or sketch settings."""
+    return (
+        not model.utc_hours
+        or model.mode != PREDICTOR_MODE
+        or model.sketch_per_hour != SKETCH_PER_HOUR
+        or model.missing_sketches()
+    )
+
+
+def _restore_checkpoint():
+    """Derived state from the latest checkpoint plus the check-ins written after it.
+
+    Returns ``(aggregator, position, recent check-ins, model, tail length,
+    checkpoint count)``, or None when there is no checkpoint that matches the
+    stored check-ins.
+    """
+    state = _load_checkpoint()
+    if state is None:
+        return None
+    checkpoint_position = tuple(state["position"])
+    loaded = _load_checkins_since(checkpoint_position)
+    if loaded is None:
+        print("Checkpoint does not match the stored check-ins; rebuilding from the full history")
+        return None
+    tail, position = loaded
+    aggregator = ClinicAggregator(state["groups"])
+    for checkin in tail:
+        aggregator.add(checkin)
+    model = _replay_checkins(WaitTimePredictor.from_dict(state["model"]), tail)
+    return aggregator, position, state["recent_checkins"] + tail, model, len(tail), checkpoint_position[0]
+
+
+def _retrain_if_needed(model: WaitTimePredictor, load_checkins: Callable[[], List[Dict[str, Any]]]) -> WaitTimePredictor:
+    """Rebuild the model from the history once if the mode or sketch settings changed."""
+    if not _model_needs_retrain(model):
+        return model
+    with _data_version.locked():
+        model = _load_model(revalidate=True)
+        if _model_needs_retrain(model):
+            checkins = load_checkins()
+            print(f"Retraining predictor in {PREDICTOR_MODE!r} mode from {len(checkins)} check-ins")
+            model = _train_model(checkins)
+            _save_model(model)
+    return model
+
+
+def _build_sharded_snapshot(versions: Tuple[int, ...]) -> ClinicSnapshot:
+    """Snapshot holding only the model; clinic state lives in lazily loaded shards."""
+    store = ClinicShardStore(SHARD_DEG, int(SHARD_MEMORY_MB * 1024 * 1024))
+    with _data_version.locked():
+        store.migrate()
+    store.refresh_manifest(versions)
+    model = _retrain_if_needed(_load_model(), lambda: store.all_checkins(versions))
+    snapshot = ClinicSnapshot({}, model, versions)
+    snapshot.shards = store
+    return snapshot
+
+
+def _build_snapshot() -> ClinicSnapshot:
+    """Load clinics, the model and check-in state from storage into a fresh snapshot.
+
+    Starts from the latest checkpoint when it matches the stored check-ins,
+    so only the check-ins written since are read and replayed.
+    """
+    # Read the counters first: a write racing with this load only causes an extra sync
+    versions = _data_version.read()
+    if SHARD_DEG > 0:
+        return _build_sharded_snapshot(versions)
+    checkins: Optional[List[Dict[str, Any]]] = None
+    checkpoint_model: Optional[WaitTimePredictor] = None
+    checkpoint_count = 0
+    restored = _restore_checkpoint() if CHECKPOINT_EVERY > 0 else None
+    if restored is not None:
+        aggregator, position, recent_checkins, checkpoint_model, replayed, checkpoint_count = restored
+        print(f"Restored checkpoint at {checkpoint_count} check-ins, replayed {replayed} since")
+    else:
+        checkins, position = _load_checkin_log()
+        aggregator = ClinicAggregator()
+        for checkin in checkins:
+            aggregator.add(checkin)
+        recent_checkins = None
+
+    clinics: Dict[str, Dict[str, Any]] = {}
+    if aggregator.groups:
+        clinics = aggregator.clinics()
+        if clinics:
+            _save_clinics(clinics)
 
     if not clinics:
         clinics = _load_clinics()
@@ -733,48 +3273,773 @@ def _get_current_clinics(regenerate: bool = True) -> Dict[str, Dict[str, Any]]:
         if clinics:
             _save_clinics(clinics)
 
-    return clinics
+    model = _load_model()
+    if not model.stats and checkpoint_model is not None and checkpoint_model.stats:
+        # Model file missing or unreadable: the checkpoint plus the replayed tail stands in
+        model = checkpoint_model
+    model = _retrain_if_needed(model, lambda: checkins if checkins is not None else _load_checkin_log()[0])
+
+    snapshot = ClinicSnapshot(clinics, model, versions, aggregator, position, checkins, recent_checkins)
+    snapshot.checkpoint_count = checkpoint_count
+    if CHECKPOINT_EVERY > 0 and snapshot.checkin_count - checkpoint_count >= CHECKPOINT_EVERY:
+        _save_checkpoint(snapshot)
+    return snapshot
+
+
+def _get_snapshot() -> ClinicSnapshot:
+    """Return the process-wide snapshot, building or refreshing it as needed."""
+    global _snapshot
+    with _snapshot_lock:
+        if _snapshot is None:
+            _snapshot = _build_snapshot()
+        else:
+            _snapshot.sync(_data_version.read())
+        return _snapshot
+
+
+def _clinics_in_area(
+    snapshot: ClinicSnapshot, bbox: Optional[Tuple[float, float, float, float]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """Clinics that may lie in ``bbox`` (all of them when unsharded or without a bbox).
+
+    When sharded only the intersecting shards are loaded; callers still
+    filter by exact position.
+    """
+    store = snapshot.shards
+    if store is None:
+        return snapshot.clinics
+    with _snapshot_lock:
+        return store.clinics(snapshot.versions, store.shard_ids(snapshot.versions, bbox))
+
+
+def _clinic_part(snapshot: ClinicSnapshot, clinic_id: str) -> Optional[ClinicSnapshot]:
+    """The snapshot, or shard, that would hold ``clinic_id``."""
+    store = snapshot.shards
+    if store is None:
+        return snapshot
+    with _snapshot_lock:
+        shard_id = store.shard_for_clinic(clinic_id)
+        if shard_id not in store.shard_ids(snapshot.versions):
+            return None
+        return store.get(shard_id, snapshot.versions)
+
+
+def _find_clinic(snapshot: ClinicSnapshot, clinic_id: str) -> Optional[Dict[str, Any]]:
+    part = _clinic_part(snapshot, clinic_id)
+    return part.clinics.get(clinic_id) if part is not None else None
+
+
+def _all_checkins(snapshot: ClinicSnapshot) -> Iterable[Dict[str, Any]]:
+    if snapshot.shards is None:
+        return snapshot.checkins
+    with _snapshot_lock:
+        return snapshot.shards.all_checkins(snapshot.versions)
+
+
+class ClinicUpdateBroadcaster:
+    """Fan-out of per-clinic deltas to Server-Sent Events clients.
+
+    Each event is serialized once into a bounded ring buffer tagged with a
+    sequence number. Clients park on a single shared ``asyncio.Event`` that is
+    swapped on every publish, so thousands of idle connections cost one
+    suspended coroutine each and no polling.
+
+    Sequence numbers are per worker, so event ids carry ``stream_id`` (random
+    per process) and an id from another worker or an earlier process is only
+    good for a ``resync``.
+    """
+
+    def __init__(self, max_events: int = 512):
+        self._events: deque = deque(maxlen=max_events)
+        self._seq = 0
+        self.stream_id = uuid.uuid4().hex[:8]
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.subscribers = 0
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.stream_id}.{seq}"
+
+    def parse_event_id(self, event_id: str) -> Optional[int]:
+        """Sequence number of an id this worker issued, or None."""
+        stream_id, _, seq = event_id.partition(".")
+        if stream_id != self.stream_id or not seq.isdigit() or int(seq) > self._seq:
+            return None
+        return int(seq)
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+
+    def publish(self, event: str, data: Optional[Dict[str, Any]] = None) -> None:
+        """Queue an event for every client; safe to call from worker threads."""
+        if self._loop is None:
+            return
+        message = f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+        self._loop.call_soon_threadsafe(self._append, message)
+
+    def keepalive(self) -> None:
+        """Wake every client so proxies see traffic on idle connections."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._append, None)
+
+    def _append(self, message: Optional[str]) -> None:
+        if message is not None:
+            self._seq += 1
+            self._events.append((self._seq, message))
+        wakeup, self._wakeup = self._wakeup, asyncio.Event()
+        wakeup.set()
+
+    async def wait(self, after_seq: int) -> Tuple[List[Tuple[int, str]], bool]:
+        """Block until something is published after ``after_seq``.
+
+        Returns the new ``(seq, message)`` pairs and whether events were lost
+        because the client fell further behind than the ring buffer holds.
+        """
+        if self._seq <= after_seq:
+            await self._wakeup.wait()
+        if not self._events or self._seq <= after_seq:
+            return [], False
+        missed = self._events[0][0] > after_seq + 1
+        return [(seq, msg) for seq, msg in self._events if seq > after_seq], missed
+
+
+_broadcaster = ClinicUpdateBroadcaster()
+_stream_kick: Optional[asyncio.Event] = None
+
+
+def _clinic_delta(agg_id: str, clinic_data: Dict[str, Any], model: WaitTimePredictor) -> Optional[Dict[str, Any]]:
+    """Small payload describing one clinic's current map state."""
+    feature = _clinic_feature(agg_id, clinic_data, model, datetime.now(timezone.utc))
+    if feature is None:
+        return None
+    lon, lat = feature["geometry"]["coordinates"]
+    props = feature["properties"]
+    return {
+        "clinic_id": agg_id,
+        "clinic_name": props["clinic_name"],
+        "latitude": lat,
+        "longitude": lon,
+        "latest_wait_time": props["latest_wait_time"],
+        "predicted_wait_time": props["predicted_wait_time"],
+        "current_condition": props["current_condition"],
+        "reliability_score": props["reliability_score"],
+        "total_reports": props["total_reports"],
+        "color": props["color"],
+    }
+
+
+def _collect_clinic_deltas(published: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Diff the snapshot against what was last published and return changed clinics."""
+    snapshot = _get_snapshot()
+    deltas = []
+    with _snapshot_lock:
+        if snapshot.shards is None:
+            clinics = snapshot.clinics
+        else:
+            # Only shards someone has looked at recently are resident, which is where viewers are
+            clinics = {}
+            for _, shard in snapshot.shards.resident():
+                shard.sync_checkins(snapshot.versions)
+                clinics.update(shard.clinics)
+        for agg_id, clinic_data in clinics.items():
+            marker = (
+                clinic_data.get("total_reports"),
+                clinic_data.get("latest_wait_time"),
+                clinic_data.get("current_condition"),
+                clinic_data.get("reliability_score"),
+            )
+            if published.get(agg_id) == marker:
+                continue
+            published[agg_id] = marker
+            delta = _clinic_delta(agg_id, clinic_data, snapshot.model)
+            if delta is not None:
+                deltas.append(delta)
+    return deltas
+
+
+async def _watch_clinic_updates() -> None:
+    """Single per-worker task that turns committed check-ins into stream events.
+
+    Local writes and expirations wake it immediately; writes from other
+    workers are noticed through the shared data-version counters within
+    ``STREAM_POLL_SECONDS``.
+    """
+    global _stream_kick
+    _stream_kick = asyncio.Event()
+    published: Dict[str, Any] = {}
+    await asyncio.to_thread(_collect_clinic_deltas, published)  # baseline, not broadcast
+    seen_versions = _data_version.read()
+    last_keepalive = time.monotonic()
+
+    while True:
+        try:
+            await asyncio.wait_for(_stream_kick.wait(), timeout=STREAM_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        kicked = _stream_kick.is_set()
+        _stream_kick.clear()
+
+        versions = _data_version.read()
+        # Expirations only bump the version in one worker, so a kick counts too
+        if versions != seen_versions or kicked:
+            seen_versions = versions
+            try:
+                deltas = await asyncio.to_thread(_collect_clinic_deltas, published)
+            except Exception as exc:  # keep streaming even if a refresh fails
+                print(f"Warning: clinic update refresh failed: {exc}")
+                deltas = []
+            for delta in deltas:
+                _broadcaster.publish("clinic", delta)
+
+        if time.monotonic() - last_keepalive >= STREAM_KEEPALIVE_SECONDS:
+            last_keepalive = time.monotonic()
+            _broadcaster.keepalive()
+
+
+# Recent-report expiry counters reported by /health (per worker)
+EXPIRY_METRICS: Dict[str, Any] = {"runs": 0, "clinics_updated": 0, "next_due": None}
+_expiry_kick: Optional[asyncio.Event] = None
+_expiry_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _wake_expiry() -> None:
+    """Have the expiry task look again (a shard was loaded); safe from any thread."""
+    if _expiry_loop is not None and _expiry_kick is not None:
+        _expiry_loop.call_soon_threadsafe(_expiry_kick.set)
+
+
+_expiry_leader_fd: Optional[int] = None
+
+
+def _is_expiry_leader() -> bool:
+    """Whether this worker bumps the ``clinics`` version for expirations.
+
+    Every worker ages its own snapshot at the same moments, so one bump per
+    expiry is enough. The worker that wins a non-blocking flock on
+    ``.expiry_leader`` keeps it for life; when it exits, the next worker to
+    ask takes over.
+    """
+    global _expiry_leader_fd
+    if fcntl is None:
+        return True
+    if _expiry_leader_fd is None:
+        RUNTIME_DIR.mkdir(parents=True, exist_ok=True)
+        fd = os.open(RUNTIME_DIR / ".expiry_leader", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        _expiry_leader_fd = fd
+    return True
+
+
+def _expire_recent_reports() -> Tuple[int, Optional[float]]:
+    """Age reports out of the 7-day window.
+
+    Only clinics with an expiring report are recomputed. When any changed, the
+    expiry leader (see :func:`_is_expiry_leader`) bumps the ``clinics``
+    version. Returns ``(clinics updated, when the next report is due)``.
+    """
+    snapshot = _get_snapshot()
+    now_ts = time.time()
+    with _snapshot_lock:
+        if snapshot.shards is None:
+            targets = [snapshot]
+        else:
+            targets = [shard for _, shard in snapshot.shards.resident()]
+        changed = sum(target.expire_recent(now_ts) for target in targets)
+        due = [t for t in (target.aggregator.next_expiry() for target in targets) if t is not None]
+    if changed:
+        EXPIRY_METRICS["runs"] += 1
+        EXPIRY_METRICS["clinics_updated"] += changed
+        if _is_expiry_leader():
+            _data_version.bump("clinics")
+    EXPIRY_METRICS["next_due"] = (
+        datetime.fromtimestamp(min(due), timezone.utc).isoformat() if due else None
+    )
+    return changed, (min(due) if due else None)
+
+
+async def _expire_recent_reports_loop() -> None:
+    """Per-worker task that sleeps until the next report leaves the window.
+
+    Reports written meanwhile expire after the ones already queued, so only a
+    newly loaded shard can move the next due time earlier; loading one wakes
+    the task.
+    """
+    global _expiry_kick, _expiry_loop
+    _expiry_kick = asyncio.Event()
+    _expiry_loop = asyncio.get_running_loop()
+    while True:
+        _expiry_kick.clear()
+        try:
+            changed, due = await asyncio.to_thread(_expire_recent_reports)
+        except Exception as exc:  # keep the timer going even if one pass fails
+            print(f"Warning: expiring recent reports failed: {exc}")
+            changed, due = 0, None
+        if changed and _stream_kick is not None:
+            _stream_kick.set()
+        delay = EXPIRY_MAX_SLEEP_SECONDS if due is None else min(due - time.time(), EXPIRY_MAX_SLEEP_SECONDS)
+        try:
+            await asyncio.wait_for(_expiry_kick.wait(), timeout=max(delay, 0.0))
+        except asyncio.TimeoutError:
+            pass
+
+
+@app.middleware("http")
+async def _record_first_response(request: Request, call_next):
+    """Record time from process import to the first response served."""
+    response = await call_next(request)
+    if STARTUP_METRICS["first_response_seconds"] is None:
+        STARTUP_METRICS["first_response_seconds"] = round(time.perf_counter() - _IMPORT_STARTED, 4)
+        print(f"First response served {STARTUP_METRICS['first_response_seconds']}s after import")
+    return response
+
+
+class TokenBucketLimiter:
+    """In-memory token buckets keyed by client or clinic, O(1) per check.
+
+    Each key refills at ``per_minute / 60`` tokens per second up to ``burst``.
+    Buckets are kept in LRU order and at most ``max_keys`` are tracked; an
+    evicted (long idle) key simply starts again with a full bucket.
+    """
+
+    def __init__(self, per_minute: float, burst: float, max_keys: int = 100_000):
+        self.rate = max(0.0, per_minute) / 60.0
+        self.burst = max(1.0, burst)
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()  # key -> [tokens, updated_at]
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def acquire(self, key: str, now: Optional[float] = None) -> float:
+        """Take a token for ``key``: 0.0 if allowed, else seconds until one is available."""
+        if not self.enabled:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            return 0.0
+        return (1.0 - bucket[0]) / self.rate
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+_client_write_limiter = TokenBucketLimiter(WRITE_RATE_PER_CLIENT, WRITE_BURST_PER_CLIENT)
+_clinic_write_limiter = TokenBucketLimiter(WRITE_RATE_PER_CLINIC, WRITE_BURST_PER_CLINIC)
+
+# Admission counters reported by /health (per worker)
+ADMISSION_METRICS: Dict[str, int] = {
+    "writes_admitted": 0,
+    "limited_by_client": 0,
+    "limited_by_clinic": 0,
+    "shed": 0,
+    "pending_writes": 0,
+}
+
+
+def _client_ip(request: Request) -> str:
+    if TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("X-Forwarded-For", "").split(",")[0].strip()
+        if forwarded:
+            return forwarded
+    return request.client.host if request.client else "unknown"
+
+
+def _retry_after(seconds: float) -> Dict[str, str]:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+
+@app.middleware("http")
+async def _admit_writes(request: Request, call_next):
+    """Rate-limit and shed check-in writes before they reach the handler.
+
+    Writes run in the shared threadpool; capping how many may wait for the
+    write lock keeps a write storm from starving the read endpoints.
+    """
+    if request.method != "POST" or request.url.path != "/checkins":
+        return await call_next(request)
+
+    if ADMISSION_METRICS["pending_writes"] >= MAX_PENDING_WRITES > 0:
+        ADMISSION_METRICS["shed"] += 1
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Too many check-ins in progress, please retry shortly"},
+            headers=_retry_after(1),
+        )
+
+    wait = _client_write_limiter.acquire(_client_ip(request))
+    if wait:
+        ADMISSION_METRICS["limited_by_client"] += 1
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "Too many check-ins from this client"},
+            headers=_retry_after(wait),
+        )
+
+    ADMISSION_METRICS["pending_writes"] += 1
+    try:
+        return await call_next(request)
+    finally:
+        ADMISSION_METRICS["pending_writes"] -= 1
 
 
 @app.get("/", response_class=HTMLResponse)
-def checkin_page() -> HTMLResponse:
-    return HTMLResponse(_read_static_page("report.html"))
+def checkin_page(request: Request) -> Response:
+    return _static_page_response(request, "report.html")
 
 
 @app.get("/map", response_class=HTMLResponse)
-def map_page() -> HTMLResponse:
-    return HTMLResponse(_read_static_page("map.html"))
+def map_page(request: Request) -> Response:
+    return _static_page_response(request, "map.html")
 
 
 @app.get("/about", response_class=HTMLResponse)
-def about_page() -> HTMLResponse:
-    return HTMLResponse(_read_static_page("about.html"))
+def about_page(request: Request) -> Response:
+    return _static_page_response(request, "about.html")
 
 
 @app.get("/involve", response_class=HTMLResponse)
-def involve_page() -> HTMLResponse:
-    return HTMLResponse(_read_static_page("involve.html"))
+def involve_page(request: Request) -> Response:
+    return _static_page_response(request, "involve.html")
+
+
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"], name="static")
+def static_asset(path: str, request: Request) -> Response:
+    """Serve files from static/ out of memory, precompressed and cacheable."""
+    asset = _get_static_assets().get(path)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if request.query_params.get("v") == asset.version:
+        cache_control = f"public, max-age={STATIC_IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        cache_control = f"public, max-age={STATIC_MAX_AGE}"
+    return asset.response(request, cache_control)
+
+
+@app.get("/health")
+def health() -> JSONResponse:
+    """Readiness probe reporting cold-start timings."""
+    snapshot = _get_snapshot()
+    return JSONResponse(
+        content={
+            "status": "ok",
+            "storage": "local" if USE_LOCAL_STORAGE else "s3",
+            "checkins": snapshot.checkin_count if snapshot.shards is None else None,
+            "clinics": len(snapshot.clinics) if snapshot.shards is None else None,
+            "checkpoint_checkins": snapshot.checkpoint_count,
+            "shards": snapshot.shards.summary() if snapshot.shards is not None else None,
+            "stream_subscribers": _broadcaster.subscribers,
+            "expiry": EXPIRY_METRICS,
+            "startup": STARTUP_METRICS,
+            "admission": {
+                **ADMISSION_METRICS,
+                "tracked_clients": len(_client_write_limiter),
+                "tracked_clinics": len(_clinic_write_limiter),
+            },
+            "s3_cache": _s3_cache.summary() if _s3_cache is not None else None,
+        }
+    )
 
 
 @app.get("/checkins")
 def list_checkins() -> JSONResponse:
-    checkins = _load_checkins()
-    return JSONResponse(content=checkins)
+    checkins = _all_checkins(_get_snapshot())
+    return JSONResponse(content=list(checkins))
 
 
 @app.get("/clinics")
 def list_clinics() -> JSONResponse:
-    """List all clinics, regenerating aggregations if needed"""
-    clinics = _get_current_clinics(regenerate=True)
+    """List all clinics from the in-memory snapshot"""
+    clinics = _clinics_in_area(_get_snapshot())
     return JSONResponse(content=list(clinics.values()))
 
 
+def _parse_bbox(bbox: Optional[str]) -> Optional[Tuple[float, float, float, float]]:
+    """``west,south,east,north`` query value as a tuple (None when absent)."""
+    if bbox is None:
+        return None
+    try:
+        west, south, east, north = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be west,south,east,north")
+    if south > north:
+        raise HTTPException(status_code=400, detail="bbox south must not exceed north")
+    return (west, south, east, north)
+
+
 @app.get("/clinics/geojson")
-def clinics_geojson() -> JSONResponse:
-    """Get clinics as GeoJSON, regenerating aggregations if needed"""
-    clinics = _get_current_clinics(regenerate=True)
-    model = _load_model()
-    return JSONResponse(content=_checkins_to_geojson(clinics, model))
+def clinics_geojson(
+    bbox: Optional[str] = Query(None, description="Viewport as west,south,east,north"),
+    zoom: Optional[int] = Query(None, ge=0, le=22, description="Map zoom; low zooms return clusters"),
+) -> JSONResponse:
+    """Get clinics as GeoJSON, optionally limited to a viewport and clustered by zoom"""
+    bounds = _parse_bbox(bbox)
+    index = _get_map_index(_get_snapshot(), bounds)
+    return JSONResponse(content=index.query(bounds, zoom))
+
+@app.get("/clinics/search")
+def search_clinics(
+    q: str = Query("", max_length=100, description="Clinic name or fragment"),
+    lat: Optional[float] = Query(None, description="Latitude used to rank nearby clinics first"),
+    lon: Optional[float] = Query(None, description="Longitude used to rank nearby clinics first"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of results"),
+) -> JSONResponse:
+    """Typeahead search over clinic names, ranked by match quality and distance"""
+    snapshot = _get_snapshot()
+    with _snapshot_lock:
+        store = snapshot.shards
+        if store is None:
+            results = snapshot.search_index.search(q, lat, lon, limit)
+        else:
+            # Names are not geographic, so every shard is searched
+            results = heapq.nlargest(
+                limit,
+                (
+                    result
+                    for shard_id in store.shard_ids(snapshot.versions)
+                    for result in store.get(shard_id, snapshot.versions).search_index.search(q, lat, lon, limit)
+                ),
+                key=lambda result: result["score"],
+            )
+    return JSONResponse(content=results)
+
+
+@app.get("/clinics/stream")
+async def clinic_updates_stream(request: Request) -> StreamingResponse:
+    """Server-Sent Events stream of per-clinic deltas, one per committed check-in.
+
+    Reconnecting clients send ``Last-Event-ID`` and receive what they missed, or
+    a ``resync`` event if it has already left the buffer or was issued by
+    another worker (or before a restart): sequence numbers are per worker.
+    """
+    last_event_id = request.headers.get("last-event-id")
+    last_seq = _broadcaster.parse_event_id(last_event_id) if last_event_id else _broadcaster.seq
+
+    async def events():
+        nonlocal last_seq
+        _broadcaster.subscribers += 1
+        try:
+            yield "retry: 5000\n\n"
+            if last_seq is None:
+                last_seq = _broadcaster.seq
+                yield "event: resync\ndata: {}\n\n"
+            while True:
+                batch, missed = await _broadcaster.wait(last_seq)
+                if missed:
+                    yield "event: resync\ndata: {}\n\n"
+                if not batch:
+                    yield ": keepalive\n\n"
+                    continue
+                for seq, message in batch:
+                    yield f"id: {_broadcaster.event_id(seq)}\n{message}"
+                last_seq = batch[-1][0]
+        finally:
+            _broadcaster.subscribers -= 1
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+_model_evaluation_cache: Optional[Tuple[Tuple[int, ...], int, Dict[str, Any]]] = None
+
+
+@app.get("/model/evaluation")
+def model_evaluation() -> JSONResponse:
+    """Compare predictor modes by replaying the check-in history"""
+    global _model_evaluation_cache
+    snapshot = _get_snapshot()
+    key = (snapshot.versions, snapshot.checkin_count)
+    cached = _model_evaluation_cache
+    if cached is None or cached[:2] != key:
+        result = _evaluate_model_modes(list(_all_checkins(snapshot)))
+        _model_evaluation_cache = cached = (key[0], key[1], result)
+    return JSONResponse(content=cached[2])
+
+
+FORECAST_MAX_HOURS = 7 * 24
+# A best hour is only named when it beats the worst hour by at least this much
+FORECAST_MIN_SPREAD_MINUTES = 1.0
+# /clinics/nearby names each clinic's best hour within this many hours
+NEARBY_BEST_TIME_HOURS = 12
+
+# Forecast curves per clinic for the current model state and hour; reset
+# whenever either changes
+_forecast_cache: Dict[str, Any] = {"key": None, "curves": {}}
+
+
+def _clinic_forecast(
+    snapshot: "ClinicSnapshot", agg_id: str, clinic_data: Dict[str, Any], hours: int
+) -> List[Dict[str, Any]]:
+    """Hourly predicted waits for one clinic, starting with the next full hour."""
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    key = (snapshot.versions, id(snapshot.model), now)
+    with _snapshot_lock:
+        if _forecast_cache["key"] != key:
+            _forecast_cache["key"] = key
+            _forecast_cache["curves"] = {}
+        curve = _forecast_cache["curves"].get(agg_id)
+        if curve is None or len(curve) < hours:
+            model_clinic_id = _normalize_clinic_name(clinic_data.get("clinic_name", ""))
+            waits = snapshot.model.forecast(
+                model_clinic_id,
+                now.hour,
+                now.weekday(),
+                clinic_data.get("current_condition", "Moderate"),
+                hours=max(hours, 24),
+                fallback=clinic_data.get("latest_wait_time"),
+                timestamp=now.timestamp(),
+            )
+            curve = []
+            for step, wait in enumerate(waits, start=1):
+                at = now + timedelta(hours=step)
+                curve.append({
+                    "time": at.isoformat(),
+                    "hour": at.hour,
+                    "weekday": at.weekday(),
+                    "predicted_wait_time": round(wait, 1),
+                })
+            _forecast_cache["curves"][agg_id] = curve
+    return curve[:hours]
+
+
+def _best_time(curve: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """The cheapest point of a forecast, or None when no hour beats another by a minute."""
+    if not curve:
+        return None
+    best = min(curve, key=lambda point: point["predicted_wait_time"])
+    worst = max(point["predicted_wait_time"] for point in curve)
+    if worst - best["predicted_wait_time"] < FORECAST_MIN_SPREAD_MINUTES:
+        return None
+    return best
+
+
+HEATMAP_WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+
+def _merge_cubes(cubes: Iterable[Dict[int, List[float]]]) -> Dict[int, List[float]]:
+    """Add up hour-by-weekday cubes slot by slot."""
+    merged: Dict[int, List[float]] = {}
+    for cube in cubes:
+        for slot, (count, total, squares) in cube.items():
+            cell = merged.get(slot)
+            if cell is None:
+                merged[slot] = [count, total, squares]
+            else:
+                cell[0] += count
+                cell[1] += total
+                cell[2] += squares
+    return merged
+
+
+def _heatmap(cube: Dict[int, List[float]]) -> Dict[str, Any]:
+    """7x24 matrices (Monday first, hour 0 first, UTC) of report counts, mean and spread of waits.
+
+    Cells without reports are null. The spread is the population standard
+    deviation, from the running sum and sum of squares.
+    """
+    counts = [[0] * 24 for _ in range(7)]
+    means: List[List[Optional[float]]] = [[None] * 24 for _ in range(7)]
+    stddevs: List[List[Optional[float]]] = [[None] * 24 for _ in range(7)]
+    for slot, (count, total, squares) in cube.items():
+        if not count:
+            continue
+        weekday, hour = divmod(slot, 24)
+        mean = total / count
+        counts[weekday][hour] = count
+        means[weekday][hour] = round(mean, 1)
+        stddevs[weekday][hour] = round(math.sqrt(max(0.0, squares / count - mean * mean)), 1)
+    return {
+        "timezone": "UTC",
+        "weekdays": list(HEATMAP_WEEKDAYS),
+        "count": counts,
+        "average_wait_time": means,
+        "stddev_wait_time": stddevs,
+    }
+
+
+@app.get("/clinics/heatmap")
+def area_heatmap(
+    bbox: str = Query(..., description="Area as west,south,east,north"),
+) -> JSONResponse:
+    """Typical wait by hour and weekday over every clinic in an area"""
+    bounds = _parse_bbox(bbox)
+    snapshot = _get_snapshot()
+    with _snapshot_lock:
+        if snapshot.shards is None:
+            parts = [snapshot]
+        else:
+            store = snapshot.shards
+            parts = [store.get(shard_id, snapshot.versions) for shard_id in store.shard_ids(snapshot.versions, bounds)]
+        cubes = [
+            part.aggregator.groups[clinic_id]["cube"]
+            for part in parts
+            for clinic_id, clinic_data in part.clinics.items()
+            if clinic_id in part.aggregator.groups and _in_bbox(clinic_data.get("location"), bounds)
+        ]
+        heatmap = _heatmap(_merge_cubes(cubes))
+    return JSONResponse(content={"bbox": list(bounds), "clinics": len(cubes), **heatmap})
+
+
+@app.get("/clinics/{clinic_id}/heatmap")
+def clinic_heatmap(clinic_id: str) -> JSONResponse:
+    """Typical wait by hour and weekday, from the clinic's running cube"""
+    snapshot = _get_snapshot()
+    part = _clinic_part(snapshot, clinic_id)
+    clinic_data = part.clinics.get(clinic_id) if part is not None else None
+    if clinic_data is None:
+        raise HTTPException(status_code=404, detail="Clinic not found")
+    with _snapshot_lock:
+        group = part.aggregator.groups.get(clinic_id)
+        heatmap = _heatmap(group["cube"] if group is not None else {})
+    return JSONResponse(content={
+        "clinic_id": clinic_id,
+        "clinic_name": clinic_data.get("clinic_name", "Unknown"),
+        "total_reports": clinic_data.get("total_reports", 0),
+        **heatmap,
+    })
+
+
+@app.get("/clinics/{clinic_id}/forecast")
+def clinic_forecast(
+    clinic_id: str,
+    hours: int = Query(24, ge=1, le=FORECAST_MAX_HOURS, description="Number of hours ahead"),
+) -> JSONResponse:
+    """Predicted wait for each of the next N hours, plus the best hour to go (null if the curve is flat)"""
+    snapshot = _get_snapshot()
+    clinic_data = _find_clinic(snapshot, clinic_id)
+    if clinic_data is None:
+        raise HTTPException(status_code=404, detail="Clinic not found")
+
+    curve = _clinic_forecast(snapshot, clinic_id, clinic_data, hours)
+    return JSONResponse(content={
+        "clinic_id": clinic_id,
+        "clinic_name": clinic_data.get("clinic_name", "Unknown"),
+        "forecast": curve,
+        "best_time": _best_time(curve),
+    })
+
 
 @app.get("/clinics/nearby")
 def nearby_clinics(
@@ -784,8 +4049,19 @@ def nearby_clinics(
     limit: int = Query(10, description="Maximum number of results"),
 ) -> JSONResponse:
     """Get nearby clinics sorted by predicted wait time"""
-    clinics = _get_current_clinics(regenerate=True)
-    model = _load_model()
+    snapshot = _get_snapshot()
+    # Distances below are in flat degrees x 111, so this box holds every match
+    reach = radius_km / 111
+    clinics = _clinics_in_area(
+        snapshot,
+        (
+            (longitude - reach + 180) % 360 - 180,
+            max(-90.0, latitude - reach),
+            (longitude + reach + 180) % 360 - 180,
+            min(90.0, latitude + reach),
+        ) if reach < 180 else None,
+    )
+    model = snapshot.model
     now = datetime.now(timezone.utc)
     
     nearby = []
@@ -811,22 +4087,336 @@ def nearby_clinics(
 
         # ✅ same model ID as map + create_checkin
         model_clinic_id = _normalize_clinic_name(clinic_data.get("clinic_name", ""))
-        predicted_wait = model.predict(model_clinic_id, hour, weekday, recent_condition, latest_wait)
+        with _snapshot_lock:
+            predicted_wait = model.predict(model_clinic_id, hour, weekday, recent_condition, latest_wait)
+            p50_wait, p90_wait = model.quantiles(model_clinic_id, hour)
         
         nearby.append({
             **clinic_data,
             "clinic_id": agg_id,  # keep aggregated id for frontend identity
             "distance_km": round(distance_km, 2),
             "predicted_wait_time": round(predicted_wait, 1),
+            "p50_wait_time": p50_wait,
+            "p90_wait_time": p90_wait,
         })
     
     nearby.sort(key=lambda x: x.get("predicted_wait_time", 999))
-    
-    return JSONResponse(content=nearby[:limit])
+    nearby = nearby[:limit]
+    # Best hour for the returned clinics only, so the list needs no forecast requests
+    for clinic in nearby:
+        curve = _clinic_forecast(snapshot, clinic["clinic_id"], clinic, NEARBY_BEST_TIME_HOURS)
+        clinic["best_time"] = _best_time(curve)
+
+    return JSONResponse(content=nearby)
+
+
+@app.get("/clinics/best")
+def best_clinics(
+    latitude: float = Query(..., ge=-90, le=90, description="User's latitude"),
+    longitude: float = Query(..., ge=-180, le=180, description="User's longitude"),
+    radius_km: float = Query(25.0, gt=0, description="Search radius in kilometers"),
+    limit: int = Query(5, ge=1, le=100, description="Maximum number of results"),
+    speed_kmh: float = Query(BEST_TRAVEL_SPEED_KMH, gt=0, description="Assumed travel speed"),
+    reliability_penalty: float = Query(
+        BEST_RELIABILITY_PENALTY_MINUTES, ge=0, description="Minutes added for a clinic with no reliability"
+    ),
+) -> JSONResponse:
+    """Clinics ranked by estimated minutes until seen: travel + predicted wait (+ penalty).
+
+    Candidates come from the clinics' location grid and are visited nearest
+    first. Travel time alone is a lower bound on the total, so once it exceeds
+    the ``limit``-th best total found so far no farther clinic can make the
+    list and the rest are never predicted.
+    """
+    snapshot = _get_snapshot()
+    bbox = _radius_bbox(latitude, longitude, radius_km)
+    now = datetime.now(timezone.utc)
+    hour, weekday = now.hour, now.weekday()
+
+    with _snapshot_lock:
+        if snapshot.shards is None:
+            parts = [snapshot]
+        else:
+            store = snapshot.shards
+            parts = [store.get(shard_id, snapshot.versions) for shard_id in store.shard_ids(snapshot.versions, bbox)]
+        candidates = [
+            (distance_km, clinic_id, part_index)
+            for part_index, part in enumerate(parts)
+            for distance_km, clinic_id in part.search_index.within(latitude, longitude, radius_km)
+            if clinic_id in part.clinics
+        ]
+        heapq.heapify(candidates)
+
+        # The `limit` best so far as (-total, seq, entry): best[0] is the worst of them
+        best: List[Tuple[float, int, Dict[str, Any]]] = []
+        while candidates:
+            distance_km, agg_id, part_index = heapq.heappop(candidates)
+            travel_minutes = distance_km / speed_kmh * 60
+            if len(best) == limit and travel_minutes >= -best[0][0]:
+                break
+            clinic_data = parts[part_index].clinics[agg_id]
+            model_clinic_id = _normalize_clinic_name(clinic_data.get("clinic_name", ""))
+            predicted_wait = snapshot.model.predict(
+                model_clinic_id,
+                hour,
+                weekday,
+                clinic_data.get("current_condition", "Moderate"),
+                clinic_data.get("latest_wait_time"),
+            )
+            reliability = clinic_data.get("reliability_score") or 0
+            penalty = reliability_penalty * max(0.0, 100 - reliability) / 100
+            total = travel_minutes + predicted_wait + penalty
+            entry = {
+                **clinic_data,
+                "clinic_id": agg_id,
+                "distance_km": round(distance_km, 2),
+                "travel_minutes": round(travel_minutes, 1),
+                "predicted_wait_time": round(predicted_wait, 1),
+                "reliability_penalty": round(penalty, 1),
+                "total_minutes": round(total, 1),
+            }
+            # On equal totals the nearer clinic (popped earlier, higher seq) ranks first
+            item = (-total, len(candidates), entry)
+            if len(best) < limit:
+                heapq.heappush(best, item)
+            elif item > best[0]:
+                heapq.heapreplace(best, item)
+
+    ranked = sorted(best, key=lambda item: (-item[0], -item[1]))
+    return JSONResponse(content=[entry for _, _, entry in ranked])
+
+
+# Export columns and their Parquet types
+CHECKIN_EXPORT_COLUMNS = (
+    ("checkin_id", "string"), ("clinic_id", "string"), ("clinic_name", "string"),
+    ("latitude", "float"), ("longitude", "float"), ("check_in_time", "string"),
+    ("check_out_time", "string"), ("wait_time", "float"), ("condition", "string"),
+    ("created_at", "string"),
+)
+CLINIC_EXPORT_COLUMNS = (
+    ("clinic_id", "string"), ("clinic_name", "string"), ("latitude", "float"),
+    ("longitude", "float"), ("average_wait_time", "float"), ("latest_wait_time", "float"),
+    ("current_condition", "string"), ("reliability_score", "float"), ("total_reports", "int"),
+    ("recent_reports", "int"), ("last_updated", "string"),
+)
+
+
+def _in_bbox(location: Optional[Dict[str, Any]], bbox: Tuple[float, float, float, float]) -> bool:
+    try:
+        lat, lon = float(location["latitude"]), float(location["longitude"])
+    except (KeyError, TypeError, ValueError):
+        return False
+    west, south, east, north = bbox
+    return south <= lat <= north and any(lo <= lon <= hi for lo, hi in _lon_ranges(west, east))
+
+
+def _export_checkins(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Stored check-ins submitted in ``[since, until)`` inside ``bbox``, read as a stream.
+
+    With sharding only the shards the bbox touches are read, merged in
+    ``created_at`` order.
+    """
+    if SHARD_DEG > 0:
+        store = ClinicShardStore(SHARD_DEG, 0)  # only for the manifest and shard keys
+        logs = [_iter_checkin_log(store.log_key(shard_id)) for shard_id in store.shard_ids((), bbox)]
+        checkins = heapq.merge(*logs, key=lambda c: c.get("created_at") or "")
+    else:
+        checkins = _iter_checkin_log()
+    for checkin in checkins:
+        if since is not None or until is not None:
+            created = _parse_timestamp(checkin.get("created_at"))
+            if created is None or created.tzinfo is None:
+                continue
+            if (since is not None and created < since) or (until is not None and created >= until):
+                continue
+        if bbox is not None and not _in_bbox(checkin.get("location"), bbox):
+            continue
+        yield checkin
+
+
+def _export_clinics(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Clinic aggregates over the check-ins :func:`_export_checkins` selects.
+
+    Folds the stream into running totals, so memory follows the number of
+    clinics rather than of check-ins. The aggregates are as of ``until`` (or
+    now), so recent reports, condition and reliability describe the end of
+    the exported period rather than today.
+    """
+    aggregator = ClinicAggregator()
+    for checkin in _export_checkins(since, until, bbox):
+        aggregator.add(checkin)
+    now = datetime.now(timezone.utc)
+    as_of = min(until, now) if until is not None else now
+    for key in aggregator.groups:
+        yield aggregator.clinic(key, as_of)
+
+
+def _export_values(record: Dict[str, Any], columns: Tuple[Tuple[str, str], ...]) -> List[Any]:
+    location = record.get("location") or {}
+    return [location.get(name) if name in ("latitude", "longitude") else record.get(name) for name, _ in columns]
+
+
+def _export_batches(records: Iterable[Dict[str, Any]], columns: Tuple[Tuple[str, str], ...]) -> Iterator[List[List[Any]]]:
+    batch: List[List[Any]] = []
+    for record in records:
+        batch.append(_export_values(record, columns))
+        if len(batch) >= EXPORT_CHUNK_ROWS:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _csv_chunks(records: Iterable[Dict[str, Any]], columns: Tuple[Tuple[str, str], ...]) -> Iterator[bytes]:
+    """CSV with a header row, produced ``EXPORT_CHUNK_ROWS`` rows at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in columns])
+    for batch in _export_batches(records, columns):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ExportSink(io.RawIOBase):
+    """Write-only stream that hands the bytes written so far back out on demand."""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _parquet_chunks(records: Iterable[Dict[str, Any]], columns: Tuple[Tuple[str, str], ...]) -> Iterator[bytes]:
+    """Parquet file with one row group per ``EXPORT_CHUNK_ROWS`` rows (needs pyarrow)."""
+    types = {"string": pyarrow.string(), "float": pyarrow.float64(), "int": pyarrow.int64()}
+    schema = pyarrow.schema([(name, types[kind]) for name, kind in columns])
+    sink = _ExportSink()
+    with pyarrow.parquet.ParquetWriter(sink, schema) as writer:
+        for batch in _export_batches(records, columns):
+            arrays = [
+                pyarrow.array([row[i] for row in batch], type=schema.field(i).type) for i in range(len(columns))
+            ]
+            writer.write_table(pyarrow.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _parse_export_time(value: Optional[str], name: str) -> Optional[datetime]:
+    if value is None:
+        return None
+    parsed = _parse_timestamp(value)
+    if parsed is None:
+        raise HTTPException(status_code=400, detail=f"{name} must be an ISO 8601 timestamp")
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def _export_response(
+    records: Iterable[Dict[str, Any]], columns: Tuple[Tuple[str, str], ...], fmt: str, name: str
+) -> StreamingResponse:
+    if fmt == "parquet":
+        if pyarrow is None:
+            raise HTTPException(status_code=501, detail="Parquet export needs pyarrow installed")
+        body, media_type = _parquet_chunks(records, columns), "application/vnd.apache.parquet"
+    else:
+        body, media_type = _csv_chunks(records, columns), "text/csv; charset=utf-8"
+    headers = {"Content-Disposition": f'attachment; filename="{name}.{fmt}"'}
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+
+@app.get("/export/checkins")
+def export_checkins(
+    format: str = Query("csv", pattern="^(csv|parquet)$", description="csv, or parquet when pyarrow is installed"),
+    since: Optional[str] = Query(None, description="Only check-ins submitted at or after this time (ISO 8601)"),
+    until: Optional[str] = Query(None, description="Only check-ins submitted before this time (ISO 8601)"),
+    bbox: Optional[str] = Query(None, description="Only check-ins inside west,south,east,north"),
+) -> StreamingResponse:
+    """Stream stored check-ins as CSV or Parquet without loading them all."""
+    records = _export_checkins(_parse_export_time(since, "since"), _parse_export_time(until, "until"), _parse_bbox(bbox))
+    return _export_response(records, CHECKIN_EXPORT_COLUMNS, format, "checkins")
+
+
+@app.get("/export/clinics")
+def export_clinics(
+    format: str = Query("csv", pattern="^(csv|parquet)$", description="csv, or parquet when pyarrow is installed"),
+    since: Optional[str] = Query(None, description="Aggregate only check-ins submitted at or after this time"),
+    until: Optional[str] = Query(None, description="Aggregate only check-ins submitted before this time"),
+    bbox: Optional[str] = Query(None, description="Only clinics inside west,south,east,north"),
+) -> StreamingResponse:
+    """Stream clinic aggregates as CSV or Parquet, optionally over a time range."""
+    since_dt, until_dt, bounds = _parse_export_time(since, "since"), _parse_export_time(until, "until"), _parse_bbox(bbox)
+    if since_dt is None and until_dt is None:
+        # Current aggregates are already in memory
+        clinics = _clinics_in_area(_get_snapshot(), bounds)
+        records: Iterable[Dict[str, Any]] = (
+            clinic for clinic in clinics.values() if bounds is None or _in_bbox(clinic.get("location"), bounds)
+        )
+    else:
+        records = _export_clinics(since_dt, until_dt, bounds)
+    return _export_response(records, CLINIC_EXPORT_COLUMNS, format, "clinics")
+
+
+def _checkin_record(
+    clinic_name: str,
+    latitude: float,
+    longitude: float,
+    check_in_time: str,
+    check_out_time: str,
+    wait_time: float,
+    condition: str,
+) -> Dict[str, Any]:
+    """The check-in record as stored, from validated form fields."""
+    # --- Aggregation ID (bucketed, for map/clinics grouping) ---
+    temp_checkin = {
+        "clinic_name": clinic_name,
+        "location": {"latitude": latitude, "longitude": longitude},
+    }
+    agg_clinic_id = _group_key_for_checkin(temp_checkin)
+    if not agg_clinic_id:
+        agg_clinic_id = _normalize_clinic_name(clinic_name)
+
+    return {
+        "checkin_id": str(uuid.uuid4()),
+        "clinic_id": agg_clinic_id,  # used for aggregations
+        "clinic_name": clinic_name,
+        "location": {"latitude": latitude, "longitude": longitude},
+        "check_in_time": check_in_time,
+        "check_out_time": check_out_time,
+        "wait_time": round(wait_time, 1),
+        "condition": condition,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
 
 
 @app.post("/checkins")
 async def create_checkin(
+    request: Request,
     clinic_name: str = Form(..., min_length=1),
     latitude: float = Form(...),
     longitude: float = Form(...),
@@ -834,8 +4424,16 @@ async def create_checkin(
     check_out_time: str = Form(...),
     condition: str = Form(..., pattern="^(Smooth|Moderate|Overloaded)$"),
 ):
-    """Create a new check-in record with consistent clinic IDs."""
-    
+    """Create a new check-in record with consistent clinic IDs.
+
+    Retries are safe: a repeated ``Idempotency-Key`` header, or the same
+    clinic, times and location within the dedup window, returns the original
+    record (200) without writing anything.
+    """
+    idempotency_key = request.headers.get("Idempotency-Key") or None
+    if idempotency_key is not None and len(idempotency_key) > 255:
+        raise HTTPException(status_code=400, detail="Idempotency-Key must be at most 255 characters")
+
     # Validate times
     try:
         check_in_dt = datetime.fromisoformat(check_in_time.replace("Z", "+00:00"))
@@ -850,67 +4448,114 @@ async def create_checkin(
     if wait_time is None:
         raise HTTPException(status_code=400, detail="Unable to calculate wait time")
 
-    # --- Aggregation ID (bucketed, for map/clinics grouping) ---
-    temp_checkin = {
-        "clinic_name": clinic_name,
-        "location": {"latitude": latitude, "longitude": longitude},
-    }
-    agg_clinic_id = _group_key_for_checkin(temp_checkin)
-    if not agg_clinic_id:
-        agg_clinic_id = _normalize_clinic_name(clinic_name)
+    checkin = _checkin_record(clinic_name, latitude, longitude, check_in_time, check_out_time, wait_time, condition)
 
     # --- Model ID (name-only, matches map + nearby) ---
     model_clinic_id = _normalize_clinic_name(clinic_name)
 
-    # Create final checkin object
-    checkin_id = str(uuid.uuid4())
-    checkin = {
-        "checkin_id": checkin_id,
-        "clinic_id": agg_clinic_id,  # used for aggregations
-        "clinic_name": clinic_name,
-        "location": {"latitude": latitude, "longitude": longitude},
-        "check_in_time": check_in_time,
-        "check_out_time": check_out_time,
-        "wait_time": round(wait_time, 1),
-        "condition": condition,
-        "created_at": datetime.now(timezone.utc).isoformat(),
-    }
+    fingerprint = CheckinDedupIndex.fingerprint(clinic_name, check_in_dt, check_out_dt, latitude, longitude)
 
-    # Save checkin
-    checkins = _load_checkins()
-    checkins.append(checkin)
-    _save_checkins(checkins)
+    # Storage and model writes block, so run them off the event loop
+    stored, replayed = await run_in_threadpool(
+        _store_checkin, checkin, fingerprint, idempotency_key, check_in_dt, model_clinic_id, wait_time
+    )
+    if replayed:
+        return JSONResponse(content=stored, status_code=200, headers={"Idempotent-Replayed": "true"})
 
-    # Update clinic aggregations
-    clinics = _update_clinic_aggregations(checkins)
-    _save_clinics(clinics)
+    ADMISSION_METRICS["writes_admitted"] += 1
+    if _stream_kick is not None:
+        _stream_kick.set()
 
-    # Update model (train using NAME-ONLY ID)
-    model = _load_model()
-    hour = check_in_dt.hour
-    weekday = check_in_dt.weekday()
-
-    # ✅ use positional fallback argument, not `latest_wait=`
-    predicted_wait_before = model.predict(
-        model_clinic_id,
-        hour,
-        weekday,
-        condition,
-        wait_time,  # fallback
-    )
+    return JSONResponse(content=stored, status_code=201)
 
-    model.update(
-        model_clinic_id,
-        hour,
-        weekday,
-        condition,
-        wait_time,
-        predicted_wait_before,
-    )
 
-    _save_model(model)
+def _store_checkin(
+    checkin: Dict[str, Any],
+    fingerprint: Tuple,
+    idempotency_key: Optional[str],
+    check_in_dt: datetime,
+    model_clinic_id: str,
+    wait_time: float,
+) -> Tuple[Dict[str, Any], bool]:
+    """Persist a check-in and train the model on it; returns ``(record, replayed)``.
+
+    Raises 429 when the clinic's write budget is spent (checked after dedup,
+    so replays are never limited).
+    """
+    condition = checkin["condition"]
+
+    # Hold the cross-process lock so a write never starts from a stale snapshot
+    with _snapshot_lock, _data_version.locked():
+        snapshot = _get_snapshot()
+        store = snapshot.shards
+        # Sharded: the write only touches the shard holding this clinic
+        shard_id = store.shard_for_checkin(checkin) if store is not None else None
+        target = store.get(shard_id, snapshot.versions) if store is not None else snapshot
+
+        # Retried submission: hand back what was stored the first time
+        original, key_conflict = target.dedup.find(idempotency_key, fingerprint)
+        if key_conflict:
+            raise HTTPException(
+                status_code=422, detail="Idempotency-Key was already used for a different check-in"
+            )
+        if original is not None:
+            return original, True
+
+        # Only new writes spend the clinic's budget, so retries still get their record
+        wait = _clinic_write_limiter.acquire(checkin["clinic_id"])
+        if wait:
+            ADMISSION_METRICS["limited_by_clinic"] += 1
+            raise HTTPException(
+                status_code=429, detail="Too many check-ins for this clinic", headers=_retry_after(wait)
+            )
+
+        # Persist first: if the write fails nothing in memory has seen the
+        # check-in, so a retry is stored once rather than counted twice
+        target.position = _append_checkin(checkin, target.position, target.log_key)
+        target.dedup.remember(idempotency_key, fingerprint, checkin)
+        target.add_checkin(checkin)
+
+        # Update clinic aggregations (only this clinic is recomputed)
+        if store is not None:
+            store.record_write(shard_id, target)
+        else:
+            _save_clinics(snapshot.clinics)
+
+        # Update model (train using NAME-ONLY ID), on the UTC clock forecasts use
+        model = snapshot.model
+        utc_dt = _as_utc(check_in_dt)
+        hour = utc_dt.hour
+        weekday = utc_dt.weekday()
+
+        # ✅ use positional fallback argument, not `latest_wait=`
+        predicted_wait_before = model.predict(
+            model_clinic_id,
+            hour,
+            weekday,
+            condition,
+            wait_time,  # fallback
+        )
+
+        model.update(
+            model_clinic_id,
+            hour,
+            weekday,
+            condition,
+            wait_time,
+            predicted_wait_before,
+            timestamp=check_in_dt.timestamp(),
+        )
+
+        _save_model(model, [model_clinic_id])
+        snapshot.versions = _data_version.bump("checkins", "model")
+        target.versions = snapshot.versions
+        if store is None and CHECKPOINT_EVERY > 0 and snapshot.checkin_count - snapshot.checkpoint_count >= CHECKPOINT_EVERY:
+            _save_checkpoint(snapshot)
+
+    return checkin, False
+
 
-    return JSONResponse(content=checkin, status_code=201)
+STARTUP_METRICS["import_seconds"] = round(time.perf_counter() - _IMPORT_STARTED, 4)
 
 
 if __name__ == "__main__":
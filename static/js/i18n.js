@@ -34,6 +34,7 @@ const TRANSLATIONS = {
     "report.form.clinicName": "Clinic Name",
     "report.form.clinicList": "Clinic list",
     "report.form.selectPlaceholder": "Select a clinic...",
+    "report.form.searchClinicPlaceholder": "Search clinics...",
     "report.form.customClinicPlaceholder": "Type clinic name",
     "report.form.otherOption": "Other (type clinic name)",
     "report.form.clinicOptionWithCoords": "{{name}} ({{lat}}, {{lon}})",
@@ -115,6 +116,10 @@ const TRANSLATIONS = {
     "map.popup.basedOnReports": "Based on {{count}} {{reports}}",
     "map.popup.reportSingular": "report",
     "map.popup.reportPlural": "reports",
+    "map.popup.clusterTitle": "{{count}} clinics",
+    "map.popup.shortestWait": "Shortest predicted wait",
+    "map.popup.typicalRange": "Typical wait",
+    "map.popup.bestTime": "Best time to go",
     "map.labels.predictedWait": "Predicted Wait",
     "map.labels.distance": "Distance",
     "map.labels.latestReport": "Latest Report",
@@ -186,6 +191,7 @@ const TRANSLATIONS = {
     "report.form.clinicName": "Nombre de la clínica",
     "report.form.clinicList": "Lista de clínicas",
     "report.form.selectPlaceholder": "Selecciona una clínica...",
+    "report.form.searchClinicPlaceholder": "Buscar clínicas...",
     "report.form.customClinicPlaceholder": "Escribe el nombre de la clínica",
     "report.form.otherOption": "Otra (escribir nombre)",
     "report.form.clinicOptionWithCoords": "{{name}} ({{lat}}, {{lon}})",
@@ -269,6 +275,10 @@ const TRANSLATIONS = {
     "map.popup.basedOnReports": "Basado en {{count}} {{reports}}",
     "map.popup.reportSingular": "reporte",
     "map.popup.reportPlural": "reportes",
+    "map.popup.clusterTitle": "{{count}} clínicas",
+    "map.popup.shortestWait": "Espera prevista más corta",
+    "map.popup.typicalRange": "Espera típica",
+    "map.popup.bestTime": "Mejor hora para ir",
     "map.labels.predictedWait": "Espera prevista",
     "map.labels.distance": "Distancia",
     "map.labels.latestReport": "Reporte más reciente",
@@ -304,6 +314,7 @@ const TRANSLATIONS = {
     "report.form.clinicName": "Nom de la clinique",
     "report.form.clinicList": "Liste des cliniques",
     "report.form.selectPlaceholder": "Choisissez une clinique...",
+    "report.form.searchClinicPlaceholder": "Rechercher une clinique...",
     "report.form.customClinicPlaceholder": "Saisissez le nom de la clinique",
     "report.form.otherOption": "Autre (saisir le nom)",
     "report.form.clinicOptionWithCoords": "{{name}} ({{lat}}, {{lon}})",
@@ -387,6 +398,10 @@ const TRANSLATIONS = {
     "map.popup.basedOnReports": "Basé sur {{count}} {{reports}}",
     "map.popup.reportSingular": "rapport",
     "map.popup.reportPlural": "rapports",
+    "map.popup.clusterTitle": "{{count}} cliniques",
+    "map.popup.shortestWait": "Attente prévue la plus courte",
+    "map.popup.typicalRange": "Attente typique",
+    "map.popup.bestTime": "Meilleur moment pour y aller",
     "map.labels.predictedWait": "Attente prévue",
     "map.labels.distance": "Distance",
     "map.labels.latestReport": "Rapport récent",
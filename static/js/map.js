@@ -51,6 +51,14 @@ L.tileLayer("https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png", {
     }
     mapReadyFired = true;
     console.log("Map is ready, loading clinics...");
+
+    // Reload the visible clinics/clusters after the user pans or zooms
+    let viewportTimeout;
+    map.on("moveend", () => {
+      if (!hasFittedInitialView) return;
+      if (viewportTimeout) clearTimeout(viewportTimeout);
+      viewportTimeout = setTimeout(() => loadClinics(false), 250);
+    });
     
     // Wait a bit to ensure tiles are loaded and map is stable
     setTimeout(() => {
@@ -67,6 +75,58 @@ L.tileLayer("https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png", {
 let markers = [];
 let isLoadingClinics = false;
 let lastClinicsHash = null;
+let hasFittedInitialView = false;
+
+// Only the clinics in view are requested; at low zoom the server returns clusters
+function viewportQuery() {
+  if (!map) return "";
+  const bounds = map.getBounds();
+  const bbox = [
+    bounds.getWest(),
+    bounds.getSouth(),
+    bounds.getEast(),
+    bounds.getNorth(),
+  ].map((v) => v.toFixed(5)).join(",");
+  return `?bbox=${bbox}&zoom=${map.getZoom()}`;
+}
+
+function getClusterIcon(props) {
+  const hexColor = markerColors[props.color] || markerColors.gray;
+  const size = props.count >= 100 ? 48 : props.count >= 10 ? 40 : 34;
+  return L.divIcon({
+    className: "custom-marker marker-cluster",
+    html: `<div class="marker-inner" style="
+      background: ${hexColor};
+      width: ${size}px;
+      height: ${size}px;
+      border-radius: 50%;
+      border: 4px solid white;
+      box-shadow: ${markerShadow(hexColor)};
+      display: flex;
+      align-items: center;
+      justify-content: center;
+      color: white;
+      font-weight: 700;
+      cursor: pointer;
+    ">${props.count}</div>`,
+    iconSize: [size, size],
+    iconAnchor: [size / 2, size / 2],
+  });
+}
+
+function buildClusterTooltip(props) {
+  return `
+    <div>
+      <h3>${translate("map.popup.clusterTitle", { count: props.count })}</h3>
+      <p><strong>${translate("map.popup.predictedWait")}:</strong> ${formatWaitTime(
+        props.avg_predicted_wait_time
+      )}</p>
+      <p><strong>${translate("map.popup.shortestWait")}:</strong> ${formatWaitTime(
+        props.min_predicted_wait_time
+      )}</p>
+    </div>
+  `;
+}
 
 function setMapStatus(message, isError = false, options = {}) {
   if (!statusBox) return;
@@ -140,6 +200,20 @@ function getMarkerIcon(color) {
   });
 }
 
+const markerColors = {
+  green: "#10b981",
+  yellow: "#facc15",
+  orange: "#f97316",
+  red: "#ef4444",
+  gray: "#94a3b8"
+};
+
+function markerShadow(hexColor, hover = false) {
+  return hover
+    ? `0 0 0 4px ${hexColor}60, 0 8px 25px rgba(0,0,0,0.3), 0 0 20px ${hexColor}80`
+    : `0 0 0 3px ${hexColor}40, 0 6px 20px rgba(0,0,0,0.2), 0 0 15px ${hexColor}60`;
+}
+
 function formatWaitTime(waitTime) {
   if (!Number.isFinite(Number(waitTime))) {
     return translate("units.notAvailable");
@@ -156,6 +230,47 @@ function formatCondition(condition) {
   return condition;
 }
 
+// "When to go": the cheapest hour in the next few hours of a clinic's forecast,
+// hidden when the forecast has no hour-to-hour spread. Popups fetch it when
+// opened; /clinics/nearby already includes it for the list.
+const BEST_TIME_HOURS = 12;
+
+function formatBestTime(best) {
+  if (!best) {
+    return translate("units.notAvailable");
+  }
+  const when = new Date(best.time).toLocaleTimeString([], { hour: "numeric", minute: "2-digit" });
+  return `${when} (${formatWaitTime(best.predicted_wait_time)})`;
+}
+
+async function fillBestTime(clinicId, element) {
+  if (!clinicId || !element) return;
+  try {
+    const response = await fetch(
+      `/clinics/${encodeURIComponent(clinicId)}/forecast?hours=${BEST_TIME_HOURS}`
+    );
+    const data = response.ok ? await response.json() : null;
+    if (data) {
+      showBestTime(data.best_time, element);
+      return;
+    }
+    element.textContent = translate("units.notAvailable");
+  } catch (error) {
+    console.warn("Unable to load forecast:", error);
+    element.textContent = translate("units.notAvailable");
+  }
+}
+
+function showBestTime(best, element) {
+  if (!element) return;
+  if (!best) {
+    // Flat forecast (too few reports per hour): no hour is better than another
+    if (element.parentElement) element.parentElement.hidden = true;
+    return;
+  }
+  element.textContent = formatBestTime(best);
+}
+
 function buildPopup(properties) {
   const clinicName =
     (properties.clinic_name || "").trim() || translate("map.popup.unknownClinic");
@@ -175,7 +290,15 @@ function buildPopup(properties) {
       <p><strong>${translate("map.popup.latestReport")}:</strong> ${formatWaitTime(latestWait)}</p>
       <p><strong>${translate("map.popup.predictedWait")}:</strong> ${formatWaitTime(
         predictedWait
-      )} <small>${translate("map.popup.nextHour")}</small></p>
+      )} <small>${translate("map.popup.nextHour")}</small></p>${
+        properties.p50_wait_time != null && properties.p90_wait_time != null
+          ? `
+      <p><strong>${translate("map.popup.typicalRange")}:</strong> ${formatWaitTime(
+              properties.p50_wait_time
+            )} – ${formatWaitTime(properties.p90_wait_time)} <small>(p50–p90)</small></p>`
+          : ""
+      }
+      <p><strong>${translate("map.popup.bestTime")}:</strong> <span class="best-time">…</span></p>
       <p><strong>${translate("map.popup.condition")}:</strong> ${formatCondition(condition)}</p>
       <p><strong>${translate("map.popup.reliability")}:</strong> ${
         reliability ? Math.round(reliability) : 0
@@ -238,7 +361,7 @@ async function loadClinics(forceRefresh = false) {
       }
     }
     
-    const response = await fetch("/clinics/geojson");
+    const response = await fetch(`/clinics/geojson${viewportQuery()}`);
     const data = await response.json();
 
     if (!response.ok) {
@@ -246,6 +369,8 @@ async function loadClinics(forceRefresh = false) {
     }
 
     if (!data.features?.length) {
+      clearMarkers();
+      lastClinicsHash = null;
       setMapStatus({ key: "map.status.noClinics" }, false);
       // Remove overlay if no data
       const overlay = document.querySelector(".map-loading-overlay");
@@ -271,10 +396,11 @@ async function loadClinics(forceRefresh = false) {
 
     // Create a hash of the clinic data to detect changes
     const clinicsHash = JSON.stringify(data.features.map(f => ({
-      id: f.properties.clinic_id,
+      id: f.properties.clinic_id || f.properties.cluster_id,
       lat: f.geometry.coordinates[1],
       lon: f.geometry.coordinates[0],
-      name: f.properties.clinic_name
+      name: f.properties.clinic_name,
+      count: f.properties.count
     })).sort((a, b) => a.id.localeCompare(b.id)));
 
     // Only refresh if data has changed or forced
@@ -297,8 +423,30 @@ async function loadClinics(forceRefresh = false) {
     let markersAdded = 0;
     const locationGroups = new Map(); // Track markers at same location
 
-    // Group markers by location to handle overlapping markers
+    // Clusters get their own marker; clicking one zooms into it
+    const clinicFeatures = [];
     data.features.forEach((feature) => {
+      const props = feature.properties;
+      if (!props.cluster) {
+        clinicFeatures.push(feature);
+        return;
+      }
+      const [lon, lat] = feature.geometry.coordinates;
+      const marker = L.marker([lat, lon], { icon: getClusterIcon(props), zIndexOffset: 900 })
+        .bindTooltip(buildClusterTooltip(props))
+        .addTo(map);
+      marker.on("click", () => {
+        map.setView([lat, lon], Math.min(map.getZoom() + 2, 19));
+      });
+      marker._careNowPersistent = true;
+      marker._careNowClusterId = props.cluster_id;
+      markers.push(marker);
+      bounds.extend([lat, lon]);
+      markersAdded++;
+    });
+
+    // Group markers by location to handle overlapping markers
+    clinicFeatures.forEach((feature) => {
       const coords = feature.geometry.coordinates;
       const lat = coords[1];
       const lon = coords[0];
@@ -363,6 +511,14 @@ async function loadClinics(forceRefresh = false) {
             .bindPopup(buildPopup(props))
             .addTo(map);
 
+          marker.on("popupopen", (event) => {
+            const popupElement = event.popup.getElement();
+            fillBestTime(
+              marker._careNowClinicId || props.clinic_id,
+              popupElement && popupElement.querySelector(".best-time")
+            );
+          });
+
           // Verify marker was actually added
           if (!map.hasLayer(marker)) {
             console.error(`Failed to add marker for ${props.clinic_name} to map`);
@@ -380,9 +536,9 @@ async function loadClinics(forceRefresh = false) {
               const markerDot = markerElement.querySelector('.marker-dot');
               
               if (markerInner && markerDot) {
-                // Store original box shadow for restore
-                const originalShadow = `0 0 0 3px ${hexColor}40, 0 6px 20px rgba(0,0,0,0.2), 0 0 15px ${hexColor}60`;
-                const hoverShadow = `0 0 0 4px ${hexColor}60, 0 8px 25px rgba(0,0,0,0.3), 0 0 20px ${hexColor}80`;
+                // Shadows are derived from the current colour, which live updates may change
+                const originalShadow = () => markerShadow(marker._careNowHex || hexColor);
+                const hoverShadow = () => markerShadow(marker._careNowHex || hexColor, true);
                 
                 // Add hover effects via DOM manipulation (safer than setIcon)
                 const handleMouseEnter = function(e) {
@@ -390,7 +546,7 @@ async function loadClinics(forceRefresh = false) {
                   // Double-check marker is still on map
                   if (map && map.hasLayer(marker)) {
                     markerInner.style.transform = 'scale(1.15)';
-                    markerInner.style.boxShadow = hoverShadow;
+                    markerInner.style.boxShadow = hoverShadow();
                     markerInner.style.zIndex = '1000';
                     markerDot.style.width = '14px';
                     markerDot.style.height = '14px';
@@ -402,7 +558,7 @@ async function loadClinics(forceRefresh = false) {
                   // Double-check marker is still on map
                   if (map && map.hasLayer(marker)) {
                     markerInner.style.transform = 'scale(1)';
-                    markerInner.style.boxShadow = originalShadow;
+                    markerInner.style.boxShadow = originalShadow();
                     markerInner.style.zIndex = '';
                     markerDot.style.width = '12px';
                     markerDot.style.height = '12px';
@@ -430,6 +586,9 @@ async function loadClinics(forceRefresh = false) {
 
           // Prevent marker from being removed accidentally
           marker._careNowPersistent = true;
+          marker._careNowClinicId = props.clinic_id;
+          marker._careNowHex = hexColor;
+          marker._careNowProps = props;
 
           markers.push(marker);
           bounds.extend([offsetLat, offsetLon]);
@@ -454,8 +613,16 @@ async function loadClinics(forceRefresh = false) {
     
     console.log(`Added ${markersAdded} markers out of ${data.features.length} features`);
     
-    // Fit bounds and remove overlay after markers are added
-    if (markersAdded > 0) {
+    // Later loads follow the user's panning; only the first one fits the view
+    if (markersAdded > 0 && hasFittedInitialView) {
+      const overlay = document.querySelector(".map-loading-overlay");
+      if (overlay) {
+        overlay.classList.add("hidden");
+        setTimeout(() => overlay.remove(), 300);
+      }
+      setMapStatus({ key: "map.status.loadedCount", params: { count: markersAdded } }, false);
+    } else if (markersAdded > 0) {
+      hasFittedInitialView = true;
       // Wait for markers to be rendered
       setTimeout(() => {
         if (!map) {
@@ -656,6 +823,9 @@ async function findNearbyClinics() {
                       clinic.predicted_wait_time
                     )}
                   </div>
+                  <div class="clinic-info-item">
+                    <strong>${translate("map.popup.bestTime")}:</strong> <span class="best-time">…</span>
+                  </div>
                   <div class="clinic-info-item">
                     <strong>${translate("map.labels.distance")}:</strong> ${translate(
                       "units.kilometersAway",
@@ -679,6 +849,7 @@ async function findNearbyClinics() {
                   </div>
                 </div>
               `;
+              showBestTime(clinic.best_time, clinicDiv.querySelector(".best-time"));
               clinicDiv.addEventListener("click", () => {
                 if (!map) return;
                 
@@ -864,16 +1035,55 @@ document.addEventListener("languagechange", () => {
   }
 });
 
-// DISABLED: Auto-refresh was causing markers to disappear
-// If you need auto-refresh, uncomment below and ensure markers persist
-/*
-let refreshInterval = setInterval(() => {
-  if (map && !isLoadingClinics && markers.length > 0) {
-    console.log("Periodic refresh: checking for clinic updates...");
-    loadClinics(false); // Don't force refresh, will skip if no changes
+// Live updates: the server pushes one small delta per committed check-in over
+// Server-Sent Events, so markers update in place instead of refetching all clinics.
+// (Periodic polling stays disabled: redrawing every marker caused them to disappear.)
+function applyClinicUpdate(update) {
+  if (!map || !update || !update.clinic_id) return;
+  const marker = markers.find((m) => m._careNowClinicId === update.clinic_id);
+  if (!marker) {
+    // New or clustered clinic: refetch the viewport if it is visible
+    if (map.getBounds().contains([update.latitude, update.longitude])) {
+      loadClinics(false);
+    }
+    return;
   }
-}, 60000); // 60 seconds
-*/
+
+  const props = { ...(marker._careNowProps || {}), ...update };
+  marker._careNowProps = props;
+  const waitTime = props.predicted_wait_time !== undefined
+    ? props.predicted_wait_time
+    : props.latest_wait_time;
+  const hexColor = markerColors[getMarkerColor(waitTime)] || markerColors.gray;
+  marker._careNowHex = hexColor;
+  marker.setPopupContent(buildPopup(props));
+
+  const markerInner = marker.getElement()?.querySelector(".marker-inner");
+  if (markerInner) {
+    markerInner.style.background = hexColor;
+    markerInner.style.boxShadow = markerShadow(hexColor);
+  }
+}
+
+let clinicUpdates = null;
+
+function subscribeToClinicUpdates() {
+  if (!window.EventSource || clinicUpdates) return;
+  clinicUpdates = new EventSource("/clinics/stream");
+  clinicUpdates.addEventListener("clinic", (event) => {
+    try {
+      applyClinicUpdate(JSON.parse(event.data));
+    } catch (e) {
+      console.warn("Ignoring malformed clinic update:", e);
+    }
+  });
+  // Sent when this client missed updates (e.g. after a long disconnect)
+  clinicUpdates.addEventListener("resync", () => {
+    if (map && !isLoadingClinics) loadClinics(true);
+  });
+}
+
+subscribeToClinicUpdates();
 
 // Manual refresh function (call from UI if needed)
 function refreshClinics() {
@@ -8,6 +8,7 @@ const checkInInput = document.getElementById("check_in_time");
 const checkOutInput = document.getElementById("check_out_time");
 const submitProgress = document.getElementById("submit-progress");
 const clinicSelect = document.getElementById("clinic_select");
+const clinicSearchInput = document.getElementById("clinic_search");
 const clinicCustomInput = document.getElementById("clinic_name_custom");
 const clinicNameHidden = document.getElementById("clinic_name_hidden");
 const customClinicGroup = document.getElementById("custom-clinic-group");
@@ -41,13 +42,38 @@ function resolveMessage(input) {
 
 // Cache clinics as array for populating select
 let clinicsList = [];
+let clinicSearchSeq = 0;
+
+// One idempotency key per distinct report, reused when the same report is re-sent
+// after a failed or interrupted request so the server never stores it twice
+let pendingSubmission = null;
+
+function idempotencyKeyFor(signature) {
+  if (!pendingSubmission || pendingSubmission.signature !== signature) {
+    const key =
+      window.crypto && typeof window.crypto.randomUUID === "function"
+        ? window.crypto.randomUUID()
+        : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+    pendingSubmission = { signature, key };
+  }
+  return pendingSubmission.key;
+}
 
-async function populateClinicsSelect() {
+// Fills the select from the typeahead endpoint: matches for the search box, or
+// the clinics nearest the captured location when it is empty
+async function populateClinicsSelect(query = "") {
   if (!clinicSelect) return;
+  const params = new URLSearchParams({ q: query, limit: "25" });
+  if (latInput?.value && lonInput?.value) {
+    params.set("lat", latInput.value);
+    params.set("lon", lonInput.value);
+  }
+  const seq = ++clinicSearchSeq;
   try {
-    const resp = await fetch("/clinics");
+    const resp = await fetch(`/clinics/search?${params}`);
     if (!resp.ok) return;
     const clinics = await resp.json();
+    if (seq !== clinicSearchSeq) return; // a newer search superseded this one
     clinicsList = Array.isArray(clinics) ? clinics : [];
     // Reset select options (keep the first placeholder)
     clinicSelect.innerHTML = "";
@@ -123,6 +149,14 @@ function handleClinicChange() {
   }
 }
 
+if (clinicSearchInput) {
+  let searchTimeout;
+  clinicSearchInput.addEventListener("input", () => {
+    if (searchTimeout) clearTimeout(searchTimeout);
+    searchTimeout = setTimeout(() => populateClinicsSelect(clinicSearchInput.value.trim()), 150);
+  });
+}
+
 if (clinicCustomInput) {
   clinicCustomInput.addEventListener("input", () => {
     if (clinicNameHidden && clinicSelect?.value === "__custom__") {
@@ -185,6 +219,10 @@ function handleLocationSuccess(latitude, longitude) {
   setLocationMessage({ key: "report.status.locationLocked", params: { lat, lon } }, "success");
   setStatus({ key: "report.status.locationCaptured" }, "success");
   if (locateBtn) locateBtn.disabled = false;
+  // Re-rank the clinic list around the new location unless the user picked one
+  if (clinicSelect && !clinicSelect.value) {
+    populateClinicsSelect(clinicSearchInput?.value?.trim() || "");
+  }
 }
 
 function handleLocationError(message, silent = false) {
@@ -335,6 +373,9 @@ if (form) {
     submitData.append("check_in_time", checkInDate.toISOString());
     submitData.append("check_out_time", checkOutDate.toISOString());
     submitData.append("condition", condition);
+    const idempotencyKey = idempotencyKeyFor(
+      [...submitData.entries()].map(([name, value]) => `${name}=${value}`).join("&")
+    );
 
   setStatus({ key: "report.status.submitting" }, "info");
   if (submitProgress) {
@@ -344,6 +385,7 @@ if (form) {
     try {
       const response = await fetch("/checkins", {
         method: "POST",
+        headers: { "Idempotency-Key": idempotencyKey },
         body: submitData,
       });
 
@@ -360,6 +402,7 @@ if (form) {
         throw new Error(detail);
       }
 
+      pendingSubmission = null;
       const waitTime = data?.wait_time;
       const clinicNameResponse = (data?.clinic_name || "").trim();
       const clinicLabel = clinicNameResponse || translate("report.status.unknownClinic");
@@ -0,0 +1,107 @@
+"""Check-in writes: log before memory, partitioned model saves, evicted shards' dedup keys."""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import server
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def _checkin(i, name="Clinic A"):
+    created = NOW - timedelta(hours=i)
+    return {
+        "checkin_id": f"c{i}",
+        "clinic_id": "x",
+        "clinic_name": name,
+        "location": {"latitude": 51.0447, "longitude": -114.0719},
+        "check_in_time": (created - timedelta(minutes=30)).isoformat(),
+        "check_out_time": created.isoformat(),
+        "wait_time": 30.0,
+        "condition": "Smooth",
+        "created_at": created.isoformat(),
+    }
+
+
+@pytest.fixture
+def log_path(tmp_path, monkeypatch):
+    """An unsharded six check-in log with a fresh snapshot and version file."""
+    path = tmp_path / server.CHECKINS_INDEX_KEY.replace("/", "_")
+    path.write_text(json.dumps([_checkin(i) for i in range(1, 7)], indent=2))
+    monkeypatch.setattr(server, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(server, "SHARD_DEG", 0.0)
+    monkeypatch.setattr(server, "_data_version", server.DataVersion(tmp_path / ".data_version"))
+    monkeypatch.setattr(server, "_snapshot", None)
+    return path
+
+
+def _store(checkin):
+    return server._store_checkin(checkin, ("fingerprint",), "key-1", NOW, "brand_new_clinic", 20.0)
+
+
+def test_failed_write_changes_nothing_and_the_retry_counts_once(log_path, monkeypatch):
+    snapshot = server._get_snapshot()
+    checkin = _checkin(0, name="Brand New Clinic")
+
+    def disk_full(*args, **kwargs):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as m:
+        m.setattr(server, "_write_checkins_bytes", disk_full)
+        with pytest.raises(OSError):
+            _store(checkin)
+    assert snapshot.checkin_count == 6
+    assert all(c["clinic_name"] != "Brand New Clinic" for c in snapshot.clinics.values())
+
+    record, replayed = _store(checkin)
+    assert not replayed
+    assert _store(checkin) == (record, True)
+    assert snapshot.checkin_count == 7
+    assert len(json.loads(log_path.read_text())) == 7
+
+
+def test_a_checkin_rewrites_only_its_model_partition(log_path, monkeypatch):
+    server._store_checkin(_checkin(0), ("first",), None, NOW, "clinic_a", 30.0)  # no model stored yet: written whole
+    reader = server._load_model()
+    writes = []
+    real_write = server._write_model_object
+    monkeypatch.setattr(server, "_write_model_object", lambda key, data: (writes.append(key), real_write(key, data)))
+
+    _store(_checkin(7, name="Brand New Clinic"))
+    assert writes == [server._model_part_key(server._model_partition("brand_new_clinic")), server.MODEL_KEY]
+
+    # Another worker's model reads just that partition, in place
+    assert server._load_model(revalidate=True, model=reader) is reader
+    assert set(reader.stats) == {"clinic_a", "brand_new_clinic"}
+    assert server._load_model().stats.keys() == reader.stats.keys()
+
+
+def test_evicted_shards_keep_only_live_idempotency_keys(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "DATA_DIR", tmp_path)
+    store = server.ClinicShardStore(1.0, memory_budget=1)
+    for shard_id in ("51_-115", "40_-75"):
+        log = tmp_path / store.log_key(shard_id).replace("/", "_")
+        log.write_text(json.dumps([_checkin(1)], indent=2))
+    now = NOW.timestamp()
+    calgary = store.get("51_-115", ())
+    window = calgary.dedup.window
+    calgary.dedup.remember("key-1", ("fingerprint",), _checkin(1), now=now - window + 60)
+
+    store.get("40_-75", ())  # over budget: Calgary is evicted
+    evicted = store._evicted_dedup["51_-115"]
+    assert list(evicted.by_key) == ["key-1"] and not evicted.by_fingerprint
+    store._prune_evicted_dedup(now + 120)
+    assert store._evicted_dedup == {}
+
+
+def test_live_and_replayed_training_use_utc_hours(log_path):
+    local = datetime(2026, 3, 2, 20, 15, tzinfo=timezone(timedelta(hours=-7)))  # Monday 03:15 UTC on Tuesday
+    checkin = dict(_checkin(0, name="Offset Clinic"), check_in_time=local.isoformat())
+    server._store_checkin(checkin, ("offset",), None, local, "offset_clinic", 20.0)
+
+    live = server._get_snapshot().model.stats["offset_clinic"]
+    replayed = server._train_model([checkin]).stats["offset_clinic"]
+    for stats in (live, replayed):
+        assert list(stats["hourly"]) == ["3"] and list(stats["weekday"]) == ["1"]
@@ -0,0 +1,83 @@
+"""Clinic search: capped prefix candidates, nearby clinics first, and lookup latency."""
+
+import os
+import random
+import statistics
+import time
+
+import pytest
+
+from server import ClinicSearchIndex
+
+CALGARY = (51.0447, -114.0719)
+FIRST = ["Central", "Riverside", "Northside", "Family", "Community", "Walk-In", "Urgent", "Downtown", "Maple", "Cedar"]
+KIND = ["Medical", "Health", "Care", "Family Medicine", "Urgent Care", "Wellness"]
+
+
+def _clinics(count, seed=0):
+    """``count`` "... Clinic N" names spread over North America."""
+    rng = random.Random(seed)
+    return {
+        f"c{i}": {
+            "clinic_name": f"{rng.choice(FIRST)} {rng.choice(KIND)} Clinic {i}",
+            "location": {"latitude": rng.uniform(25, 60), "longitude": rng.uniform(-125, -70)},
+        }
+        for i in range(count)
+    }
+
+
+def _index(clinics):
+    index = ClinicSearchIndex()
+    index.sync(clinics)
+    return index
+
+
+def test_nearby_clinic_wins_a_common_prefix():
+    clinics = _clinics(5000)
+    clinics["near"] = {"clinic_name": "Zeta Clinic", "location": {"latitude": CALGARY[0], "longitude": CALGARY[1]}}
+    index = _index(clinics)
+    # Thousands of names have a "clinic" token and "near" sorts last among them
+    results = index.search("clin", *CALGARY, limit=5)
+    assert results[0]["clinic_id"] == "near"
+    assert results[0]["distance_km"] == 0.0
+    assert [r["clinic_id"] for r in index.search("zeta", limit=5)] == ["near"]
+
+
+def test_prefix_candidates_are_capped():
+    index = _index(_clinics(5000))
+    cap = 3 * ClinicSearchIndex.PREFIX_CANDIDATES_PER_RESULT
+    assert len(index._prefix_matches("clinic", cap)) == cap
+    results = index.search("cent", limit=3)
+    assert len(results) == 3 and all(r["clinic_name"].startswith("Central") for r in results)
+    assert all(r["score"] == 0.9 for r in results)
+
+
+def test_words_match_in_any_position():
+    index = _index(_clinics(5000))
+    results = index.search("clinic 42", limit=3)
+    assert results[0]["clinic_name"].endswith(" Clinic 42")
+    assert all(" Clinic 42" in r["clinic_name"] for r in results)
+
+
+def test_typos_still_fall_back_to_trigrams():
+    index = _index(_clinics(2000))
+    assert index.search("riversde", limit=3)[0]["clinic_name"].startswith("Riverside")
+
+
+@pytest.mark.skipif(not os.getenv("CARENOW_PERF_TESTS"), reason="timing test; set CARENOW_PERF_TESTS=1")
+def test_lookups_stay_under_a_millisecond_at_100k_clinics():
+    index = _index(_clinics(100_000))
+    slow = {}
+    for query in ("c", "cl", "clinic", "cent", "riverside care", "clinic 4242", ""):
+        for origin in ((None, None), CALGARY):
+            if not query and origin[0] is None:
+                continue
+            timings = []
+            for _ in range(25):
+                started = time.perf_counter()
+                index.search(query, *origin, limit=10)
+                timings.append(time.perf_counter() - started)
+            median_ms = statistics.median(timings) * 1000
+            if median_ms >= 1.0:
+                slow[(query, origin[0] is not None)] = round(median_ms, 3)
+    assert not slow, f"median lookups over 1 ms: {slow}"
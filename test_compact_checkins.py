@@ -0,0 +1,98 @@
+"""CompactCheckins: exact round trips and the per-check-in memory budget."""
+
+import json
+import random
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from server import CompactCheckins, _checkin_record, _compute_wait_time
+
+# 1M check-ins must fit in about 100 MB (README: "Check-in memory")
+MAX_BYTES_PER_CHECKIN = 100
+
+
+def _checkin(rng, now):
+    checked_in = now - timedelta(seconds=rng.randint(0, 86400 * 365), microseconds=rng.randint(0, 999999))
+    wait = round(rng.uniform(5, 120), 1)
+    name = f"Clinic {rng.randint(0, 200)}"
+    return {
+        "checkin_id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        "clinic_id": f"{name.lower().replace(' ', '_')}__407_-740",
+        "clinic_name": name,
+        "location": {"latitude": rng.uniform(-90, 90), "longitude": rng.uniform(-180, 180)},
+        "check_in_time": checked_in.isoformat(),
+        "check_out_time": (checked_in + timedelta(minutes=wait)).isoformat(),
+        "wait_time": wait,
+        "condition": rng.choice(["Smooth", "Moderate", "Overloaded"]),
+        "created_at": (checked_in + timedelta(minutes=wait)).isoformat(),
+    }
+
+
+def _checkins(count, seed=0):
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    return [_checkin(rng, now) for _ in range(count)]
+
+
+def test_serializes_to_the_stored_json():
+    checkins = _checkins(500)
+    compact = CompactCheckins(checkins)
+    assert len(compact) == 500
+    assert json.dumps(list(compact), indent=2) == json.dumps(checkins, indent=2)
+    assert compact[-1] == checkins[-1]
+
+
+def _js_iso(moment):
+    """What the report form posts: JavaScript's Date.toISOString()."""
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.") + f"{moment.microsecond // 1000:03d}Z"
+
+
+def test_report_form_checkins_are_packed():
+    rng = random.Random(4)
+    now = datetime.now(timezone.utc)
+    checkins = []
+    for i in range(200):
+        check_in = now - timedelta(seconds=rng.randint(0, 86400 * 30), milliseconds=rng.randint(0, 999))
+        check_out = check_in + timedelta(minutes=rng.uniform(1, 120))
+        check_in_time, check_out_time = _js_iso(check_in), _js_iso(check_out)
+        checkins.append(_checkin_record(
+            f"Clinic {i % 7}", 51.0 + rng.random(), -114.0 - rng.random(), check_in_time, check_out_time,
+            _compute_wait_time(check_in_time, check_out_time), rng.choice(["Smooth", "Moderate", "Overloaded"]),
+        ))
+    checkins[0]["check_in_time"] = "2026-10-19T10:00:00.000Z"
+
+    compact = CompactCheckins(checkins)
+    assert not compact._raw
+    assert list(compact) == checkins
+    assert json.dumps(list(compact), indent=2) == json.dumps(checkins, indent=2)
+
+
+def test_unusual_records_are_kept_as_is():
+    odd = _checkins(5, seed=1)
+    odd[0]["check_in_time"] = "2025-01-01T10:00:00Z"
+    odd[1]["location"] = {"latitude": 40, "longitude": -74}
+    odd[2]["note"] = "extra field"
+    odd[3]["checkin_id"] = "legacy-7"
+    odd[4]["created_at"] = "2025-01-01T10:00:00"
+    odd.append(dict(odd[0], check_in_time="2025-01-01T10:00:00.5Z"))
+    compact = CompactCheckins(odd + _checkins(3, seed=2))
+    assert list(compact)[:len(odd)] == odd
+    assert json.dumps(list(compact)[:len(odd)], indent=2) == json.dumps(odd, indent=2)
+
+
+def test_memory_per_checkin_is_within_budget():
+    count = 10000
+    checkins = _checkins(count, seed=3)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        parsed = json.loads(json.dumps(checkins))
+        as_dicts = tracemalloc.get_traced_memory()[0] - before
+        compact = CompactCheckins(parsed)
+        as_compact = tracemalloc.get_traced_memory()[0] - before - as_dicts
+    finally:
+        tracemalloc.stop()
+    assert as_compact / count <= MAX_BYTES_PER_CHECKIN
+    assert as_compact * 10 < as_dicts
+    assert len(compact) == count
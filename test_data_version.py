@@ -0,0 +1,32 @@
+"""DataVersion: the cross-process lock nests and bump() works under it."""
+
+import fcntl
+import os
+
+from server import DataVersion
+
+
+def _held_elsewhere(path):
+    """Whether another open file description can take the lock right now."""
+    fd = os.open(path, os.O_RDWR)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    else:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        return False
+    finally:
+        os.close(fd)
+
+
+def test_nested_lock_is_kept_until_the_outer_block_ends(tmp_path):
+    version = DataVersion(tmp_path / ".data_version")
+    with version.locked():
+        assert version.bump("checkins", "model") == (1, 1, 0)  # bump locks again inside
+        assert _held_elsewhere(version.path)
+        with version.locked():
+            pass
+        assert _held_elsewhere(version.path)
+    assert not _held_elsewhere(version.path)
+    assert version.read() == (1, 1, 0)
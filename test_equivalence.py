@@ -0,0 +1,664 @@
+"""Fast paths against frozen reference implementations, for answers and speed.
+
+The ``_ref_*`` functions and :class:`ReferencePredictor` below are copies of
+the original, straightforward server code (clinic aggregation, which the
+server no longer has, the map GeoJSON and the classic predictor). They are
+frozen here as oracles: do not optimise them. Randomized check-in histories
+are run through both these and the code the server actually uses, and the
+outputs must match. The timing tests (run with ``CARENOW_PERF_TESTS=1``)
+fail when a server path's median time over its oracle's exceeds its allowed
+ratio (``CARENOW_PERF_MAX_RATIO`` overrides every limit at once).
+"""
+
+import math
+import os
+import random
+import statistics
+import timeit
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from server import (
+    ClinicAggregator,
+    ClinicMapIndex,
+    ClinicSnapshot,
+    CompactCheckins,
+    _calculate_reliability_score,
+    _checkins_to_geojson,
+    _clinic_feature,
+    _group_key_for_checkin,
+    _new_model,
+    _normalize_clinic_name,
+    _parse_timestamp,
+    _train_model,
+    _wait_color,
+)
+
+SEEDS = range(int(os.getenv("CARENOW_EQUIVALENCE_SEEDS", "12")))
+PERF_CHECKINS = int(os.getenv("CARENOW_PERF_CHECKINS", "4000"))
+PERF_REPEAT = int(os.getenv("CARENOW_PERF_REPEAT", "9"))
+# Wall-clock comparisons only run when asked for: they need a quiet machine
+perf = pytest.mark.skipif(not os.getenv("CARENOW_PERF_TESTS"), reason="timing test; set CARENOW_PERF_TESTS=1")
+# Allowed time of the server path over its oracle (e.g. 1.5 = at most 50% slower).
+# Each limit is about 1.2x the median ratio measured at 4000 check-ins over ten
+# runs (noted alongside), so a real slowdown of a fifth or more fails.
+MAX_RATIOS = {
+    # ~3.2x: the aggregator below, plus packing the history into CompactCheckins
+    # (about half the time) and the dedup and search indexes the oracle has no part of
+    "snapshot_rebuild": 3.8,
+    "aggregator_rebuild": 1.9,  # ~1.6x: also builds the heatmap cube and expiry heap
+    "aggregator_write": 0.0055,  # ~0.0045x: must stay independent of the history length
+    "checkins_to_geojson": 2.05,  # ~1.7x: the server also computes p50/p90 bands per clinic
+    "predict": 1.25,  # ~1.05x
+}
+if os.getenv("CARENOW_PERF_MAX_RATIO"):
+    MAX_RATIOS = dict.fromkeys(MAX_RATIOS, float(os.environ["CARENOW_PERF_MAX_RATIO"]))
+REL_TOL = 1e-9
+
+
+# ---------------------------------------------------------------------------
+# Frozen reference implementations (only change: ``now`` can be passed in)
+# ---------------------------------------------------------------------------
+
+def _ref_aggregate_clinic_data_from_list(clinic_id, clinic_checkins, now=None):
+    if not clinic_checkins:
+        return {}
+
+    wait_times = []
+    conditions = []
+    recent_checkins = []
+    locations = []
+    now = now or datetime.now(timezone.utc)
+
+    for checkin in clinic_checkins:
+        wait_time = checkin.get("wait_time")
+        if wait_time is not None:
+            wait_times.append(wait_time)
+
+        condition = checkin.get("condition")
+        if condition:
+            conditions.append(condition)
+
+        location = checkin.get("location")
+        if location and location.get("latitude") and location.get("longitude"):
+            locations.append(location)
+
+        created_at = checkin.get("created_at")
+        if created_at:
+            try:
+                checkin_time = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+                days_ago = (now - checkin_time).days
+                if days_ago <= 7:
+                    recent_checkins.append(checkin)
+            except (ValueError, AttributeError):
+                pass
+
+    avg_wait_time = sum(wait_times) / len(wait_times) if wait_times else None
+
+    condition_counts = defaultdict(int)
+    for checkin in recent_checkins:
+        condition = checkin.get("condition")
+        if condition:
+            condition_counts[condition] += 1
+
+    current_condition = max(condition_counts.items(), key=lambda x: x[1])[0] if condition_counts else "Moderate"
+
+    reliability_score = _calculate_reliability_score(len(clinic_checkins), len(recent_checkins))
+
+    sorted_checkins = sorted(clinic_checkins, key=lambda x: x.get("created_at", ""), reverse=True)
+    location = {}
+    latest_wait_time = None
+    if sorted_checkins:
+        most_recent = sorted_checkins[0]
+        if most_recent.get("location"):
+            location = most_recent.get("location", {})
+        latest_wait_time = most_recent.get("wait_time")
+    elif locations:
+        location = locations[-1]
+
+    first_checkin = clinic_checkins[0]
+    if not location:
+        location = first_checkin.get("location", {})
+    if latest_wait_time is None and wait_times:
+        latest_wait_time = wait_times[-1]
+
+    return {
+        "clinic_id": clinic_id,
+        "clinic_name": first_checkin.get("clinic_name", "Unknown Clinic"),
+        "location": location,
+        "average_wait_time": round(avg_wait_time, 1) if avg_wait_time else None,
+        "latest_wait_time": round(latest_wait_time, 1) if latest_wait_time else None,
+        "current_condition": current_condition,
+        "reliability_score": round(reliability_score, 1),
+        "total_reports": len(clinic_checkins),
+        "recent_reports": len(recent_checkins),
+        "last_updated": now.isoformat(),
+    }
+
+
+def _ref_update_clinic_aggregations(checkins, now=None):
+    clinic_groups = defaultdict(list)
+    for checkin in checkins:
+        key = _group_key_for_checkin(checkin)
+        if key is None:
+            continue
+        clinic_groups[key].append(checkin)
+
+    clinics = {}
+    for clinic_key, clinic_checkins in clinic_groups.items():
+        clinic_data = _ref_aggregate_clinic_data_from_list(clinic_key, clinic_checkins, now)
+        if clinic_data:
+            clinics[clinic_key] = clinic_data
+    return clinics
+
+
+def _ref_checkins_to_geojson(clinics, model, now=None):
+    features = []
+    now = now or datetime.now(timezone.utc)
+
+    for agg_id, clinic_data in clinics.items():
+        location = clinic_data.get("location") or {}
+        lat = location.get("latitude")
+        lon = location.get("longitude")
+
+        if lat is None or lon is None:
+            continue
+
+        try:
+            lat = float(lat)
+            lon = float(lon)
+        except (TypeError, ValueError):
+            continue
+
+        if math.isnan(lat) or math.isnan(lon):
+            continue
+
+        hour = now.hour
+        weekday = now.weekday()
+        recent_condition = clinic_data.get("current_condition", "Moderate")
+        latest_wait = clinic_data.get("latest_wait_time")
+
+        model_clinic_id = _normalize_clinic_name(clinic_data.get("clinic_name", ""))
+        predicted_wait = model.predict(model_clinic_id, hour, weekday, recent_condition, latest_wait)
+
+        recent_wait = clinic_data.get("latest_wait_time")
+        reference_wait = recent_wait if recent_wait is not None else predicted_wait
+        if reference_wait < 15:
+            color = "green"
+        elif reference_wait < 30:
+            color = "yellow"
+        elif reference_wait < 60:
+            color = "orange"
+        else:
+            color = "red"
+
+        features.append(
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [lon, lat]},
+                "properties": {
+                    "clinic_id": agg_id,
+                    "clinic_name": clinic_data.get("clinic_name", "Unknown"),
+                    "latest_wait_time": clinic_data.get("latest_wait_time"),
+                    "predicted_wait_time": round(predicted_wait, 1),
+                    "current_condition": clinic_data.get("current_condition", "Moderate"),
+                    "reliability_score": clinic_data.get("reliability_score", 0),
+                    "total_reports": clinic_data.get("total_reports", 0),
+                    "color": color,
+                },
+            }
+        )
+
+    return {"type": "FeatureCollection", "features": features}
+
+
+class ReferencePredictor:
+    """The classic WaitTimePredictor: running averages plus a trend projection."""
+
+    def __init__(self, default_wait=30.0, max_history=20):
+        self.default_wait = float(default_wait)
+        self.max_history = max(5, int(max_history))
+        self.stats = {}
+
+    def _safe_float(self, v, fallback=None):
+        try:
+            return float(v)
+        except:  # noqa: E722 - frozen as written
+            return fallback
+
+    def _get_clinic(self, clinic_id):
+        if clinic_id not in self.stats:
+            self.stats[clinic_id] = {
+                "overall": {"total": 0.0, "count": 0},
+                "hourly": {},
+                "weekday": {},
+                "recent": [],
+            }
+        return self.stats[clinic_id]
+
+    def update(self, clinic_id, hour, weekday, condition, actual_wait, predicted=None):
+        clinic = self._get_clinic(clinic_id)
+        wait = self._safe_float(actual_wait, self.default_wait)
+
+        clinic["overall"]["total"] += wait
+        clinic["overall"]["count"] += 1
+
+        hkey = str(int(hour) % 24)
+        bucket = clinic["hourly"].setdefault(hkey, {"total": 0.0, "count": 0})
+        bucket["total"] += wait
+        bucket["count"] += 1
+        bucket["value"] = bucket["total"] / bucket["count"]
+
+        wkey = str(int(weekday) % 7)
+        bucket = clinic["weekday"].setdefault(wkey, {"total": 0.0, "count": 0})
+        bucket["total"] += wait
+        bucket["count"] += 1
+        bucket["value"] = bucket["total"] / bucket["count"]
+
+        clinic["recent"].append(wait)
+        if len(clinic["recent"]) > self.max_history:
+            clinic["recent"] = clinic["recent"][-self.max_history:]
+
+    def predict(self, clinic_id, hour, weekday, condition, fallback=None):
+        fallback = self.default_wait if fallback is None else fallback
+        clinic = self._get_clinic(clinic_id)
+
+        overall = clinic["overall"]
+        if overall["count"] == 0:
+            return float(fallback)
+
+        overall_avg = overall["total"] / overall["count"]
+
+        hourly_vals = []
+        for entry in clinic["hourly"].values():
+            val = self._safe_float(entry.get("value"))
+            if val is not None:
+                hourly_vals.append(val)
+
+        hourly_avg = (
+            sum(hourly_vals) / len(hourly_vals)
+            if len(hourly_vals) >= 2 else overall_avg
+        )
+
+        weekday_vals = []
+        for entry in clinic["weekday"].values():
+            val = self._safe_float(entry.get("value"))
+            if val is not None:
+                weekday_vals.append(val)
+
+        weekday_avg = (
+            sum(weekday_vals) / len(weekday_vals)
+            if len(weekday_vals) >= 2 else overall_avg
+        )
+
+        recent = clinic["recent"]
+        trend_proj = None
+        if len(recent) >= 3:
+            xs = list(range(len(recent)))
+            ys = [self._safe_float(v, overall_avg) for v in recent]
+
+            n = len(xs)
+            mean_x = sum(xs) / n
+            mean_y = sum(ys) / n
+            denom = sum((x - mean_x)**2 for x in xs)
+
+            if denom > 0:
+                slope = sum((x - mean_x)*(y - mean_y) for x, y in zip(xs, ys)) / denom
+            else:
+                slope = 0.0
+
+            trend_proj = ys[-1] + slope
+
+        if trend_proj is None:
+            trend_proj = recent[-1] if recent else overall_avg
+
+        prediction = (
+            0.40 * hourly_avg +
+            0.30 * weekday_avg +
+            0.20 * overall_avg +
+            0.10 * trend_proj
+        )
+
+        history_len = len(recent)
+        trend_conf = min(1.0, history_len / 12)
+
+        base_bias = 0.10
+        dynamic = 0.15 * trend_conf
+
+        prediction *= (1 + base_bias + dynamic)
+
+        return max(0.0, float(prediction))
+
+
+def _ref_train(checkins):
+    model = ReferencePredictor()
+    for checkin in checkins:
+        check_in_dt = _parse_timestamp(checkin.get("check_in_time"))
+        wait_time = checkin.get("wait_time")
+        if check_in_dt is None or wait_time is None or not checkin.get("clinic_name"):
+            continue
+        model.update(
+            _normalize_clinic_name(checkin["clinic_name"]),
+            check_in_dt.hour,
+            check_in_dt.weekday(),
+            checkin.get("condition"),
+            wait_time,
+        )
+    return model
+
+
+# ---------------------------------------------------------------------------
+# Randomized check-in histories
+# ---------------------------------------------------------------------------
+
+CENTRES = [(51.0447, -114.0719), (40.7128, -74.0060), (0.05, 0.05), (-33.8688, 151.2093)]
+NAME_VARIANTS = ("{}", "{} ", "{}!", str.upper)
+
+
+def _clinic_pool(rng, size):
+    """Clinics near a few centres, some sharing a name far apart or straddling a grid line."""
+    pool = []
+    for i in range(size):
+        lat, lon = rng.choice(CENTRES)
+        if rng.random() < 0.2:
+            lat += rng.choice((-1, 1)) * 0.5  # same name, another ~10 km bucket
+        if rng.random() < 0.2:
+            lat = math.floor(lat * 10) / 10 + rng.choice((-1e-6, 1e-6))
+        pool.append((f"Clinic {i % max(1, size // 2)}", lat + rng.uniform(-0.05, 0.05), lon + rng.uniform(-0.05, 0.05)))
+    return pool
+
+
+def _browser_time(moment):
+    """What the report form submits: a minute-precision time through toISOString()."""
+    return moment.replace(second=0, microsecond=0).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _history(rng, now, count, clinics=None):
+    """Check-ins as the server stores them, plus the odd malformed one.
+
+    Most records have the exact stored shape (browser ``.000Z`` check-in and
+    check-out times, a server ``created_at``), so :class:`CompactCheckins`
+    packs them. Ages stay away from whole-day boundaries so the seven-day
+    window cannot flip between computing the reference and the fast path.
+    """
+    pool = _clinic_pool(rng, clinics or rng.randint(3, 40))
+    checkins = []
+    newest = {}  # pool index -> latest created_at so far, to produce ties
+    for _ in range(count):
+        clinic = rng.randrange(len(pool))
+        name, lat, lon = pool[clinic]
+        variant = rng.choice(NAME_VARIANTS)
+        name = variant(name) if callable(variant) else variant.format(name)
+        age = timedelta(days=rng.randint(-1, 20) + rng.uniform(0.05, 0.95))
+        created = now - age
+        check_out = created - timedelta(minutes=rng.uniform(0, 5))
+        minutes = rng.randint(0, 240)
+        wait = rng.choice((float(minutes),) * 6 + (None, 0, round(rng.uniform(1, 180), 1), minutes))
+        check_in = check_out - timedelta(minutes=minutes)
+        created_at = created.isoformat()
+        if clinic in newest and rng.random() < 0.1:
+            created_at = newest[clinic]  # tie with the clinic's latest report so far
+        newest[clinic] = max(newest.get(clinic, created_at), created_at)
+
+        checkin = {
+            "checkin_id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "clinic_id": f"{_normalize_clinic_name(name)}__x",
+            "clinic_name": name,
+            "location": {"latitude": lat + rng.uniform(-0.001, 0.001), "longitude": lon + rng.uniform(-0.001, 0.001)},
+            "check_in_time": _browser_time(check_in),
+            "check_out_time": _browser_time(check_out),
+            "wait_time": wait,
+            "condition": rng.choice(("Smooth", "Moderate", "Overloaded") * 2 + (None, "")),
+            "created_at": created_at,
+        }
+        roll = rng.random()
+        if roll < 0.03:
+            checkin["location"] = rng.choice((None, {}, {"latitude": lat}))
+        elif roll < 0.05:
+            del checkin["clinic_name"]
+        elif roll < 0.07:
+            del checkin["created_at"]
+        elif roll < 0.10:
+            checkin["created_at"] = created_at.replace("+00:00", "Z")
+            checkin["check_in_time"] = check_in.isoformat()
+        elif roll < 0.11:
+            checkin["check_in_time"] = "not a time"
+        checkins.append(checkin)
+    return checkins
+
+
+def _rebuilt_snapshot(checkins):
+    snapshot = ClinicSnapshot({}, None)
+    snapshot._reset(checkins, None)
+    snapshot.refresh_aggregations()
+    return snapshot
+
+
+def _without_timestamps(clinics):
+    return {key: {k: v for k, v in clinic.items() if k != "last_updated"} for key, clinic in clinics.items()}
+
+
+def _assert_close(actual, expected, context):
+    assert math.isclose(actual, expected, rel_tol=REL_TOL, abs_tol=REL_TOL), (context, actual, expected)
+
+
+# ---------------------------------------------------------------------------
+# Equivalence
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_clinic_aggregations_match_reference(seed):
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    checkins = _history(rng, now, rng.randint(1, 400))
+    expected = _without_timestamps(_ref_update_clinic_aggregations(checkins, now))
+
+    # Rebuilt the way a snapshot starts over from the stored log
+    snapshot = _rebuilt_snapshot(checkins)
+    assert list(snapshot.clinics) == list(expected)
+    assert _without_timestamps(snapshot.clinics) == expected
+
+    # Folded in over several writes, reading clinics in between (which prunes old reports)
+    aggregator = ClinicAggregator()
+    for i, checkin in enumerate(checkins):
+        key = aggregator.add(checkin)
+        if key is not None and rng.random() < 0.1:
+            aggregator.clinic(key, now)
+    actual = aggregator.clinics(now)
+    assert list(actual) == list(expected)
+    assert _without_timestamps(actual) == expected
+
+    # Restored from the checkpointed groups
+    restored = ClinicAggregator({key: dict(group) for key, group in aggregator.groups.items()})
+    assert _without_timestamps(restored.clinics(now)) == expected
+
+    # Through the compact in-memory history, which packs the well-formed records
+    compact = CompactCheckins(checkins)
+    assert list(compact) == checkins
+    assert len(checkins) < 40 or len(compact._raw) < len(checkins) * 2 // 3
+    assert _without_timestamps(_ref_update_clinic_aggregations(list(compact), now)) == expected
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_predictions_match_reference(seed):
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    checkins = _history(rng, now, rng.randint(1, 400))
+    reference = _ref_train(checkins)
+    model = _train_model(checkins, mode="classic")
+    restored = type(model).from_dict(model.to_dict())
+
+    clinic_ids = sorted(reference.stats) + ["never_seen"]
+    for clinic_id in clinic_ids:
+        for hour in range(24):
+            weekday = rng.randrange(7)
+            fallback = rng.choice((None, 12.5))
+            expected = reference.predict(clinic_id, hour, weekday, "Moderate", fallback)
+            _assert_close(model.predict(clinic_id, hour, weekday, "Moderate", fallback), expected, (clinic_id, hour))
+            _assert_close(restored.predict(clinic_id, hour, weekday, "Moderate", fallback), expected, (clinic_id, hour))
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_map_features_match_reference(seed):
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc) + timedelta(hours=rng.randrange(24))
+    checkins = _history(rng, now, rng.randint(1, 400))
+    clinics = _ref_update_clinic_aggregations(checkins, now)
+    clinics["bad_lat"] = {"clinic_name": "Bad", "location": {"latitude": "north", "longitude": 1.0}}
+    clinics["nan_lat"] = {"clinic_name": "NaN", "location": {"latitude": float("nan"), "longitude": 1.0}}
+    clinics["no_location"] = {"clinic_name": "Nowhere", "location": None}
+    clinics["sparse"] = {"location": {"latitude": "51.0", "longitude": "-114.0"}}
+    expected = _ref_checkins_to_geojson(clinics, _ref_train(checkins), now)["features"]
+
+    model = _train_model(checkins, mode="classic")
+    features = [
+        feature
+        for feature in (_clinic_feature(agg_id, clinic, model, now) for agg_id, clinic in clinics.items())
+        if feature is not None
+    ]
+    assert len(features) == len(expected)
+    for feature, ref in zip(features, expected):
+        props, ref_props = feature["properties"], ref["properties"]
+        assert feature["geometry"] == ref["geometry"]
+        # The server adds the p50/p90 bands; everything else is as before
+        assert set(props) - set(ref_props) == {"p50_wait_time", "p90_wait_time"}
+        _assert_close(props["predicted_wait_time"], ref_props["predicted_wait_time"], props["clinic_id"])
+        assert {k: props[k] for k in ref_props if k != "predicted_wait_time"} == {
+            k: v for k, v in ref_props.items() if k != "predicted_wait_time"
+        }
+
+    # Un-clustered, unfiltered map index serves the same features in the same order
+    assert ClinicMapIndex(features).query(None, None)["features"] == features
+
+
+def test_geojson_entry_point_matches_reference():
+    rng = random.Random(1000)
+    checkins = _history(rng, datetime.now(timezone.utc), 300)
+    clinics = _rebuilt_snapshot(checkins).clinics
+    model = _train_model(checkins, mode="classic")
+    for _ in range(3):  # retry if the hour turns over between the two calls
+        now = datetime.now(timezone.utc)
+        actual = _checkins_to_geojson(clinics, model)["features"]
+        if datetime.now(timezone.utc).hour == now.hour:
+            break
+    expected = _ref_checkins_to_geojson(clinics, _ref_train(checkins), now)["features"]
+    assert [f["properties"]["clinic_id"] for f in actual] == [f["properties"]["clinic_id"] for f in expected]
+    for feature, ref in zip(actual, expected):
+        _assert_close(feature["properties"]["predicted_wait_time"], ref["properties"]["predicted_wait_time"], ref)
+        assert feature["properties"]["color"] == ref["properties"]["color"]
+
+
+def test_wait_colors_match_reference_thresholds():
+    for wait in (0, 14.9, 15, 29.9, 30, 59.9, 60, 500):
+        clinics = {"c": {"clinic_name": "C", "location": {"latitude": 1.0, "longitude": 1.0}, "latest_wait_time": wait}}
+        expected = _ref_checkins_to_geojson(clinics, ReferencePredictor())["features"][0]["properties"]["color"]
+        assert _wait_color(wait) == expected
+
+
+# ---------------------------------------------------------------------------
+# Performance relative to the oracles
+# ---------------------------------------------------------------------------
+
+def _median_times(fast, reference, repeat=PERF_REPEAT):
+    """Median run of each, alternating so a burst of machine load hits both sides."""
+    fast_times, reference_times = [], []
+    for _ in range(repeat):
+        fast_times.append(timeit.timeit(fast, number=1))
+        reference_times.append(timeit.timeit(reference, number=1))
+    return statistics.median(fast_times), statistics.median(reference_times)
+
+
+def _check_ratio(name, fast, reference, record_property):
+    """Time both paths (median of several runs) and fail if the ratio is over its limit."""
+    fast()  # warm caches on both sides
+    reference()
+    fast_time, reference_time = _median_times(fast, reference)
+    ratio = fast_time / reference_time
+    record_property(f"perf_ratio_{name}", round(ratio, 4))
+    print(f"perf {name}: {ratio:.4f}x reference (limit {MAX_RATIOS[name]}x)")
+    assert ratio <= MAX_RATIOS[name], f"{name} is {ratio:.2f}x its reference (limit {MAX_RATIOS[name]}x)"
+
+
+@pytest.fixture(scope="module")
+def perf_history():
+    now = datetime.now(timezone.utc)
+    return now, _history(random.Random(4242), now, PERF_CHECKINS, clinics=PERF_CHECKINS // 20)
+
+
+@perf
+def test_perf_snapshot_rebuild(perf_history, record_property):
+    now, checkins = perf_history
+    _check_ratio(
+        "snapshot_rebuild",
+        lambda: _rebuilt_snapshot(checkins).clinics,
+        lambda: _ref_update_clinic_aggregations(checkins, now),
+        record_property,
+    )
+
+
+@perf
+def test_perf_aggregator_rebuild(perf_history, record_property):
+    now, checkins = perf_history
+
+    def rebuild():
+        aggregator = ClinicAggregator()
+        for checkin in checkins:
+            aggregator.add(checkin)
+        return aggregator.clinics(now)
+
+    _check_ratio("aggregator_rebuild", rebuild, lambda: _ref_update_clinic_aggregations(checkins, now), record_property)
+
+
+@perf
+def test_perf_aggregator_write(perf_history, record_property):
+    """One new check-in: fold it in and re-read its clinic vs recomputing everything."""
+    now, checkins = perf_history
+    aggregator = ClinicAggregator()
+    for checkin in checkins[:-1]:
+        aggregator.add(checkin)
+    newest = checkins[-1]
+
+    def write():
+        key = aggregator.add(dict(newest))
+        return aggregator.clinic(key, now) if key is not None else None
+
+    _check_ratio("aggregator_write", write, lambda: _ref_update_clinic_aggregations(checkins, now), record_property)
+
+
+@perf
+def test_perf_checkins_to_geojson(perf_history, record_property):
+    now, checkins = perf_history
+    clinics = _ref_update_clinic_aggregations(checkins, now)
+    model, reference = _train_model(checkins, mode="classic"), _ref_train(checkins)
+    _check_ratio(
+        "checkins_to_geojson",
+        lambda: _checkins_to_geojson(clinics, model),
+        lambda: _ref_checkins_to_geojson(clinics, reference, now),
+        record_property,
+    )
+
+
+@perf
+def test_perf_predict(perf_history, record_property):
+    now, checkins = perf_history
+    model, reference = _train_model(checkins, mode="classic"), _ref_train(checkins)
+    queries = [(clinic_id, hour, hour % 7) for clinic_id in reference.stats for hour in range(24)]
+
+    def predict_all(predictor):
+        return [predictor.predict(clinic_id, hour, weekday, "Moderate") for clinic_id, hour, weekday in queries]
+
+    _check_ratio("predict", lambda: predict_all(model), lambda: predict_all(reference), record_property)
+
+
+def test_new_model_defaults_to_classic_predictions():
+    """The default predictor is the one the oracle describes (joint mode is opt-in)."""
+    if _new_model().mode != "classic":
+        pytest.skip("CARENOW_PREDICTOR_MODE selects a different predictor")
+    checkins = _history(random.Random(7), datetime.now(timezone.utc), 200)
+    model, reference = _train_model(checkins), _ref_train(checkins)
+    for clinic_id in reference.stats:
+        _assert_close(model.predict(clinic_id, 9, 2, "Moderate"), reference.predict(clinic_id, 9, 2, "Moderate"), clinic_id)
+
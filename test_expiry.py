@@ -0,0 +1,72 @@
+"""Recent-report expiry: the aggregator's heap and the single-worker version bump."""
+
+import fcntl
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import server
+from server import ClinicAggregator
+
+DAY = 86400
+
+
+def _checkin(name, age_seconds, now):
+    created = datetime.fromtimestamp(now - age_seconds, timezone.utc)
+    return {
+        "clinic_name": name,
+        "location": {"latitude": 51.0, "longitude": -114.0},
+        "check_in_time": (created - timedelta(minutes=30)).isoformat(),
+        "wait_time": 30.0,
+        "condition": "Smooth",
+        "created_at": created.isoformat(),
+    }
+
+
+def test_expire_pops_clinics_in_due_order():
+    now = float(int(time.time()))
+    aggregator = ClinicAggregator()
+    a = aggregator.add(_checkin("Clinic A", 7.5 * DAY, now))
+    b = aggregator.add(_checkin("Clinic B", 3 * DAY, now))
+    aggregator.add(_checkin("Clinic A", 1 * DAY, now))
+    aggregator.add(_checkin("Clinic A", 9 * DAY, now))  # already outside the window, never queued
+    window = ClinicAggregator.WINDOW_SECONDS
+
+    assert aggregator.next_expiry() == now - 7.5 * DAY + window
+    assert aggregator.expire(now) == []
+    assert aggregator.expire(now + 0.5 * DAY) == [a]
+    assert aggregator.next_expiry() == now - 3 * DAY + window
+    assert aggregator.expire(now + 30 * DAY) == [b, a]
+    assert aggregator.next_expiry() is None
+    assert aggregator.clinic(a, datetime.fromtimestamp(now + 30 * DAY, timezone.utc))["recent_reports"] == 0
+
+
+def test_heap_is_rebuilt_from_checkpointed_groups():
+    now = float(int(time.time()))
+    aggregator = ClinicAggregator()
+    key = aggregator.add(_checkin("Clinic A", 2 * DAY, now))
+    restored = ClinicAggregator(aggregator.groups)
+    assert restored.next_expiry() == aggregator.next_expiry()
+    assert restored.expire(now + 6 * DAY) == [key]
+
+
+def test_only_the_lock_holder_bumps(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "RUNTIME_DIR", tmp_path)
+    monkeypatch.setattr(server, "_expiry_leader_fd", None)
+    other = os.open(tmp_path / ".expiry_leader", os.O_RDWR | os.O_CREAT)
+    try:
+        fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        assert not server._is_expiry_leader()
+        fcntl.flock(other, fcntl.LOCK_UN)  # the leader exited
+        assert server._is_expiry_leader()
+        assert server._is_expiry_leader()
+        try:
+            fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            pass
+        else:
+            raise AssertionError("leadership was not kept")
+    finally:
+        os.close(other)
+        if server._expiry_leader_fd is not None:
+            os.close(server._expiry_leader_fd)
@@ -0,0 +1,125 @@
+"""Streaming exports: CSV output, filters, chunking, export.py and Parquet."""
+
+import csv
+import io
+import json
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+import export
+import server
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+CALGARY = (-114.3, 50.8, -113.8, 51.2)
+
+
+def _checkins(count=60, seed=0):
+    rng = random.Random(seed)
+    checkins = []
+    for i in range(count):
+        created = NOW - timedelta(days=30) + timedelta(hours=12 * i)
+        lat, lon = rng.choice([(51.0447, -114.0719), (40.7128, -74.0060)])
+        wait = round(rng.uniform(5, 90), 1)
+        checkins.append({
+            "checkin_id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "clinic_id": "x",
+            "clinic_name": f"Clinic {i % 3}",
+            "location": {"latitude": lat + rng.uniform(-0.01, 0.01), "longitude": lon + rng.uniform(-0.01, 0.01)},
+            "check_in_time": (created - timedelta(minutes=wait)).isoformat(),
+            "check_out_time": created.isoformat(),
+            "wait_time": wait,
+            "condition": rng.choice(["Smooth", "Moderate", "Overloaded"]),
+            "created_at": created.isoformat(),
+        })
+    return checkins
+
+
+@pytest.fixture
+def stored(tmp_path, monkeypatch):
+    """A check-in log in a temporary data directory, read in small pieces."""
+    checkins = _checkins()
+    (tmp_path / server.CHECKINS_INDEX_KEY.replace("/", "_")).write_text(json.dumps(checkins, indent=2))
+    monkeypatch.setattr(server, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(server, "SHARD_DEG", 0.0)
+    monkeypatch.setattr(server, "_LOG_READ_BYTES", 1000)
+    monkeypatch.setattr(server, "EXPORT_CHUNK_ROWS", 7)
+    return checkins
+
+
+def _rows(body):
+    return list(csv.DictReader(io.StringIO(body.decode("utf-8"))))
+
+
+def test_checkins_csv_matches_the_stored_log_in_chunks(stored):
+    chunks = list(server._csv_chunks(server._export_checkins(), server.CHECKIN_EXPORT_COLUMNS))
+    assert len(chunks) == -(-len(stored) // 7)
+    rows = _rows(b"".join(chunks))
+    assert [row["checkin_id"] for row in rows] == [c["checkin_id"] for c in stored]
+    assert float(rows[5]["latitude"]) == stored[5]["location"]["latitude"]
+    assert rows[5]["check_in_time"] == stored[5]["check_in_time"]
+
+
+def test_endpoint_filters_by_time_and_bbox(stored):
+    since, until = NOW - timedelta(days=20), NOW - timedelta(days=5)
+    response = TestClient(server.app).get(
+        "/export/checkins",
+        params={"since": since.isoformat(), "until": until.isoformat(), "bbox": ",".join(map(str, CALGARY))},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    expected = [
+        c["checkin_id"] for c in stored
+        if since <= datetime.fromisoformat(c["created_at"]) < until and c["location"]["longitude"] < -100
+    ]
+    assert expected and [row["checkin_id"] for row in _rows(response.content)] == expected
+
+
+def test_clinics_over_a_past_range_are_as_of_its_end(stored):
+    until = NOW - timedelta(days=10)
+    clinics = list(server._export_clinics(None, until, None))
+    assert sum(clinic["total_reports"] for clinic in clinics) == sum(
+        datetime.fromisoformat(c["created_at"]) < until for c in stored
+    )
+    # Two reports a day; those under 8 whole days before ``until`` are recent even though it is not today
+    assert sum(clinic["recent_reports"] for clinic in clinics) == 15
+    assert all(clinic["last_updated"] == until.isoformat() for clinic in clinics)
+
+
+def test_export_cli_writes_the_selection(stored, tmp_path, monkeypatch, capsys):
+    out = tmp_path / "clinics.csv"
+    monkeypatch.setattr(sys, "argv", ["export.py", "clinics", "--bbox=" + ",".join(map(str, CALGARY)), "-o", str(out)])
+    assert export.main() == 0
+    rows = _rows(out.read_bytes())
+    assert rows and all(float(row["longitude"]) < -100 for row in rows)
+
+    monkeypatch.setattr(sys, "argv", ["export.py", "checkins", "--since", "yesterday"])
+    assert export.main() == 2
+    assert "must be an ISO 8601 timestamp" in capsys.readouterr().err
+
+
+def test_malformed_log_stops_instead_of_buffering(stored, tmp_path):
+    text = json.dumps(stored, indent=2)
+    broken = text.replace('"wait_time"', '"wait_time" oops', 1)
+    (tmp_path / server.CHECKINS_INDEX_KEY.replace("/", "_")).write_text(broken)
+    with pytest.raises(ValueError, match="malformed check-in"):
+        list(server._iter_checkin_log())
+
+    # A log cut off mid-element (a write in progress elsewhere) just ends early
+    (tmp_path / server.CHECKINS_INDEX_KEY.replace("/", "_")).write_text(text[: len(text) // 2])
+    assert 0 < len(list(server._iter_checkin_log())) < len(stored)
+
+
+def test_parquet_export(stored):
+    if server.pyarrow is None:
+        assert TestClient(server.app).get("/export/checkins", params={"format": "parquet"}).status_code == 501
+        pytest.skip("pyarrow is not installed")
+    body = b"".join(server._parquet_chunks(server._export_checkins(), server.CHECKIN_EXPORT_COLUMNS))
+    table = server.pyarrow.parquet.read_table(server.pyarrow.BufferReader(body))
+    assert table.num_rows == len(stored)
+    assert table.column("checkin_id").to_pylist() == [c["checkin_id"] for c in stored]
+    assert server.pyarrow.parquet.ParquetFile(server.pyarrow.BufferReader(body)).num_row_groups == -(-len(stored) // 7)
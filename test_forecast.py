@@ -0,0 +1,31 @@
+"""Forecast curves: the classic predictor's hour-of-day shape and best times."""
+
+from server import WaitTimePredictor, _best_time
+
+
+def _trained(mode="classic"):
+    model = WaitTimePredictor(mode=mode)
+    for day in range(14):
+        for hour, wait in ((9, 20.0), (13, 60.0), (17, 40.0)):
+            model.update("clinic", hour, day % 7, "Moderate", wait, timestamp=1.7e9 + day * 86400 + hour * 3600)
+    return model
+
+
+def test_classic_forecast_follows_each_hours_reports():
+    model = _trained()
+    curve = model.forecast("clinic", 8, 0, "Moderate", hours=24)  # steps are 09:00 .. 08:00
+    assert curve[0] < curve[8] < curve[4]  # 09:00 < 17:00 < 13:00
+    # Hours without reports sit at the all-hours level the plain prediction uses
+    assert curve[2] == model.predict("clinic", 10, 0, "Moderate")
+    assert max(curve) - min(curve) > 10
+
+
+def test_best_time_needs_a_spread():
+    model = _trained()
+    curve = [
+        {"time": str(step), "predicted_wait_time": round(wait, 1)}
+        for step, wait in enumerate(model.forecast("clinic", 8, 0, "Moderate", hours=12))
+    ]
+    assert _best_time(curve)["time"] == "0"
+    assert _best_time([{"time": "0", "predicted_wait_time": 30.0}, {"time": "1", "predicted_wait_time": 30.4}]) is None
+    assert model.forecast("unseen", 8, 0, "Moderate", hours=3, fallback=25.0) == [25.0] * 3
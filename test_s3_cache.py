@@ -0,0 +1,135 @@
+"""S3ReadCache against an in-process S3 stand-in (no AWS access needed)."""
+
+import hashlib
+
+from server import ClientError, S3ReadCache
+
+
+class _Body:
+    def __init__(self, data):
+        self._data = data
+
+    def read(self):
+        return self._data
+
+
+class LocalS3:
+    """Just enough of the S3 client for the cache: ETags, IfNoneMatch, Range."""
+
+    class exceptions:
+        NoSuchKey = type("NoSuchKey", (ClientError,), {})
+
+    def __init__(self):
+        self.objects = {}
+        self.gets = 0
+        self.bytes_sent = 0
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        etag = '"%s"' % hashlib.md5(Body).hexdigest()
+        self.objects[Key] = (etag, Body)
+        return {"ETag": etag}
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None, Range=None):
+        self.gets += 1
+        if Key not in self.objects:
+            raise self.exceptions.NoSuchKey({"Error": {"Code": "NoSuchKey", "Message": "Not Found"}}, "GetObject")
+        etag, body = self.objects[Key]
+        if IfNoneMatch == etag:
+            raise ClientError({"Error": {"Code": "304", "Message": "Not Modified"}}, "GetObject")
+        if Range:
+            body = body[int(Range[len("bytes="):].rstrip("-")):]
+        self.bytes_sent += len(body)
+        return {"ETag": etag, "Body": _Body(body)}
+
+
+def _cache(s3, tmp_path=None, **kwargs):
+    return S3ReadCache(s3, "bucket", directory=tmp_path, **kwargs)
+
+
+def test_fresh_entries_skip_s3_and_stale_ones_revalidate():
+    s3 = LocalS3()
+    s3.put_object(Bucket="bucket", Key="clinics/index.json", Body=b"x" * 1000)
+    cache = _cache(s3, ttl=60)
+
+    assert cache.get("clinics/index.json") == b"x" * 1000
+    assert cache.get("clinics/index.json") == b"x" * 1000
+    assert s3.gets == 1
+
+    assert cache.get("clinics/index.json", revalidate=True) == b"x" * 1000
+    assert s3.gets == 2
+    assert s3.bytes_sent == 1000
+    metrics = cache.summary()
+    assert (metrics["downloads"], metrics["hits"], metrics["revalidated"]) == (1, 1, 1)
+    assert metrics["bytes_saved"] == 2000
+
+
+def test_changed_object_is_downloaded_again():
+    s3 = LocalS3()
+    s3.put_object(Bucket="bucket", Key="k", Body=b"old")
+    cache = _cache(s3, ttl=0)
+    assert cache.get("k") == b"old"
+    s3.put_object(Bucket="bucket", Key="k", Body=b"new")
+    assert cache.get("k") == b"new"
+    assert cache.summary()["downloads"] == 2
+
+
+def test_per_key_ttl_overrides_default():
+    s3 = LocalS3()
+    s3.put_object(Bucket="bucket", Key="a", Body=b"a")
+    s3.put_object(Bucket="bucket", Key="b", Body=b"b")
+    cache = _cache(s3, ttl=0, ttls={"b": 60})
+    for _ in range(2):
+        cache.get("a")
+        cache.get("b")
+    assert s3.gets == 3  # "a" revalidated, "b" served from cache
+
+
+def test_ranged_reads_use_cached_body_when_unchanged():
+    s3 = LocalS3()
+    s3.put_object(Bucket="bucket", Key="log", Body=b"0123456789")
+    cache = _cache(s3, ttl=0)
+    cache.get("log")
+    assert cache.get("log", start=6) == b"6789"
+    assert s3.bytes_sent == 10
+
+    s3.put_object(Bucket="bucket", Key="log", Body=b"0123456789AB")
+    assert cache.get("log", start=10) == b"AB"
+    assert s3.bytes_sent == 12
+
+
+def test_writes_are_cached_and_missing_keys_raise():
+    s3 = LocalS3()
+    cache = _cache(s3, ttl=60)
+    cache.put("models/m.pkl", b"model", "application/octet-stream")
+    assert cache.get("models/m.pkl") == b"model"
+    assert s3.gets == 0
+
+    try:
+        cache.get("missing")
+    except ClientError as exc:
+        assert exc.response["Error"]["Code"] == "NoSuchKey"
+    else:
+        raise AssertionError("expected NoSuchKey")
+
+
+def test_disk_copy_survives_restart(tmp_path):
+    s3 = LocalS3()
+    s3.put_object(Bucket="bucket", Key="checkpoints/state.pkl", Body=b"s" * 4096)
+    _cache(s3, tmp_path, ttl=0).get("checkpoints/state.pkl")
+
+    restarted = _cache(s3, tmp_path, ttl=0)
+    assert restarted.get("checkpoints/state.pkl") == b"s" * 4096
+    assert s3.bytes_sent == 4096
+    assert restarted.summary()["revalidated"] == 1
+
+
+def test_memory_budget_evicts_least_recently_used():
+    s3 = LocalS3()
+    for key in "abc":
+        s3.put_object(Bucket="bucket", Key=key, Body=key.encode() * 40)
+    cache = _cache(s3, ttl=60, max_memory_bytes=100)
+    for key in "abc":
+        cache.get(key)
+    summary = cache.summary()
+    assert summary["entries"] == 2
+    assert summary["memory_bytes"] == 80